@@ -1,13 +1,20 @@
 # backend/app/api/routes_admin.py
-from fastapi import APIRouter, HTTPException
+import os
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import FileResponse
 from app.services.indexer import merge_all_indexes
 from app.repos.repo_rag import (
     count_documents,
     count_chunks,
     count_queries,
     get_query_logs,
-    get_latest_registry
+    get_latest_registry,
+    backfill_query_hits,
 )
+from app.services.chunk_text import train_text_dictionary, recompress_chunks
+from app.services.columnar_export import export_columnar
+from app.services.jwt_handler import auth_required
+from app.services.profiling import list_profiles, profile_file
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -52,3 +59,58 @@ async def merge_indexes():
         "total_chunks": reg.total_chunks,
         "registry_id": reg.id
     }
+
+# -----------------------------
+# POST /admin/backfill-query-hits
+# -----------------------------
+@router.post("/backfill-query-hits")
+async def backfill_hits(batch_size: int = 1000):
+    """Populate query_hits for QueryLog rows logged before the table existed."""
+    result = await backfill_query_hits(batch_size=batch_size)
+    return {"status": "success", **result}
+
+# -----------------------------
+# Chunk text compression (zstd)
+# -----------------------------
+@router.post("/chunks/train-dictionary")
+async def train_dictionary(sample_size: int = 20000):
+    """Train a zstd dictionary on stored chunk texts (used for chunks stored from now on)."""
+    try:
+        return {"status": "success", **await train_text_dictionary(sample_size=sample_size)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/chunks/recompress")
+async def recompress(batch_size: int = 500):
+    """Rewrite stored chunks with the configured codec (CHUNK_TEXT_CODEC) and latest dictionary."""
+    try:
+        return {"status": "success", **await recompress_chunks(batch_size=batch_size)}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# -----------------------------
+# POST /admin/export/parquet
+# -----------------------------
+@router.post("/export/parquet")
+async def export_parquet():
+    """Columnar export of chunks + embeddings under data/exports/<timestamp>/."""
+    try:
+        return {"status": "success", **await export_columnar()}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# -----------------------------
+# Request profiles (admin only)
+# -----------------------------
+@router.get("/profiles")
+async def get_profiles(limit: int = 50, user=Depends(auth_required)):
+    """Recent /ask/ and /upload/ profiles captured with ?profile=1, newest first."""
+    return list_profiles(limit=limit)
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "", user=Depends(auth_required)):
+    """Download a profile: html / text (pyinstrument) or pstats (cProfile)."""
+    path = profile_file(profile_id, format or None)
+    return FileResponse(path, filename=os.path.basename(path))
@@ -1,71 +1,129 @@
-from fastapi import APIRouter, Query
-from sqlmodel import select, func
+from fastapi import APIRouter, HTTPException, Query
+from sqlmodel import select, and_, or_
 from datetime import datetime
 from app.db.session import async_session
-from app.models.models import QueryLog, Chunk, Document
+from app.db.fts import apply_query_log_search
+from app.models.models import QueryLog, QueryHit
+from app.utils.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, ndjson_response, stream_rows
 
 router = APIRouter(prefix="/admin/query-logs", tags=["Admin Logs"])
 
+
+def _filter_logs(query, doc: str, from_date: str, to_date: str):
+    # ----------------------------------------------------
+    # FILTER BY DOCUMENT
+    # (indexed query_hits lookup on doc_id)
+    # ----------------------------------------------------
+    if doc:
+        query = query.where(
+            QueryLog.id.in_(
+                select(QueryHit.query_id).where(QueryHit.doc_id == doc)
+            )
+        )
+
+    # ----------------------------------------------------
+    # DATE RANGE
+    # ----------------------------------------------------
+    if from_date:
+        from_dt = datetime.fromisoformat(from_date)
+        query = query.where(QueryLog.timestamp >= from_dt)
+
+    if to_date:
+        to_dt = datetime.fromisoformat(to_date)
+        query = query.where(QueryLog.timestamp <= to_dt)
+
+    return query
+
+
 @router.get("/")
 async def get_query_logs(
     search: str = "",
     doc: str = "",
     from_date: str = "",
     to_date: str = "",
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = "",
 ):
+    """
+    Query logs, newest first - or best match first when `search` is set
+    (FTS5 / tsvector rank). Pass the returned `next_cursor` back as
+    `cursor` to get the next page; it is null on the last page.
+    """
     async with async_session() as session:
 
         query = select(QueryLog)
+        score = None
 
         # ----------------------------------------------------
-        # TEXT SEARCH
+        # TEXT SEARCH (full-text index, see app/db/fts.py)
         # ----------------------------------------------------
         if search:
-            query = query.where(QueryLog.query_text.ilike(f"%{search}%"))
+            query, score = apply_query_log_search(query, search)
+            if score is not None:
+                query = query.add_columns(score.label("score"))
 
-        # ----------------------------------------------------
-        # FILTER BY DOCUMENT
-        # (join returned_chunk_ids → Chunk → Document)
-        # ----------------------------------------------------
-        if doc:
-            query = (
-                select(QueryLog)
-                .join(Chunk, Chunk.id.in_(QueryLog.returned_chunk_ids), isouter=True)
-                .join(Document, Document.doc_id == Chunk.doc_id, isouter=True)
-                .where(Document.doc_id == doc)
-            )
+        query = _filter_logs(query, doc, from_date, to_date)
 
         # ----------------------------------------------------
-        # DATE RANGE
+        # ORDER + KEYSET PAGINATION
         # ----------------------------------------------------
-        if from_date:
-            from_dt = datetime.fromisoformat(from_date)
-            query = query.where(QueryLog.timestamp >= from_dt)
-
-        if to_date:
-            to_dt = datetime.fromisoformat(to_date)
-            query = query.where(QueryLog.timestamp <= to_dt)
+        if score is not None:
+            after = decode_cursor(cursor, "score", "id")
+            if after:
+                query = query.where(or_(
+                    score < after["score"],
+                    and_(score == after["score"], QueryLog.id < after["id"]),
+                ))
+            query = query.order_by(score.desc(), QueryLog.id.desc())
+        else:
+            after = decode_cursor(cursor, "ts", "id")
+            if after:
+                try:
+                    ts = datetime.fromisoformat(after["ts"])
+                except (TypeError, ValueError):
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                query = query.where(or_(
+                    QueryLog.timestamp < ts,
+                    and_(QueryLog.timestamp == ts, QueryLog.id < after["id"]),
+                ))
+            query = query.order_by(QueryLog.timestamp.desc(), QueryLog.id.desc())
 
-        # ----------------------------------------------------
-        # ORDER + PAGINATION
-        # ----------------------------------------------------
-        query = query.order_by(QueryLog.timestamp.desc())
-        query = query.limit(limit).offset(offset)
+        # one extra row tells us whether there is a next page
+        res = await session.execute(query.limit(limit + 1))
+        rows = res.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-        res = await session.execute(query)
-        logs = res.scalars().all()
+        if score is not None:
+            items = [{**log.model_dump(), "score": s} for log, s in rows]
+        else:
+            items = [row[0] for row in rows]
 
-        # ----------------------------------------------------
-        # TOTAL COUNT (without pagination)
-        # ----------------------------------------------------
-        count_q = select(func.count()).select_from(QueryLog)
-        total = (await session.execute(count_q)).scalar()
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            if score is not None:
+                next_cursor = encode_cursor({"score": last[1], "id": last[0].id})
+            else:
+                next_cursor = encode_cursor({"ts": last[0].timestamp.isoformat(), "id": last[0].id})
 
         return {
-            "total": total,
             "limit": limit,
-            "offset": offset,
-            "items": logs
+            "next_cursor": next_cursor,
+            "items": items
         }
+
+
+@router.get("/export.ndjson")
+async def export_query_logs(
+    search: str = "",
+    doc: str = "",
+    from_date: str = "",
+    to_date: str = "",
+):
+    """All matching query logs as NDJSON (oldest first), streamed in batches."""
+    query = select(QueryLog)
+    if search:
+        query, _ = apply_query_log_search(query, search)
+    query = _filter_logs(query, doc, from_date, to_date).order_by(QueryLog.id)
+    return ndjson_response(stream_rows(query), lambda log: log.model_dump(), "query_logs.ndjson")
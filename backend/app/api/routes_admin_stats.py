@@ -1,40 +1,27 @@
 from fastapi import APIRouter, Depends, Query
 from sqlmodel import select, func
 from app.db.session import async_session
-from app.models.models import QueryLog, Chunk, Document, FaissIndexRegistry
+from app.models.models import QueryHit, Document, FaissIndexRegistry
 from datetime import datetime, timedelta
+from app.repos.repo_rag import (
+    get_counters,
+    get_queries_on,
+    get_queries_per_day,
+    rebuild_stats_rollups,
+)
 
 router = APIRouter(prefix="/admin/stats", tags=["Admin Stats"])
 
 # ----------------------------------------------------
 # SUMMARY STATS
+# (served from StatsCounter / QueryDailyRollup: constant time)
 # ----------------------------------------------------
 @router.get("/summary")
 async def get_summary():
-    async with async_session() as session:
-
-        # total documents
-        docs_q = select(func.count()).select_from(Document)
-        docs = (await session.execute(docs_q)).scalar()
-
-        # total chunks
-        chunks_q = select(func.count()).select_from(Chunk)
-        chunks = (await session.execute(chunks_q)).scalar()
-
-        # total queries ever
-        q_total = select(func.count()).select_from(QueryLog)
-        total_queries = (await session.execute(q_total)).scalar()
-
-        # queries today
-        today = datetime.utcnow().date()
-        q_today = select(func.count()).select_from(QueryLog)\
-            .where(func.date(QueryLog.timestamp) == today)
-        today_queries = (await session.execute(q_today)).scalar()
-
-        # faiss index count
-        faiss_q = select(func.count()).select_from(FaissIndexRegistry)
-        faiss_count = (await session.execute(faiss_q)).scalar()
+    counters = await get_counters()
+    today_queries = await get_queries_on(datetime.utcnow().date())
 
+    async with async_session() as session:
         # latest index date
         latest_index = await session.execute(
             select(FaissIndexRegistry)
@@ -43,40 +30,30 @@ async def get_summary():
         )
         latest = latest_index.scalar()
 
-        return {
-            "total_documents": docs,
-            "total_chunks": chunks,
-            "total_queries": total_queries,
-            "queries_today": today_queries,
-            "faiss_index_count": faiss_count,
-            "latest_index_date": latest.created_at if latest else None,
-        }
+    return {
+        "total_documents": counters.get("documents", 0),
+        "total_chunks": counters.get("chunks", 0),
+        "total_queries": counters.get("queries", 0),
+        "queries_today": today_queries,
+        "faiss_index_count": counters.get("faiss_indexes", 0),
+        "latest_index_date": latest.created_at if latest else None,
+    }
 
 # ----------------------------------------------------
 # QUERIES PER DAY (last 14 days)
 # ----------------------------------------------------
 @router.get("/queries-per-day")
 async def queries_per_day(days: int = 14):
-    async with async_session() as session:
-
-        cutoff = datetime.utcnow() - timedelta(days=days)
+    rows = await get_queries_per_day(days=days)
+    return [{"day": str(r.day), "count": r.count} for r in rows]
 
-        q = await session.execute(
-            select(
-                func.date(QueryLog.timestamp).label("day"),
-                func.count().label("count")
-            )
-            .where(QueryLog.timestamp >= cutoff)
-            .group_by(func.date(QueryLog.timestamp))
-            .order_by(func.date(QueryLog.timestamp))
-        )
-
-        items = [
-            {"day": str(row.day), "count": row.count}
-            for row in q.all()
-        ]
-
-        return items
+# ----------------------------------------------------
+# REBUILD ROLLUPS (repair after manual DB edits)
+# ----------------------------------------------------
+@router.post("/rebuild")
+async def rebuild_rollups():
+    counts = await rebuild_stats_rollups()
+    return {"status": "rebuilt", "counters": counts}
 
 # ----------------------------------------------------
 # TOP DOCUMENTS used in answers
@@ -85,17 +62,18 @@ async def queries_per_day(days: int = 14):
 async def top_documents(limit: int = 5):
     async with async_session() as session:
 
-        # join QueryLog → Chunk → Document
+        # aggregate the indexed query_hits table, then attach file paths
+        hits = func.count().label("hits")
         q = await session.execute(
             select(
-                Document.doc_id,
+                QueryHit.doc_id,
                 Document.file_path,
-                func.count().label("hits")
+                hits
             )
-            .join(Chunk, Chunk.id.in_(QueryLog.returned_chunk_ids), isouter=True)
-            .join(Document, Document.doc_id == Chunk.doc_id, isouter=True)
-            .group_by(Document.doc_id, Document.file_path)
-            .order_by(func.count().desc())
+            .select_from(QueryHit)
+            .join(Document, Document.doc_id == QueryHit.doc_id, isouter=True)
+            .group_by(QueryHit.doc_id, Document.file_path)
+            .order_by(hits.desc())
             .limit(limit)
         )
 
@@ -1,108 +1,209 @@
+import functools
 import os
-import torch
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import time
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.core.rag_engine import hybrid_search_db, build_context
-from app.db.session import async_session
+from app.core.rag_engine import hybrid_search_db
+from app.core.reranker import rerank, rerank_pool_size
+from app.db.session import get_session
 from app.models.models import Document
-import app.services.lora_loader as lora
+from app.services.generator import generate_with_lora
+from app.services.profiling import profile_opt_in, run_blocking, run_profiled
+from app.services.query_logger import enqueue_query_log
+from app.utils.metrics import STAGE_SECONDS, counter, gauge, histogram
 
 
 router = APIRouter(prefix="", tags=["Ask"])
 
+# /ask/ skips generation when no hit reaches this raw cosine similarity.
+# Fused scores are min-max normalized per query (the top hit is always ~1),
+# so the threshold is applied to the un-normalized semantic score.
+MIN_RELEVANCE = float(os.getenv("RAG_MIN_RELEVANCE", "0.0"))
+NO_ANSWER = "No relevant policy found for this question."
 
-class Query(BaseModel):
-    question: str
-
-
-def generate_with_lora(question: str, context: str) -> str:
-    model, tokenizer = lora.get_lora_model()
+REQUESTS = counter("rag_requests_total", "Requests by endpoint and outcome", ["endpoint", "status"])
+REQUEST_SECONDS = histogram("rag_request_seconds", "End-to-end request duration", ["endpoint"])
+IN_FLIGHT = gauge("rag_requests_in_flight", "Requests currently being served", ["endpoint"])
+GENERATION_SKIPPED = counter("rag_generation_skipped_total", "/ask/ requests answered without generation")
 
-    if model is None or tokenizer is None:
-        raise HTTPException(status_code=500, detail="LoRA not loaded")
 
-    prompt = (
-        "You are an assistant that answers using ONLY the provided context.\n\n"
-        f"Context:\n{context}\n\n"
-        f"Question: {question}\n"
-        "Answer:"
-    )
-
-    device = next(model.parameters()).device
-
-    inputs = tokenizer(
-        prompt,
-        return_tensors="pt",
-        truncation=True,
-        max_length=1024,
-        padding=True,
-    )
-
-    input_ids = inputs["input_ids"].to(device)
-    attention_mask = inputs["attention_mask"].to(device)    # FIXED
+class Query(BaseModel):
+    question: str
+    min_relevance: Optional[float] = None
+    rerank_budget_ms: Optional[float] = None  # default RAG_RERANK_BUDGET_MS; 0 = hybrid order
 
-    output_ids = model.generate(
-        input_ids=input_ids,
-        attention_mask=attention_mask,
-        max_new_tokens=200,
-        temperature=0.7,
-        top_p=0.9,
-        top_k=50,
-        repetition_penalty=1.2,
-        no_repeat_ngram_size=3,
-        pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
-    )
 
-    # remove prompt
-    generated = output_ids[0, input_ids.shape[1]:]
-    text = tokenizer.decode(generated, skip_special_tokens=True).strip()
+class SearchQuery(BaseModel):
+    question: str
+    top_k: int = Field(5, ge=1, le=100)
+    alpha: float = Field(0.1, ge=0.0, le=1.0)
+    rerank_budget_ms: Optional[float] = None
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+
+def instrumented(endpoint: str):
+    """Count, time and track in-flight requests of a route handler."""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            in_flight = IN_FLIGHT.labels(endpoint=endpoint)
+            in_flight.inc()
+            t0 = time.perf_counter()
+            status = "error"
+            try:
+                result = await handler(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                in_flight.dec()
+                REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - t0)
+                REQUESTS.labels(endpoint=endpoint, status=status).inc()
+        return wrapper
+    return decorator
+
+
+async def enrich_hits(hits: List[Dict], session: AsyncSession) -> List[Dict]:
+    """Map hits to the public source shape (snippet + file name)."""
+    doc_ids = {h.get("doc_id") for h in hits if h.get("doc_id")}
+    doc_map = {}
+
+    if doc_ids:
+        stmt = select(Document).where(Document.doc_id.in_(doc_ids))
+        res = await session.execute(stmt)
+        docs = res.scalars().all()
+        for d in docs:
+            doc_map[d.doc_id] = os.path.basename(d.file_path)
+
+    enriched = []
+    for h in hits:
+        snippet = (h.get("text") or "").replace("\n", " ").strip()
+        if len(snippet) > 400:
+            snippet = snippet[:400] + "..."
+        enriched.append({
+            "chunk_id": h.get("chunk_id"),
+            "doc_id": h.get("doc_id"),
+            "page": h.get("page"),
+            "text": snippet,
+            "file_name": doc_map.get(h.get("doc_id")),
+            "score": h.get("score"),
+            "rerank_score": h.get("rerank_score"),
+        })
+    return enriched
+
+
+def is_low_confidence(hits: List[Dict], min_relevance: float) -> bool:
+    if not hits:
+        return True
+    if min_relevance <= 0:
+        return False
+    best = max((h.get("sem_raw") or 0.0) for h in hits)
+    return best < min_relevance
+
+
+@router.post("/search")
+@instrumented("search")
+async def search(query: SearchQuery, session: AsyncSession = Depends(get_session)):
+    """Retrieval only: the same sources as /ask/, without generation."""
+    try:
+        t0 = time.perf_counter()
+        timings, cache_hits = {}, {}
+        hits = await hybrid_search_db(query.question, top_k=rerank_pool_size(query.top_k), alpha=query.alpha,
+                                      timings=timings, cache_info=cache_hits, session=session)
+        hits = await rerank(query.question, hits, query.top_k, budget_ms=query.rerank_budget_ms,
+                            timings=timings, info=cache_hits)
+        timings["search_ms"] = _ms(t0)
+
+        t1 = time.perf_counter()
+        enriched = await enrich_hits(hits, session)
+        timings["enrich_ms"] = _ms(t1)
+        STAGE_SECONDS.labels(stage="hydrate").observe(timings["enrich_ms"] / 1000)
+        timings["total_ms"] = _ms(t0)
+        timings = {k: round(v, 2) for k, v in timings.items()}
+
+        enqueue_query_log(
+            query.question,
+            hits,
+            response_time_ms=int(timings["total_ms"]),
+            endpoint="search",
+            stage_timings=timings,
+            cache_hits=cache_hits,
+        )
 
-    # Clean up GPT-2 repeating "Answer:"
-    if text.lower().startswith("answer:"):
-        text = text[7:].strip()
+        return {
+            "question": query.question,
+            "sources": enriched,
+            "timings": timings,
+        }
 
-    return text
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/ask/")
-async def ask(query: Query):
+@instrumented("ask")
+async def ask(
+    query: Query,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    profile_user: Optional[Dict] = Depends(profile_opt_in),
+):
+    """`?profile=1` / `X-Profile: 1` with an admin token captures a profile (see app/services/profiling.py)."""
+    return await run_profiled("ask", profile_user, response, _answer(query, session))
+
+
+async def _answer(query: Query, session: AsyncSession):
     try:
-        hits = await hybrid_search_db(query.question, top_k=5, alpha=0.1)
-
-        doc_ids = {h.get("doc_id") for h in hits if h.get("doc_id")}
-        doc_map = {}
-
-        if doc_ids:
-            async with async_session() as session:
-                stmt = select(Document).where(Document.doc_id.in_(doc_ids))
-                res = await session.execute(stmt)
-                docs = res.scalars().all()
-            for d in docs:
-                doc_map[d.doc_id] = os.path.basename(d.file_path)
-
-        enriched = []
-        for h in hits:
-            snippet = (h.get("text") or "").replace("\n", " ").strip()
-            if len(snippet) > 400:
-                snippet = snippet[:400] + "..."
-            enriched.append({
-                "chunk_id": h.get("chunk_id"),
-                "doc_id": h.get("doc_id"),
-                "page": h.get("page"),
-                "text": snippet,
-                "file_name": doc_map.get(h.get("doc_id")),
-                "score": h.get("score"),
-            })
-
-        context = build_context(hits, max_chars=1500)
-        answer = generate_with_lora(query.question, context)
+        t0 = time.perf_counter()
+        timings, cache_hits = {}, {}
+        hits = await hybrid_search_db(query.question, top_k=rerank_pool_size(5), alpha=0.1,
+                                      timings=timings, cache_info=cache_hits, session=session)
+        hits = await rerank(query.question, hits, 5, budget_ms=query.rerank_budget_ms,
+                            timings=timings, info=cache_hits)
+        timings["search_ms"] = _ms(t0)
+
+        t1 = time.perf_counter()
+        enriched = await enrich_hits(hits, session)
+        timings["enrich_ms"] = _ms(t1)
+        STAGE_SECONDS.labels(stage="hydrate").observe(timings["enrich_ms"] / 1000)
+        # hand the pooled connection back before the (slow) generation step
+        await session.close()
+
+        min_relevance = MIN_RELEVANCE if query.min_relevance is None else query.min_relevance
+        skipped = is_low_confidence(hits, min_relevance)
+        if skipped:
+            answer = NO_ANSWER
+            GENERATION_SKIPPED.inc()
+        else:
+            t2 = time.perf_counter()
+            # decode in a worker thread so the event loop keeps serving other requests
+            answer = await run_blocking(generate_with_lora, query.question, hits, info=cache_hits)
+            timings["generate_ms"] = _ms(t2)
+        timings["total_ms"] = _ms(t0)
+        timings = {k: round(v, 2) for k, v in timings.items()}
+
+        enqueue_query_log(
+            query.question,
+            hits,
+            response_time_ms=int(timings["total_ms"]),
+            endpoint="ask",
+            stage_timings=timings,
+            cache_hits=cache_hits,
+        )
 
         return {
             "question": query.question,
             "answer": answer,
             "sources": enriched,
+            "generation_skipped": skipped,
+            "timings": timings,
         }
 
     except Exception as e:
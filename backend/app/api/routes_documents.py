@@ -1,22 +1,116 @@
 # backend/app/api/routes_documents.py
 import os
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from sqlalchemy import select
 from app.db.session import async_session
-from app.models.models import Document
+from app.models.models import Document, Chunk
+from app.services.chunk_text import chunk_text, ensure_text_dictionaries
+from app.utils.pagination import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    json_array_response,
+    ndjson_response,
+    stream_rows,
+)
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
+
+def _document_out(d: Document) -> dict:
+    return {
+        "doc_id": d.doc_id,                 # 🔥 FIXED KEY
+        "file_name": os.path.basename(d.file_path)
+    }
+
+
+def _chunk_out(c: Chunk) -> dict:
+    # token_ids are a generation cache, not part of the public shape
+    return {
+        "id": c.id,
+        "doc_id": c.doc_id,
+        "page": c.page,
+        "start_char": c.start_char,
+        "end_char": c.end_char,
+        "text": chunk_text(c),
+        "token_count": c.token_count,
+    }
+
+
+def _chunks_query(doc_id: str):
+    q = select(Chunk)
+    if doc_id:
+        q = q.where(Chunk.doc_id == doc_id)
+    return q
+
+
 @router.get("/list")
 async def list_documents():
+    """All documents as one JSON array, streamed from a server-side cursor."""
+    return json_array_response(stream_rows(select(Document).order_by(Document.id)), _document_out)
+
+
+# ----------------------------------------------------
+# KEYSET PAGES (?cursor=<next_cursor>)
+# ----------------------------------------------------
+@router.get("/")
+async def page_documents(limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: str = ""):
+    after = decode_cursor(cursor, "id")
+    q = select(Document).order_by(Document.id)
+    if after:
+        q = q.where(Document.id > after["id"])
+
     async with async_session() as session:
-        result = await session.execute(select(Document))
-        docs = result.scalars().all()
-
-    return [
-        {
-            "doc_id": d.doc_id,                 # 🔥 FIXED KEY
-            "file_name": os.path.basename(d.file_path)
-        }
-        for d in docs
-    ]
+        docs = (await session.execute(q.limit(limit + 1))).scalars().all()
+
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return {
+        "limit": limit,
+        "next_cursor": encode_cursor({"id": docs[-1].id}) if has_more else None,
+        "items": [{**_document_out(d), "created_at": d.created_at} for d in docs],
+    }
+
+
+@router.get("/chunks")
+async def page_chunks(
+    doc_id: str = "",
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = "",
+):
+    after = decode_cursor(cursor, "id")
+    await ensure_text_dictionaries()
+    q = _chunks_query(doc_id).order_by(Chunk.id)
+    if after:
+        q = q.where(Chunk.id > after["id"])
+
+    async with async_session() as session:
+        chunks = (await session.execute(q.limit(limit + 1))).scalars().all()
+
+    has_more = len(chunks) > limit
+    chunks = chunks[:limit]
+    return {
+        "limit": limit,
+        "next_cursor": encode_cursor({"id": chunks[-1].id}) if has_more else None,
+        "items": [_chunk_out(c) for c in chunks],
+    }
+
+
+# ----------------------------------------------------
+# NDJSON EXPORTS (one object per line, streamed)
+# ----------------------------------------------------
+@router.get("/export.ndjson")
+async def export_documents():
+    rows = stream_rows(select(Document).order_by(Document.id))
+    return ndjson_response(
+        rows,
+        lambda d: {**_document_out(d), "file_path": d.file_path, "created_at": d.created_at},
+        "documents.ndjson",
+    )
+
+
+@router.get("/chunks/export.ndjson")
+async def export_chunks(doc_id: str = ""):
+    await ensure_text_dictionaries()
+    rows = stream_rows(_chunks_query(doc_id).order_by(Chunk.id))
+    return ndjson_response(rows, _chunk_out, "chunks.ndjson")
@@ -2,18 +2,32 @@
 
 import os
 import json
+from typing import List
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi import BackgroundTasks
+from pydantic import BaseModel
 
-from app.services.evaluator import run_evaluation_job, load_eval_dataset
+from app.services.evaluator import run_evaluation_job, load_eval_dataset, create_evaluation, get_progress
+from app.core.rag_engine import RAG_FUSION
+from app.core.rag_evalution.rag_eval import load_eval_file, run_sweep
 from app.db.session import async_session
-from app.models.models import Evaluation
+from app.models.models import Evaluation, EvaluationItem
+from app.utils.pagination import ndjson_response, stream_rows
 from sqlalchemy import select
 
 router = APIRouter(prefix="/evaluation", tags=["Evaluation"])
 
 EVAL_DIR = "data/eval"
 os.makedirs(EVAL_DIR, exist_ok=True)
+MAX_SWEEP_CONFIGS = int(os.getenv("EVAL_MAX_SWEEP_CONFIGS", "500"))
+
+
+class SweepRequest(BaseModel):
+    alphas: List[float] = [0.1]
+    top_ks: List[int] = [5]
+    candidate_pools: List[int] = [0]  # 0 = RAG_CANDIDATE_MULT x top_k, as in /ask/
+    index_types: List[str] = ["Flat"]  # faiss factory + params, e.g. "HNSW32:efSearch=64"
+    fusions: List[str] = [RAG_FUSION]  # "weighted" and/or "rrf"
 
 
 # -------------------------
@@ -52,10 +66,14 @@ async def run_evaluation(background_tasks: BackgroundTasks):
     if not os.path.exists(ds_path):
         raise HTTPException(status_code=404, detail="No evaluation dataset uploaded.")
 
+    # create the row up front so the caller can poll /evaluation/{id}/status
+    ev = await create_evaluation(len(load_eval_dataset()))
+
     # run in background 
-    background_tasks.add_task(run_evaluation_job)
+    background_tasks.add_task(run_evaluation_job, ev.id)
 
-    return {"status": "started", "message": "Evaluation is running in background."}
+    return {"status": "started", "evaluation_id": ev.id,
+            "message": "Evaluation is running in background."}
 
 
 # -------------------------
@@ -63,16 +81,102 @@ async def run_evaluation(background_tasks: BackgroundTasks):
 # -------------------------
 @router.get("/list")
 async def list_evaluations():
+    # read only the score out of `results` (rows from older versions still
+    # carry every item's details there)
+    stmt = select(
+        Evaluation.id,
+        Evaluation.results["overall_score"].as_float().label("score"),
+        Evaluation.params,
+        Evaluation.run_at,
+        Evaluation.status,
+    ).order_by(Evaluation.run_at.desc())
     async with async_session() as session:
-        res = await session.execute(select(Evaluation).order_by(Evaluation.run_at.desc()))
-        rows = res.scalars().all()
+        rows = (await session.execute(stmt)).all()
 
     return [
         {
-            "id": ev.id,
-            "score": ev.results.get("overall_score"),
-            "params": ev.params,
-            "run_at": ev.run_at,
+            "id": row.id,
+            "score": row.score,
+            "params": row.params,
+            "run_at": row.run_at,
+            "status": row.status,
         }
-        for ev in rows
+        for row in rows
     ]
+
+
+# -------------------------
+# 4) Progress of one evaluation
+# -------------------------
+@router.get("/{evaluation_id}/status")
+async def evaluation_status(evaluation_id: int):
+    async with async_session() as session:
+        ev = await session.get(Evaluation, evaluation_id)
+    if ev is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found.")
+    return get_progress(ev)
+
+
+# -------------------------
+# 5) Retrieval parameter sweep
+# -------------------------
+@router.post("/retrieval-sweep")
+async def retrieval_sweep(req: SweepRequest):
+    """
+    Recall / MRR / latency for every fusion x alpha x top_k x pool x index combination
+    over the uploaded dataset (entries need `expected_chunk_ids`, DB chunk ids).
+    """
+    ds_path = os.path.join(EVAL_DIR, "dataset.json")
+    if not os.path.exists(ds_path):
+        raise HTTPException(status_code=404, detail="No evaluation dataset uploaded.")
+
+    n_configs = (len(req.fusions) * len(req.alphas) * len(req.top_ks)
+                 * len(req.candidate_pools) * len(req.index_types))
+    if n_configs == 0 or n_configs > MAX_SWEEP_CONFIGS:
+        raise HTTPException(status_code=400, detail=f"Grid must have 1..{MAX_SWEEP_CONFIGS} configurations.")
+
+    try:
+        return await run_sweep(load_eval_file(ds_path), alphas=req.alphas, top_ks=req.top_ks,
+                               pools=req.candidate_pools, index_specs=req.index_types,
+                               fusions=req.fusions)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# -------------------------
+# 6) Per-item details (NDJSON, streamed)
+# -------------------------
+@router.get("/{evaluation_id}/items.ndjson")
+async def export_evaluation_items(evaluation_id: int):
+    async with async_session() as session:
+        ev = await session.get(Evaluation, evaluation_id)
+    if ev is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found.")
+
+    legacy = (ev.results or {}).get("details")
+    if legacy:
+        # evaluations run before per-item storage kept details in `results`
+        async def legacy_rows():
+            for i, d in enumerate(legacy):
+                hits = d.get("retrieved_chunks") or []
+                yield {
+                    "evaluation_id": evaluation_id,
+                    "item_index": i,
+                    "question": d.get("question"),
+                    "expected": d.get("expected"),
+                    "answer": d.get("answer"),
+                    "score": d.get("score"),
+                    "chunk_ids": [h.get("chunk_id") for h in hits],
+                    "chunk_scores": [h.get("score") for h in hits],
+                    "error": d.get("error"),
+                }
+        return ndjson_response(legacy_rows(), lambda row: row, f"evaluation_{evaluation_id}_items.ndjson")
+
+    stmt = (select(EvaluationItem)
+            .where(EvaluationItem.evaluation_id == evaluation_id)
+            .order_by(EvaluationItem.item_index))
+    return ndjson_response(
+        stream_rows(stmt),
+        lambda item: item.model_dump(),
+        f"evaluation_{evaluation_id}_items.ndjson",
+    )
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+import asyncio
 import os
 from pathlib import Path
 import shutil
+from typing import List
 
+from pydantic import BaseModel, Field
+
+from app.core.rag_engine import hybrid_search_db
 from app.services import lora_loader
+from app.services.jwt_handler import auth_required
+from app.services.generator import (
+    get_prefix_cache_stats,
+    get_speculative_stats,
+    benchmark_speculative,
+)
 
 router = APIRouter(prefix="/lora", tags=["LoRA"])
 
@@ -79,4 +90,42 @@ async def status():
     """
     See if LoRA is active.
     """
-    return lora_loader.get_lora_status()
+    return {
+        **lora_loader.get_lora_status(),
+        "prefix_cache": get_prefix_cache_stats(),
+    }
+
+
+@router.get("/speculative")
+async def speculative_stats():
+    """
+    Running decode stats for plain vs speculative (draft model) generation:
+    tokens/sec, acceptance rate and the resulting speedup.
+    """
+    return get_speculative_stats()
+
+
+class SpeculativeBenchmark(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=32)
+    max_new_tokens: int = Field(64, ge=1, le=256)
+
+
+@router.post("/speculative/benchmark")
+async def speculative_benchmark(body: SpeculativeBenchmark, user=Depends(auth_required)):
+    """
+    Decode each question (with its retrieved context) with and without
+    the draft model and compare. Runs in a worker thread so other requests
+    keep being served.
+    """
+    if lora_loader.get_draft_model() is None:
+        raise HTTPException(status_code=400, detail="No draft model loaded. Set LORA_DRAFT_MODEL.")
+
+    items = []
+    for q in body.questions:
+        hits = await hybrid_search_db(q, top_k=5, alpha=0.1)
+        items.append((q, hits))
+
+    try:
+        return await asyncio.to_thread(benchmark_speculative, items, max_new_tokens=body.max_new_tokens)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
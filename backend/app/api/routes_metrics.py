@@ -0,0 +1,13 @@
+# backend/app/api/routes_metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.metrics import render
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of this worker's metrics."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
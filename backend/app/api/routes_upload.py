@@ -1,7 +1,9 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
+from typing import Dict, Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends, Response
 import os
 import shutil
 from app.services.indexer import index_pdf_background
+from app.services.profiling import new_profile_id, profile_opt_in, profiled_task, run_profiled
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
@@ -13,7 +15,26 @@ FRONTEND_POLICIES_DIR = os.getenv("FRONTEND_POLICIES_DIR", f"{DATA_DIR}/policies
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(FRONTEND_POLICIES_DIR, exist_ok=True)
 @router.post("/")
-async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_pdf(
+    background_tasks: BackgroundTasks,
+    response: Response,
+    file: UploadFile = File(...),
+    profile_user: Optional[Dict] = Depends(profile_opt_in),
+):
+    """
+    With `?profile=1` / `X-Profile: 1` and an admin token the upload is profiled
+    as <id> and its background indexing as <id>-index (see app/services/profiling.py).
+    """
+    profile_id = new_profile_id() if profile_user else None
+    return await run_profiled(
+        "upload", profile_user, response,
+        _store_and_schedule(background_tasks, file, profile_user, profile_id),
+        profile_id=profile_id,
+    )
+
+
+async def _store_and_schedule(background_tasks: BackgroundTasks, file: UploadFile,
+                              profile_user: Optional[Dict], profile_id: Optional[str]):
     try:
         file_id = file.filename.split(".")[0]
         file_path = f"{UPLOAD_DIR}/{file.filename}"
@@ -24,7 +45,11 @@ async def upload_pdf(background_tasks: BackgroundTasks, file: UploadFile = File(
         # ABSOLUTE COPY
         shutil.copy(file_path, os.path.join(FRONTEND_POLICIES_DIR, file.filename))
 
-        background_tasks.add_task(index_pdf_background, file_path, file_id)
+        if profile_id:
+            background_tasks.add_task(profiled_task, f"{profile_id}-index", "upload_index",
+                                      profile_user, index_pdf_background, file_path, file_id)
+        else:
+            background_tasks.add_task(index_pdf_background, file_path, file_id)
 
         return {
             "status": "success",
@@ -7,32 +7,29 @@ Provides:
 - PDF loading: load_pdf_pages(...)
 - Semantic-aware chunker: paragraph_split(...) and chunk_page_semantic(...)
 - Legacy file-based helpers (load/save FAISS, metadata)
-- Async DB-backed hybrid search: hybrid_search_db(...)
+- Cached retrieval snapshot: get_retrieval_snapshot(), invalidate_retrieval_snapshot()
+- Async DB-backed hybrid search: hybrid_search_db(...), hybrid_search_batch(...)
 - Context builder: build_context(...)
 """
 
 import os
+import asyncio
 import json
 import re
+import time
 import unicodedata
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, TYPE_CHECKING
 from datetime import datetime
 
 import numpy as np
-import faiss
-
-# PDF libs - prefer PyMuPDF (fitz)
-try:
-    import fitz  # PyMuPDF
-    _HAS_FITZ = True
-except Exception:
-    _HAS_FITZ = False
-    try:
-        from PyPDF2 import PdfReader
-    except Exception:
-        PdfReader = None
 
-from rank_bm25 import BM25Okapi
+from app.services.stub_models import STUB_MODELS
+from app.utils.metrics import observe_stage_ms, record_cache
+
+# faiss, rank_bm25 and the PDF libs are imported on first use so that
+# importing the app (admin workers, CLIs) does not pay for them
+if TYPE_CHECKING:
+    import faiss
 
 # -------------------------
 # Config / paths
@@ -42,6 +39,8 @@ FAISS_INDEX_PATH = os.path.join(DATA_DIR, "faiss.index")
 METADATA_PATH = os.path.join(DATA_DIR, "chunk_metadata.json")
 BM25_CORPUS_PATH = os.path.join(DATA_DIR, "bm25_corpus.json")
 EMBED_DIM = int(os.getenv("EMBED_DIM", "768"))
+# torch | onnx | onnx-int8 (app/services/onnx_embedder.py)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -52,12 +51,24 @@ _embed_model = None
 def get_model(device: Optional[str] = None):
     """
     Lazy-load sentence-transformers model (BAAI/bge-base-en by default).
-    Pass device='cuda' or 'cpu' if needed.
+    Pass device='cuda' or 'cpu' if needed. RAG_STUB_MODELS=1 returns a HashEmbedder.
+    EMBED_BACKEND=onnx / onnx-int8 runs the model on onnxruntime (CPU) instead,
+    falling back to torch when that backend cannot be loaded.
     """
     global _embed_model
+    EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "BAAI/bge-base-en")
+    if _embed_model is None and STUB_MODELS:
+        from app.services.stub_models import HashEmbedder
+        print(f"[STUB] Using HashEmbedder(dim={EMBED_DIM}) instead of a sentence-transformers model")
+        _embed_model = HashEmbedder(EMBED_DIM)
+    if _embed_model is None and EMBED_BACKEND != "torch" and device in (None, "cpu"):
+        from app.services.onnx_embedder import load_onnx_embedder
+        try:
+            _embed_model = load_onnx_embedder(EMBED_MODEL_NAME, quantized=EMBED_BACKEND == "onnx-int8")
+        except Exception as e:
+            print(f"[EMBED] {EMBED_BACKEND} backend unavailable, using sentence-transformers: {e}")
     if _embed_model is None:
         from sentence_transformers import SentenceTransformer
-        EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "BAAI/bge-base-en")
         if device:
             _embed_model = SentenceTransformer(EMBED_MODEL_NAME, device=device)
         else:
@@ -101,13 +112,21 @@ def load_pdf_pages(pdf_path: str) -> List[str]:
     """
     Return list of page texts. Uses PyMuPDF if available (faster), otherwise PyPDF2.
     """
-    if _HAS_FITZ:
+    # PDF libs - prefer PyMuPDF (fitz)
+    try:
+        import fitz  # PyMuPDF
+    except Exception:
+        fitz = None
+
+    if fitz is not None:
         doc = fitz.open(pdf_path)
         pages = [page.get_text() or "" for page in doc]
         doc.close()
         return pages
     else:
-        if PdfReader is None:
+        try:
+            from PyPDF2 import PdfReader
+        except Exception:
             raise RuntimeError("No PDF backend available (install PyMuPDF or PyPDF2).")
         reader = PdfReader(pdf_path)
         pages = []
@@ -260,61 +279,65 @@ def load_bm25_corpus() -> List[List[str]]:
             return json.load(f)
     return []
 
-def save_faiss_index(index: faiss.Index, path: str):
+def save_faiss_index(index: "faiss.Index", path: str):
+    import faiss
     faiss.write_index(index, path)
 
-def load_faiss_index(path: Optional[str] = None) -> faiss.Index:
+def load_faiss_index(path: Optional[str] = None) -> "faiss.Index":
+    import faiss
     p = path or FAISS_INDEX_PATH
     if os.path.exists(p):
         return faiss.read_index(p)
     return faiss.IndexFlatIP(EMBED_DIM)
 
 # -------------------------
-# Async DB-backed hybrid search
+# Retrieval snapshot (cached across queries)
 # -------------------------
-async def hybrid_search_db(query: str, top_k: int = 5, alpha: float = 0.6,
-                           model_device: Optional[str] = None) -> List[Dict]:
-    """
-    DB-backed hybrid search:
-    - loads latest FaissIndexRegistry (via repo)
-    - loads FAISS index file
-    - fetches chunks (from chunks table) and builds BM25
-    - runs FAISS + BM25 and returns aligned results (uses faiss_to_chunk_ids mapping if present)
-    """
+_snapshot: Optional[Dict] = None
+_snapshot_lock = asyncio.Lock()
+
+
+def invalidate_retrieval_snapshot():
+    """Force the next search to rebuild the snapshot (called after indexing/merging)."""
+    global _snapshot
+    _snapshot = None
+
+
+async def _latest_registry_id(session=None) -> Optional[int]:
+    from app.db.session import async_session
+    from sqlmodel import select
+    from app.models.models import FaissIndexRegistry
+
+    q = select(FaissIndexRegistry.id).order_by(FaissIndexRegistry.created_at.desc()).limit(1)
+    if session is not None:
+        return (await session.execute(q)).scalars().first()
+    async with async_session() as own_session:
+        return (await own_session.execute(q)).scalars().first()
+
+
+async def _build_retrieval_snapshot() -> Optional[Dict]:
     # lazy imports to avoid circular startup issues
     try:
-        from app.repos.repo_rag import get_latest_faiss
+        from app.repos.repo_rag import get_all_faiss_registries
         from app.db.session import async_session
         from sqlmodel import select
         from app.models.models import Chunk
+        from app.services.chunk_text import chunk_text, ensure_text_dictionaries
     except Exception:
         raise RuntimeError("Database layer imports failed. Ensure app.repos.repo_rag and app.db.session exist.")
 
-    # 1) get registry
-        # 1) get registry — use the latest global registry if present
-    from app.repos.repo_rag import get_all_faiss_registries
-
     regs = await get_all_faiss_registries()
-    # Load Document rows so we can map doc_id → file_name
-    from app.models.models import Document
-
-    async with async_session() as session:
-        q = select(Document)
-        docs_res = await session.execute(q)
-        docs = docs_res.scalars().all()
-
     if not regs:
         # nothing indexed at all
-        return []
+        return None
 
     # The last registry entry is the most recent; when you run the manual merge,
     # it will append a global registry as the newest row. Use that.
     registry = regs[-1]
 
-
     # registry might use different attribute names depending on your model version
     faiss_path = getattr(registry, "file_path", None) or getattr(registry, "faiss_path", None)
-    index = load_faiss_index(faiss_path)
+    index = await asyncio.to_thread(load_faiss_index, faiss_path)
 
     # mapping: faiss_index_pos -> chunk_id (may be stored under many names)
     mapping = getattr(registry, "faiss_to_chunk_ids", None) \
@@ -324,23 +347,18 @@ async def hybrid_search_db(query: str, top_k: int = 5, alpha: float = 0.6,
               or getattr(registry, "faiss_mapping", None) \
               or []
 
-    # If mapping is falsy or empty, fallback to sequential chunk ids from DB
-    # after registry load
-    if not mapping:
-    # fallback (not ideal). We'll pull all chunks ordered by id ASC
-        async with async_session() as session:
+    await ensure_text_dictionaries()
+    async with async_session() as session:
+        if mapping:
+            q = select(Chunk).where(Chunk.id.in_(mapping))
+        else:
+            # fallback (not ideal): sequential chunk ids from DB
             q = select(Chunk).order_by(Chunk.id)
-            res = await session.execute(q)
-            rows = res.scalars().all()
+        res = await session.execute(q)
+        rows = res.scalars().all()
+    if not mapping:
         mapping = [r.id for r in rows]
 
-
-    # 2) fetch chunk rows for all IDs in mapping
-    async with async_session() as session:
-        q = select(Chunk).where(Chunk.id.in_(mapping))
-        result = await session.execute(q)
-        rows = result.scalars().all()
-
     # Build id -> row map and ordered_chunks in same order as mapping
     id_to_row = {r.id: r for r in rows}
     ordered_chunks = []
@@ -353,7 +371,9 @@ async def hybrid_search_db(query: str, top_k: int = 5, alpha: float = 0.6,
                 "page": getattr(r, "page", None),
                 "start_char": getattr(r, "start_char", None),
                 "end_char": getattr(r, "end_char", None),
-                "text": r.text or ""
+                "text": chunk_text(r),
+                "token_ids": getattr(r, "token_ids", None),
+                "tokenizer_key": getattr(r, "tokenizer_key", None),
             })
         else:
             ordered_chunks.append({
@@ -365,82 +385,288 @@ async def hybrid_search_db(query: str, top_k: int = 5, alpha: float = 0.6,
                 "text": ""
             })
 
-    # BM25 corpus in the same order as mapping
-    token_lists = [clean_and_tokenize(c["text"]) for c in ordered_chunks]
-    bm25 = BM25Okapi(token_lists) if token_lists else None
+    # BM25 corpus in the same order as mapping (CPU heavy, keep it off the event loop)
+    def _build_bm25():
+        from rank_bm25 import BM25Okapi
+        token_lists = [clean_and_tokenize(c["text"]) for c in ordered_chunks]
+        return BM25Okapi(token_lists) if token_lists else None
+
+    bm25 = await asyncio.to_thread(_build_bm25)
+
+    return {
+        "registry_id": registry.id,
+        "index": index,
+        "mapping": list(mapping),
+        "chunks": ordered_chunks,
+        "chunk_by_id": {c["id"]: c for c in ordered_chunks},
+        "bm25": bm25,
+        "built_at": datetime.utcnow(),
+    }
+
+
+async def get_retrieval_snapshot(session=None) -> Optional[Dict]:
+    """
+    FAISS index, chunk mapping/rows and BM25 for the latest registry.
+    Built once and reused until a newer registry appears (one cheap id
+    lookup per call, on `session` if given) or invalidate_retrieval_snapshot() is called.
+    """
+    global _snapshot
+    latest_id = await _latest_registry_id(session)
+    if latest_id is None:
+        return None
+    snap = _snapshot
+    if snap is not None and snap["registry_id"] == latest_id:
+        return snap
+    async with _snapshot_lock:
+        if _snapshot is None or _snapshot["registry_id"] != latest_id:
+            _snapshot = await _build_retrieval_snapshot()
+        return _snapshot
+
+
+# -------------------------
+# Async DB-backed hybrid search
+# -------------------------
+# Each retriever contributes RAG_CANDIDATE_MULT * top_k candidates (unless the
+# caller passes candidate_pool); RAG_FUSION picks how they are combined:
+# "weighted" = alpha * semantic + (1 - alpha) * BM25 after min-max over the
+# candidates, "rrf" = alpha / (RAG_RRF_K + semantic rank) + (1 - alpha) / (RAG_RRF_K + BM25 rank).
+RAG_FUSION = os.getenv("RAG_FUSION", "weighted")
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+RAG_CANDIDATE_MULT = int(os.getenv("RAG_CANDIDATE_MULT", "10"))
+FUSION_METHODS = ("weighted", "rrf")
+
+
+def candidate_pool_size(top_k: int, candidate_pool: Optional[int] = None) -> int:
+    return max(candidate_pool or RAG_CANDIDATE_MULT * top_k, top_k)
+
+
+async def hybrid_search_db(query: str, top_k: int = 5, alpha: float = 0.6,
+                           model_device: Optional[str] = None,
+                           timings: Optional[Dict] = None,
+                           cache_info: Optional[Dict] = None,
+                           session=None,
+                           candidate_pool: Optional[int] = None,
+                           fusion: Optional[str] = None) -> List[Dict]:
+    """
+    DB-backed hybrid search over the cached retrieval snapshot:
+    - runs FAISS + BM25 and returns aligned results (uses faiss_to_chunk_ids mapping if present)
+    - each hit carries the raw cosine (sem_raw) and BM25 (bm_raw) scores next to the
+      normalized ones, so callers can apply absolute thresholds
+    - pass a dict as `timings` to receive per-stage durations in ms, and one as
+      `cache_info` to learn whether the cached retrieval snapshot was reused
+    - pass the request's `session` (app.db.session.get_session) to avoid opening a new one
+    - FAISS and BM25 each contribute `candidate_pool` candidates (default:
+      RAG_CANDIDATE_MULT * top_k); every candidate is scored by both retrievers
+      before `fusion` ("weighted" or "rrf", default RAG_FUSION) keeps the best top_k
+    """
+    pool = candidate_pool_size(top_k, candidate_pool)
+    if timings is None:
+        timings = {}
+    t0 = time.perf_counter()
+
+    previous = _snapshot
+    snap = await get_retrieval_snapshot(session)
+    snapshot_hit = snap is not None and snap is previous
+    if cache_info is not None:
+        cache_info["retrieval_snapshot_hit"] = snapshot_hit
+    record_cache("retrieval_snapshot", snapshot_hit)
+    t1 = time.perf_counter()
+    timings["snapshot_ms"] = (t1 - t0) * 1000
+    if snap is None:
+        observe_stage_ms(timings, ["snapshot"])
+        return []
 
     # semantic search (FAISS)
     model = get_model(device=model_device) if model_device is not None else get_model()
     q_emb = model.encode([query], normalize_embeddings=True, convert_to_numpy=True).astype("float32")
+    t2 = time.perf_counter()
+    timings["embed_ms"] = (t2 - t1) * 1000
 
+    sem_pos, sem_raw = semantic_top(snap["index"], q_emb, pool)
+    t3 = time.perf_counter()
+    timings["faiss_ms"] = (t3 - t2) * 1000
+
+    bm_scores = lexical_scores(snap["bm25"], query)
+    lex_pos = top_positions(bm_scores, pool)
+    t4 = time.perf_counter()
+    timings["bm25_ms"] = (t4 - t3) * 1000
+
+    results = fuse_hits(snap, q_emb[0], sem_pos[0], sem_raw[0], lex_pos, bm_scores, alpha, top_k, fusion)
+    timings["fusion_ms"] = (time.perf_counter() - t4) * 1000
+    observe_stage_ms(timings, ["snapshot", "embed", "faiss", "bm25", "fusion"])
+    return results
+
+
+async def hybrid_search_batch(queries: List[str], top_k: int = 5, alpha: float = 0.6,
+                              session=None, candidate_pool: Optional[int] = None,
+                              fusion: Optional[str] = None) -> List[List[Dict]]:
+    """
+    hybrid_search_db for many queries at once (evaluation, sweeps): one
+    snapshot lookup, one batched encode and one FAISS search for the whole
+    batch; BM25 and fusion run per query. All of it runs off the event loop.
+    """
+    if not queries:
+        return []
+    pool = candidate_pool_size(top_k, candidate_pool)
+    snap = await get_retrieval_snapshot(session)
+    if snap is None:
+        return [[] for _ in queries]
+
+    def _run():
+        q_emb = get_model().encode(list(queries), normalize_embeddings=True,
+                                   convert_to_numpy=True).astype("float32")
+        sem_pos, sem_raw = semantic_top(snap["index"], q_emb, pool)
+        results = []
+        for i, q in enumerate(queries):
+            bm_scores = lexical_scores(snap["bm25"], q)
+            results.append(fuse_hits(snap, q_emb[i], sem_pos[i], sem_raw[i],
+                                     top_positions(bm_scores, pool), bm_scores, alpha, top_k, fusion))
+        return results
+
+    return await asyncio.to_thread(_run)
+
+
+def semantic_top(index, q_emb: np.ndarray, pool: int) -> Tuple[np.ndarray, np.ndarray]:
+    """FAISS top `pool` per query: (positions, cosines), both [n_queries, pool]; -1 pads short rows."""
     if index.ntotal == 0:
-        sem_scores_map = {}
-    else:
-        D, I = index.search(q_emb, top_k)
-        sem_idxs = [int(i) for i in I[0] if i >= 0]
-        sem_scores_raw = [float(s) for s in D[0] if s is not None]
-        sem_scores_map = {}
-        if sem_scores_raw:
-            smin, smax = min(sem_scores_raw), max(sem_scores_raw)
-            denom = (smax - smin) if smax != smin else 1.0
-            for idx_pos, raw_score in zip(sem_idxs, sem_scores_raw):
-                if idx_pos < len(mapping):
-                    chunk_id = mapping[idx_pos]
-                    sem_scores_map[chunk_id] = (raw_score - smin) / denom
+        return np.full((len(q_emb), 0), -1, dtype="int64"), np.empty((len(q_emb), 0), dtype="float32")
+    D, I = index.search(q_emb, pool)
+    return I, D
 
-    # lexical (BM25) -> positions correspond to mapping positions
-    lex_scores_map = {}
-    if bm25 is not None:
-        qtok = clean_and_tokenize(query)
-        bm_scores = bm25.get_scores(qtok)
-        top_bm_pos = np.argsort(bm_scores)[::-1][:top_k]
-        if len(top_bm_pos) > 0:
-            bm_vals = [float(bm_scores[i]) for i in top_bm_pos]
-            bmin, bmax = min(bm_vals), max(bm_vals)
-            denom = (bmax - bmin) if bmax != bmin else 1.0
-            for pos in top_bm_pos:
-                if pos < len(mapping):
-                    chunk_id = mapping[int(pos)]
-                    lex_scores_map[chunk_id] = (float(bm_scores[int(pos)]) - bmin) / denom
 
-    # combine candidate chunk_ids
-    candidate_chunk_ids = set(list(sem_scores_map.keys()) + list(lex_scores_map.keys()))
-    results = []
-    for cid in candidate_chunk_ids:
-        s = sem_scores_map.get(cid, 0.0)
-        b = lex_scores_map.get(cid, 0.0)
-        final = float(alpha * s + (1.0 - alpha) * b)
-        meta = next((c for c in ordered_chunks if c["id"] == cid), {"doc_id":"unknown","page":-1,"text":""})
-        # Map doc_id → file_name
-        doc_row = next((d for d in docs if d.doc_id == meta.get("doc_id")), None)
-        file_name = None
-        if doc_row and doc_row.file_path:
-            file_name = os.path.basename(doc_row.file_path)
-
-            entry = {
-        "chunk_id": cid,
-        "doc_id": meta.get("doc_id"),
-        "file_name": f"{meta.get('doc_id')}.pdf",  
-        "page": meta.get("page"),
-        "start_char": meta.get("start_char"),
-        "end_char": meta.get("end_char"),
-        "text": meta.get("text"),
-        "sem_score": float(s),
-        "bm_score": float(b),
-        "score": final
-    }
+def candidate_cosines(index, q_vec: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Cosine of `q_vec` with the stored vectors at `positions` (pool-sized, not
+    corpus-sized). NaN when the index cannot reconstruct vectors (IVF/PQ
+    without a direct map).
+    """
+    if len(positions) == 0:
+        return np.empty(0, dtype="float32")
+    try:
+        vectors = index.reconstruct_batch(np.asarray(positions, dtype="int64"))
+    except RuntimeError:
+        return np.full(len(positions), np.nan, dtype="float32")
+    return vectors @ q_vec
 
 
-        results.append(entry)
+def lexical_scores(bm25, query: str) -> np.ndarray:
+    """BM25 score of every chunk (snapshot mapping order); empty when there is no corpus."""
+    if bm25 is None:
+        return np.empty(0)
+    return bm25.get_scores(clean_and_tokenize(query))
+
+
+def top_positions(scores: np.ndarray, pool: int) -> np.ndarray:
+    """Positions of the `pool` highest scores, best first (argpartition: O(n), not a full sort)."""
+    if pool >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, pool - 1)[:pool]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def gather_candidates(sem_pos: np.ndarray, sem_raw: np.ndarray, lex_pos: np.ndarray,
+                      lex_all: np.ndarray, index, q_vec: np.ndarray,
+                      n_mapped: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Union of both candidate lists -> (positions, cosine, BM25), aligned arrays.
+    Candidates only one retriever returned are scored by the other as well:
+    BM25 from the full score array, cosine from the index's stored vectors.
+    """
+    sem_pos = np.asarray(sem_pos, dtype="int64")
+    keep = (sem_pos >= 0) & (sem_pos < n_mapped)
+    sem_pos, sem_raw = sem_pos[keep], np.asarray(sem_raw, dtype="float32")[keep]
+    lex_pos = np.asarray(lex_pos, dtype="int64")
+    lex_pos = lex_pos[lex_pos < n_mapped]
+
+    cand = np.union1d(sem_pos, lex_pos)
+    sem = np.full(len(cand), np.nan, dtype="float32")
+    sem[np.searchsorted(cand, sem_pos)] = sem_raw
+    missing = np.isnan(sem)
+    if missing.any():
+        sem[missing] = candidate_cosines(index, q_vec, cand[missing])
+
+    lex = np.full(len(cand), np.nan, dtype="float32")
+    scored = cand < len(lex_all)
+    lex[scored] = lex_all[cand[scored]]
+    return cand, sem, lex
+
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    # unknown (NaN) scores normalize to 0
+    out = np.zeros(len(scores), dtype="float32")
+    known = ~np.isnan(scores)
+    if known.any():
+        lo, hi = scores[known].min(), scores[known].max()
+        out[known] = (scores[known] - lo) / ((hi - lo) if hi != lo else 1.0)
+    return out
+
+
+def _reciprocal_ranks(scores: np.ndarray, rrf_k: int) -> np.ndarray:
+    # 1 / (rrf_k + rank), rank 1 = best; unknown (NaN, sorted last) scores contribute 0
+    ranks = np.empty(len(scores), dtype="float32")
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    out = 1.0 / (rrf_k + ranks)
+    out[np.isnan(scores)] = 0.0
+    return out
+
+
+def fuse_scores(sem: np.ndarray, lex: np.ndarray, alpha: float, method: Optional[str] = None,
+                rrf_k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Aligned candidate scores -> (fused, normalized cosine, normalized BM25)."""
+    method = method or RAG_FUSION
+    sem_norm, lex_norm = _min_max(sem), _min_max(lex)
+    if method == "weighted":
+        fused = alpha * sem_norm + (1.0 - alpha) * lex_norm
+    elif method == "rrf":
+        k = RAG_RRF_K if rrf_k is None else rrf_k
+        fused = alpha * _reciprocal_ranks(sem, k) + (1.0 - alpha) * _reciprocal_ranks(lex, k)
+    else:
+        raise ValueError(f"Unknown fusion method {method!r}; expected one of {FUSION_METHODS}")
+    return fused, sem_norm, lex_norm
 
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:top_k]
+
+def fuse_hits(snap: Dict, q_vec: np.ndarray, sem_pos: np.ndarray, sem_raw: np.ndarray,
+              lex_pos: np.ndarray, lex_all: np.ndarray, alpha: float, top_k: int,
+              method: Optional[str] = None) -> List[Dict]:
+    """
+    One query's FAISS row (sem_pos, sem_raw), BM25 top positions and full
+    BM25 scores -> best top_k hit dicts. Cost depends on the candidate
+    pool, not on the corpus size.
+    """
+    mapping = snap["mapping"]
+    cand, sem, lex = gather_candidates(sem_pos, sem_raw, lex_pos, lex_all, snap["index"], q_vec, len(mapping))
+    fused, sem_norm, lex_norm = fuse_scores(sem, lex, alpha, method)
+
+    best = top_positions(fused, top_k)
+    results = []
+    for i in best:
+        cid = mapping[int(cand[i])]
+        meta = snap["chunk_by_id"].get(cid, {"doc_id": "unknown", "page": -1, "text": ""})
+        results.append({
+            "chunk_id": cid,
+            "doc_id": meta.get("doc_id"),
+            "file_name": f"{meta.get('doc_id')}.pdf",
+            "page": meta.get("page"),
+            "start_char": meta.get("start_char"),
+            "end_char": meta.get("end_char"),
+            "text": meta.get("text"),
+            "sem_score": float(sem_norm[i]),
+            "bm_score": float(lex_norm[i]),
+            "sem_raw": None if np.isnan(sem[i]) else float(sem[i]),
+            "bm_raw": None if np.isnan(lex[i]) else float(lex[i]),
+            "score": float(fused[i]),
+            "token_ids": meta.get("token_ids"),
+            "tokenizer_key": meta.get("tokenizer_key"),
+        })
+    return results
 
 # -------------------------
 # Legacy file-based hybrid (sync) - kept for local debugging
 # -------------------------
 def hybrid_search_legacy(query: str, top_k: int = 5, alpha: float = 0.6,
                          model_device: Optional[str] = None) -> List[Dict]:
+    from rank_bm25 import BM25Okapi
+
     metadata = load_metadata()
     token_lists = load_bm25_corpus()
     index = load_faiss_index()
@@ -1,16 +1,55 @@
-# rag_eval.py -- Part 1 (core metrics + runner)
-import rag_engine
-import json
+# backend/app/core/rag_evalution/rag_eval.py
+"""
+Retrieval evaluation over the DB-backed engine (hybrid_search_db).
+
+A sweep scores every combination of fusion method, alpha, top_k,
+candidate pool and FAISS index type against each entry's `expected_chunk_ids` (DB Chunk
+ids; rag_eval_remap.py produces them). The expensive work is shared
+across the grid, so a full sweep costs little more than one pass:
+
+- query embeddings: one batched encode for the whole dataset
+- BM25: one get_scores per query, kept (float32) so fusion can score any
+  candidate; the top max(pool) positions are kept and smaller pools are
+  prefixes of them
+- FAISS: one search per (index type, pool), timed per query
+- fusion method, alpha and top_k only re-run fusion on the cached candidates
+
+Reported latency per configuration is, per query, the amortized embed
+time + FAISS(index, pool) + BM25 + fusion.
+
+    cd backend
+    python -m app.core.rag_evalution.rag_eval_remap   # writes eval_dataset_remapped.json
+    python -m app.core.rag_evalution.rag_eval \\
+        --eval-file app/core/rag_evalution/eval_dataset_remapped.json \\
+        --alphas 0,0.1,0.3,0.5,1 --top-k 1,5,10 --pools 0,20,50 --fusions weighted,rrf \\
+        --index-types "Flat;HNSW32:efSearch=64;IVF256,Flat:nprobe=8"
+
+The CLI refuses a dataset that rag_eval_remap did not write: the
+positional chunk indices in eval_dataset.json are not DB ids and would
+score every configuration against the wrong ground truth.
+
+The same sweep runs over the uploaded dataset via POST /evaluation/retrieval-sweep.
+"""
+
 import argparse
-from typing import List, Callable, Dict, Any, Tuple
-import math
+import asyncio
+import itertools
+import json
 import os
-from rag_engine import load_metadata, load_bm25_corpus, load_faiss_index
+import time
+from typing import Any, Dict, List, Sequence
 
-print("metadata len =", len(load_metadata()))
-print("bm25 len =", len(load_bm25_corpus()))
-index = load_faiss_index()
-print("faiss vectors =", index.ntotal)
+import numpy as np
+
+from app.core.rag_engine import (
+    RAG_FUSION,
+    candidate_pool_size,
+    fuse_hits,
+    get_model,
+    get_retrieval_snapshot,
+    lexical_scores,
+    top_positions,
+)
 
 
 # ----------------------------
@@ -46,64 +85,14 @@ def r_precision(retrieved: List[int], relevant: List[int]) -> float:
         return 0.0
     return precision_at_k(retrieved, relevant, R)
 
-# ----------------------------
-# Evaluate a single query
-# ----------------------------
-def evaluate_query(query_entry: Dict[str, Any],
-                   retriever: Callable[[str, int, float], List[Dict[str, Any]]],
-                   top_k: int = 10,
-                   alpha: float = 0.6) -> Dict[str, float]:
-    """
-    query_entry example:
-      {
-        "query": "...",
-        "answer": "...",
-        "expected_chunk_ids": [12, 15]
-      }
-    retriever(query, top_k=..., alpha=...) -> list of result dicts with field 'idx' (the chunk index)
-    """
-    q = query_entry["query"]
-    expected = query_entry.get("expected_chunk_ids", [])
-    # call retriever (semantic/hybrid) - retriever must return list of dicts with 'idx'
-    results = retriever(q, top_k=top_k, alpha=alpha)
-    retrieved_ids = [r["idx"] for r in results]
-
-    # compute metrics
-    metrics = {
-        "precision@1": precision_at_k(retrieved_ids, expected, 1),
-        "precision@5": precision_at_k(retrieved_ids, expected, 5),
-        "precision@10": precision_at_k(retrieved_ids, expected, 10),
-        "recall@1": recall_at_k(retrieved_ids, expected, 1),
-        "recall@5": recall_at_k(retrieved_ids, expected, 5),
-        "recall@10": recall_at_k(retrieved_ids, expected, 10),
-        "mrr@10": mrr_at_k(retrieved_ids, expected, 10),
-        "r_precision": r_precision(retrieved_ids, expected)
+def query_metrics(retrieved: List[int], relevant: List[int], k: int) -> Dict[str, float]:
+    return {
+        "precision@1": precision_at_k(retrieved, relevant, 1),
+        "recall@k": recall_at_k(retrieved, relevant, k),
+        "mrr@k": mrr_at_k(retrieved, relevant, k),
+        "r_precision": r_precision(retrieved, relevant),
     }
-    return metrics
 
-# ----------------------------
-# Evaluate entire dataset
-# ----------------------------
-def evaluate_dataset(dataset: List[Dict[str, Any]],
-                     retriever: Callable[[str, int, float], List[Dict[str, Any]]],
-                     top_k: int = 10,
-                     alpha: float = 0.6) -> Dict[str, float]:
-    """
-    Returns aggregated (mean) metrics across dataset.
-    """
-    agg = {k: 0.0 for k in ["precision@1","precision@5","precision@10",
-                            "recall@1","recall@5","recall@10","mrr@10","r_precision"]}
-    n = len(dataset)
-    if n == 0:
-        return {k: 0.0 for k in agg}
-    for entry in dataset:
-        m = evaluate_query(entry, retriever, top_k=top_k, alpha=alpha)
-        for k, v in m.items():
-            agg[k] += v
-    # mean
-    for k in agg:
-        agg[k] /= float(n)
-    return agg
 
 # ----------------------------
 # Small helper: load eval dataset (json)
@@ -113,43 +102,181 @@ def load_eval_file(path: str) -> List[Dict[str, Any]]:
         data = json.load(f)
     return data
 
+
+def _latency(samples: List[float]) -> Dict[str, float]:
+    a = np.asarray(samples, dtype="float64")
+    return {
+        "mean_ms": round(float(a.mean()), 3),
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+    }
+
+
+# ----------------------------
+# Parameter sweep
+# ----------------------------
+def _sweep(snap: Dict, dataset: List[Dict], alphas: Sequence[float], top_ks: Sequence[int],
+           pools: Sequence[int], index_specs: Sequence[str], fusions: Sequence[str]) -> Dict:
+    from app.utils.faiss_store import build_index, index_vectors, parse_index_spec, set_search_params
+
+    queries = [d["query"] for d in dataset]
+    expected = [list(d["expected_chunk_ids"]) for d in dataset]
+    n = len(queries)
+
+    def effective(pool: int, k: int) -> int:
+        # pool 0 = hybrid_search_db's default (RAG_CANDIDATE_MULT * top_k)
+        return candidate_pool_size(k, pool)
+
+    pool_sizes = sorted({effective(p, k) for p in pools for k in top_ks})
+
+    t0 = time.perf_counter()
+    q_emb = get_model().encode(queries, normalize_embeddings=True, convert_to_numpy=True).astype("float32")
+    embed_ms = (time.perf_counter() - t0) * 1000 / n
+
+    bm_all, bm_top, bm_ms = [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        scores = lexical_scores(snap["bm25"], q)
+        bm_top.append(top_positions(scores, pool_sizes[-1]))
+        bm_ms.append((time.perf_counter() - t0) * 1000)
+        bm_all.append(scores.astype("float32"))
+
+    vectors = None
+    configs = []
+    for spec in index_specs:
+        factory, params = parse_index_spec(spec)
+        build_sec = 0.0
+        if factory.lower() == "flat" and not params:
+            index = snap["index"]  # what production searches
+        else:
+            if vectors is None:
+                vectors = index_vectors(snap["index"])
+            t0 = time.perf_counter()
+            index = build_index(vectors, factory)
+            build_sec = time.perf_counter() - t0
+            set_search_params(index, params)
+
+        sem_by_pool = {}
+        for size in pool_sizes:
+            rows, ms = [], []
+            for i in range(n):
+                t0 = time.perf_counter()
+                D, I = index.search(q_emb[i:i + 1], size)
+                ms.append((time.perf_counter() - t0) * 1000)
+                rows.append((I[0], D[0]))
+            sem_by_pool[size] = (rows, ms)
+
+        done = set()
+        for pool in pools:
+            for k in top_ks:
+                size = effective(pool, k)
+                if (size, k) in done:
+                    continue
+                done.add((size, k))
+                sem_rows, faiss_ms = sem_by_pool[size]
+                for fusion, alpha in itertools.product(fusions, alphas):
+                    totals = {"precision@1": 0.0, "recall@k": 0.0, "mrr@k": 0.0, "r_precision": 0.0}
+                    latencies = []
+                    for i in range(n):
+                        t0 = time.perf_counter()
+                        hits = fuse_hits(snap, q_emb[i], *sem_rows[i], bm_top[i][:size], bm_all[i],
+                                         alpha, k, fusion)
+                        fusion_ms = (time.perf_counter() - t0) * 1000
+                        latencies.append(embed_ms + faiss_ms[i] + bm_ms[i] + fusion_ms)
+                        for name, v in query_metrics([h["chunk_id"] for h in hits], expected[i], k).items():
+                            totals[name] += v
+                    configs.append({
+                        "index": spec,
+                        "fusion": fusion,
+                        "alpha": alpha,
+                        "top_k": k,
+                        "candidate_pool": size,
+                        **{name: round(v / n, 4) for name, v in totals.items()},
+                        "latency": _latency(latencies),
+                        "index_build_sec": round(build_sec, 3),
+                    })
+
+    configs.sort(key=lambda c: (-c["recall@k"], -c["mrr@k"], c["latency"]["mean_ms"]))
+    return {
+        "queries": n,
+        "embed_ms_per_query": round(embed_ms, 3),
+        "bm25_ms": _latency(bm_ms),
+        "configs": configs,
+    }
+
+
+async def run_sweep(dataset: List[Dict[str, Any]], alphas: Sequence[float] = (0.1,),
+                    top_ks: Sequence[int] = (5,), pools: Sequence[int] = (0,),
+                    index_specs: Sequence[str] = ("Flat",),
+                    fusions: Sequence[str] = (RAG_FUSION,)) -> Dict:
+    """
+    Evaluate the grid fusions x alphas x top_ks x pools x index_specs on
+    entries that have expected_chunk_ids. Configs come back best first (recall, MRR, latency).
+    """
+    labelled = [d for d in dataset if d.get("expected_chunk_ids")]
+    if not labelled:
+        raise ValueError("No dataset entries with expected_chunk_ids (run rag_eval_remap first).")
+    snap = await get_retrieval_snapshot()
+    if snap is None:
+        raise RuntimeError("Nothing indexed yet.")
+    result = await asyncio.to_thread(_sweep, snap, labelled, list(alphas), list(top_ks),
+                                     list(pools), list(index_specs), list(fusions))
+    result["skipped_unlabelled"] = len(dataset) - len(labelled)
+    return result
+
+
 # ----------------------------
 # CLI: run evaluation
 # ----------------------------
+def print_report(result: Dict, limit: int = 30):
+    print(f"=== Retrieval sweep: {result['queries']} queries "
+          f"(embed {result['embed_ms_per_query']}ms/query, bm25 p50 {result['bm25_ms']['p50_ms']}ms) ===")
+    print(f"{'index':<24} {'fusion':<8} {'alpha':>5} {'k':>3} {'pool':>5} {'P@1':>6} {'R@k':>6} {'MRR@k':>6} "
+          f"{'mean ms':>8} {'p95 ms':>8}")
+    for c in result["configs"][:limit]:
+        print(f"{c['index']:<24} {c['fusion']:<8} {c['alpha']:>5} {c['top_k']:>3} {c['candidate_pool']:>5} "
+              f"{c['precision@1']:>6.3f} {c['recall@k']:>6.3f} {c['mrr@k']:>6.3f} "
+              f"{c['latency']['mean_ms']:>8.2f} {c['latency']['p95_ms']:>8.2f}")
+
+
 def cli_main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--eval-file", type=str, default="eval_dataset.json",
-                        help="Path to evaluation JSON file (list of query objects).")
-    parser.add_argument("--top-k", type=int, default=10)
-    parser.add_argument("--alpha", type=float, default=0.6, help="Alpha for hybrid retriever when used.")
-    parser.add_argument("--run-eval", action="store_true", help="Execute evaluation using retrievers from rag_engine.")
-    parser.add_argument("--mode", choices=["semantic","hybrid"], default="hybrid",
-                        help="Which retriever to evaluate: semantic only or hybrid.")
+    parser.add_argument("--eval-file", type=str, default="app/core/rag_evalution/eval_dataset_remapped.json",
+                        help="Path to evaluation JSON file (list of {query, expected_chunk_ids}).")
+    parser.add_argument("--alphas", default="0.1", help="Comma-separated alphas (1 = semantic only, 0 = BM25 only).")
+    parser.add_argument("--top-k", default="5", help="Comma-separated top_k values.")
+    parser.add_argument("--pools", default="0", help="Comma-separated candidate pool sizes (0 = RAG_CANDIDATE_MULT x top_k).")
+    parser.add_argument("--fusions", default=RAG_FUSION, help="Comma-separated fusion methods: weighted, rrf.")
+    parser.add_argument("--index-types", default="Flat",
+                        help='Semicolon-separated faiss specs, e.g. "Flat;HNSW32:efSearch=64;IVF256,Flat:nprobe=8".')
+    parser.add_argument("--limit", type=int, default=30, help="Rows to print.")
+    parser.add_argument("--json", type=str, default="", help="Also write the full result to this file.")
     args = parser.parse_args()
 
-    if not args.run_eval:
-        print("No action. Use --run-eval to execute evaluation.")
-        return
-
-    # lazy import of your rag engine to avoid heavy imports when module is loaded
-    try:
-        import rag_engine
-    except Exception as e:
-        print("Failed to import rag_engine.py from the current directory:", e)
-        return
+    from pathlib import Path
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).resolve().parents[3] / ".env")
 
+    remap_hint = ("Run `python -m app.core.rag_evalution.rag_eval_remap` first to map it to DB chunk ids, "
+                  "or pass --eval-file.")
+    if not os.path.exists(args.eval_file):
+        raise SystemExit(f"{args.eval_file} not found. {remap_hint}")
     data = load_eval_file(args.eval_file)
-    # choose retriever wrapper
-    if args.mode == "hybrid":
-        retriever = lambda q, top_k, alpha: rag_engine.hybrid_search(q, top_k=top_k, alpha=alpha)
-    else:
-        # semantic-only wrapper: call hybrid_search with alpha=1.0 (pure semantic) OR directly use faiss search if you have one.
-        retriever = lambda q, top_k, alpha: rag_engine.hybrid_search(q, top_k=top_k, alpha=1.0)
-
-    agg = evaluate_dataset(data, retriever, top_k=args.top_k, alpha=args.alpha)
-    print("=== Evaluation summary ===")
-    for k, v in agg.items():
-        print(f"{k}: {v:.4f}")
+    if any(d.get("expected_chunk_ids") and "remapped_at" not in d for d in data):
+        raise SystemExit(f"{args.eval_file} holds legacy positional chunk indices, not DB chunk ids. {remap_hint}")
+    result = asyncio.run(run_sweep(
+        data,
+        alphas=[float(a) for a in args.alphas.split(",") if a],
+        top_ks=[int(k) for k in args.top_k.split(",") if k],
+        pools=[int(p) for p in args.pools.split(",") if p],
+        index_specs=[spec.strip() for spec in args.index_types.split(";") if spec.strip()],
+        fusions=[f for f in args.fusions.split(",") if f],
+    ))
+    print_report(result, args.limit)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved {args.json}")
 
 if __name__ == "__main__":
     cli_main()
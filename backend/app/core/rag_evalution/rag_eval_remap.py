@@ -1,41 +1,118 @@
-import sys, os
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# backend/app/core/rag_evalution/rag_eval_remap.py
+"""
+Map eval answers to DB chunk ids (`expected_chunk_ids` for rag_eval.py).
 
-from rag_engine import load_metadata
+For each entry the expected answer (or the query, when there is no
+answer) must occur in the chunk text; if no chunk contains it, chunks
+containing all of the answer's first three words longer than 3 chars
+match instead. Matching is case- and whitespace-insensitive. Entries
+that match nothing get no expected_chunk_ids (their legacy positional
+indices are not DB ids), and every entry is stamped with `remapped_at`
+so rag_eval.py can tell a remapped file from a legacy one.
+
+All answers, queries and fallback words go into one Aho-Corasick
+automaton and the Chunk table is streamed through it once, so the cost
+is linear in corpus size instead of entries x chunks x text length.
+
+    cd backend
+    python -m app.core.rag_evalution.rag_eval_remap \\
+        --in app/core/rag_evalution/eval_dataset.json \\
+        --out app/core/rag_evalution/eval_dataset_remapped.json
+"""
+
+import argparse
+import asyncio
 import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from app.utils.aho_corasick import build_matcher
+
+
+def _norm(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _fallback_tokens(answer: str) -> List[str]:
+    return [t for t in answer.split() if len(t) > 3][:3]
+
+
+async def remap_entries(entries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict]:
+    from sqlmodel import select
+    from app.models.models import Chunk
+    from app.services.chunk_text import chunk_text, ensure_text_dictionaries
+    from app.utils.pagination import stream_rows
+
+    # pattern table: one slot per distinct normalized string
+    slots: Dict[str, int] = {}
+    def slot(p: str) -> int:
+        return slots.setdefault(p, len(slots))
+
+    plans = []
+    for entry in entries:
+        answer = _norm(entry.get("answer", ""))
+        primary = answer or _norm(entry.get("query", ""))
+        tokens = _fallback_tokens(answer)
+        plans.append((
+            slot(primary) if primary else None,
+            [slot(t) for t in tokens],
+        ))
+
+    patterns = list(slots)  # insertion order == slot index
+    find = build_matcher(patterns)
+
+    t0 = time.perf_counter()
+    hits: List[List[int]] = [[] for _ in patterns]
+    n_chunks = 0
+    await ensure_text_dictionaries()
+    async for row in stream_rows(select(Chunk).order_by(Chunk.id)):
+        n_chunks += 1
+        for i in find(_norm(chunk_text(row))):
+            hits[i].append(row.id)
+    scan_sec = time.perf_counter() - t0
+
+    remapped_at = datetime.utcnow().isoformat(timespec="seconds")
+    out, matched, fallback = [], 0, 0
+    for entry, (primary, token_slots) in zip(entries, plans):
+        found = hits[primary] if primary is not None else []
+        if not found and token_slots:
+            common = set(hits[token_slots[0]])
+            for s in token_slots[1:]:
+                common &= set(hits[s])
+            found = sorted(common)
+            fallback += bool(found)
+        matched += bool(found)
+        out.append({**entry, "expected_chunk_ids": list(found), "remapped_at": remapped_at})
+
+    stats = {
+        "entries": len(entries),
+        "matched": matched,
+        "matched_by_fallback": fallback,
+        "patterns": len(patterns),
+        "chunks_scanned": n_chunks,
+        "scan_sec": round(scan_sec, 3),
+    }
+    return out, stats
+
 
 def remap_eval(eval_path: str, out_path: str):
-    meta = load_metadata()
     with open(eval_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
-    # build search map
-    mapping = []
-    for entry in data:
-        answer = entry.get("answer","").strip()
-        found_idxs = []
-        if not answer:
-            # fallback: search by query words
-            q = entry.get("query","")
-            for i, m in enumerate(meta):
-                if q.lower() in m.get("text","").lower():
-                    found_idxs.append(i)
-        else:
-            for i, m in enumerate(meta):
-                if answer.lower() in m.get("text","").lower():
-                    found_idxs.append(i)
-        # fallback heuristics: if nothing found, search tokens
-        if not found_idxs:
-            # match by any good token
-            tokens = [t for t in answer.lower().split() if len(t)>3]
-            for i, m in enumerate(meta):
-                txt = m.get("text","").lower()
-                if all(tok in txt for tok in tokens[:3]):  # require up to 3 tokens
-                    found_idxs.append(i)
-        entry['expected_chunk_ids'] = found_idxs or entry.get('expected_chunk_ids', [])
-        mapping.append(entry)
+    mapping, stats = asyncio.run(remap_entries(data))
     with open(out_path, 'w', encoding='utf-8') as f:
         json.dump(mapping, f, ensure_ascii=False, indent=2)
-    print(f"Remapped {len(mapping)} entries -> saved {out_path}")
+    print(f"Remapped {len(mapping)} entries -> saved {out_path} {stats}")
+
 
 if __name__ == "__main__":
-    remap_eval("rag_evalution/eval_dataset.json", "rag_evalution/eval_dataset_remapped.json")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--in", dest="inp", default="app/core/rag_evalution/eval_dataset.json")
+    parser.add_argument("--out", default="app/core/rag_evalution/eval_dataset_remapped.json")
+    args = parser.parse_args()
+
+    from pathlib import Path
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).resolve().parents[3] / ".env")
+
+    remap_eval(args.inp, args.out)
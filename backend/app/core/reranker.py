@@ -0,0 +1,184 @@
+# backend/app/core/reranker.py
+"""
+Optional cross-encoder reranking of hybrid_search_db hits.
+
+Enabled by RAG_RERANK_MODEL (a sentence-transformers CrossEncoder, e.g.
+cross-encoder/ms-marco-MiniLM-L-6-v2; empty = off). Callers fetch
+rerank_pool_size(top_k) hybrid candidates, then rerank() scores every
+(query, chunk) pair that is not cached yet in ONE batched predict call
+on CPU and returns the best top_k by cross-encoder score.
+
+Each request has a time budget (RAG_RERANK_BUDGET_MS, overridable per
+call). When the uncached pairs are not expected to fit (running average
+cost per pair) or the call does not finish in time, the hits come back
+in hybrid order instead. A call that overran keeps running in its
+thread and still fills the cache, so the same question is reranked the
+next time. Only one predict runs at a time: while one is in flight,
+other requests skip scoring ("busy") instead of queueing more CPU work.
+Scores are cached per (query, chunk id) in an LRU of
+RAG_RERANK_CACHE_SIZE entries.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from app.services.profiling import profiling_active
+from app.services.stub_models import STUB_MODELS
+from app.utils.metrics import STAGE_SECONDS, counter, record_cache
+
+RERANK_MODEL = os.getenv("RAG_RERANK_MODEL", "")
+RERANK_POOL = int(os.getenv("RAG_RERANK_POOL", "20"))
+RERANK_BUDGET_MS = float(os.getenv("RAG_RERANK_BUDGET_MS", "250"))
+RERANK_MAX_LENGTH = int(os.getenv("RAG_RERANK_MAX_LENGTH", "256"))
+RERANK_CACHE_SIZE = int(os.getenv("RAG_RERANK_CACHE_SIZE", "20000"))
+
+RERANKS = counter("rag_rerank_total", "Rerank attempts by outcome", ["outcome"])
+
+_model = None
+_load_lock = Lock()
+# one predict at a time: concurrent calls would only compete for the same cores
+_predict_lock = Lock()
+_cache_lock = Lock()
+_score_cache: "OrderedDict[Tuple[str, int], float]" = OrderedDict()
+_ms_per_pair: Optional[float] = None
+# the scoring call in flight (set on the event loop, so checking it is race-free)
+_scoring: Optional["asyncio.Future"] = None
+
+
+def rerank_enabled() -> bool:
+    return bool(RERANK_MODEL)
+
+
+def rerank_pool_size(top_k: int) -> int:
+    """Hybrid candidates to fetch for a final top_k (top_k itself when reranking is off)."""
+    return max(RERANK_POOL, top_k) if rerank_enabled() else top_k
+
+
+def get_reranker():
+    global _model
+    with _load_lock:
+        if _model is None and STUB_MODELS:
+            from app.services.stub_models import OverlapCrossEncoder
+            print("[STUB] Using OverlapCrossEncoder instead of a cross-encoder model")
+            _model = OverlapCrossEncoder()
+        if _model is None:
+            from sentence_transformers import CrossEncoder
+            _model = CrossEncoder(RERANK_MODEL, max_length=RERANK_MAX_LENGTH, device="cpu")
+    return _model
+
+
+def _cache_key(query: str, hit: Dict) -> Tuple[str, int]:
+    return (query.strip(), hit.get("chunk_id"))
+
+
+def _cached_scores(query: str, hits: List[Dict]) -> Dict[int, float]:
+    found = {}
+    with _cache_lock:
+        for i, h in enumerate(hits):
+            key = _cache_key(query, h)
+            score = _score_cache.get(key)
+            if score is not None:
+                _score_cache.move_to_end(key)
+                found[i] = score
+    return found
+
+
+def _score_pairs(query: str, hits: List[Dict]) -> List[float]:
+    """Blocking: one batched predict for all pairs, results cached."""
+    global _ms_per_pair
+    model = get_reranker()
+    pairs = [(query, h.get("text") or "") for h in hits]
+    with _predict_lock:
+        t0 = time.perf_counter()
+        scores = [float(s) for s in model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)]
+        per_pair = (time.perf_counter() - t0) * 1000 / len(pairs)
+    _ms_per_pair = per_pair if _ms_per_pair is None else 0.8 * _ms_per_pair + 0.2 * per_pair
+
+    with _cache_lock:
+        for h, score in zip(hits, scores):
+            _score_cache[_cache_key(query, h)] = score
+        while len(_score_cache) > RERANK_CACHE_SIZE:
+            _score_cache.popitem(last=False)
+    return scores
+
+
+def _decay_estimate():
+    # skipped calls never update the average; let it drift down so one slow
+    # period does not switch reranking off for good
+    global _ms_per_pair
+    _ms_per_pair *= 0.95
+
+
+def _log_failure(work: "asyncio.Future"):
+    if not work.cancelled() and work.exception() is not None:
+        print(f"[RERANK] scoring failed: {work.exception()}")
+
+
+async def rerank(query: str, hits: List[Dict], top_k: int,
+                 budget_ms: Optional[float] = None,
+                 timings: Optional[Dict] = None,
+                 info: Optional[Dict] = None) -> List[Dict]:
+    """
+    Reorder `hits` (hybrid order) by cross-encoder score and keep top_k; each
+    returned hit gains `rerank_score`. `info["rerank"]` tells what happened:
+    cached or scored (reranked); off (budget <= 0), busy or over_budget
+    (skipped up front), timeout or error (hybrid order).
+    """
+    global _scoring
+    if not rerank_enabled() or len(hits) <= 1:
+        return hits[:top_k]
+    budget = RERANK_BUDGET_MS if budget_ms is None else budget_ms
+    if budget <= 0:
+        if info is not None:
+            info["rerank"] = "off"
+        return hits[:top_k]
+    t0 = time.perf_counter()
+
+    scores = _cached_scores(query, hits)
+    missing = [i for i in range(len(hits)) if i not in scores]
+    record_cache("rerank_scores", not missing)
+    outcome = "cached"
+    if missing:
+        outcome = "scored"
+        if _scoring is not None and not _scoring.done():
+            # a predict (possibly one that overran an earlier budget) is still running
+            outcome = "busy"
+        elif _ms_per_pair is not None and _ms_per_pair * len(missing) > budget:
+            outcome = "over_budget"
+            _decay_estimate()
+        elif profiling_active():
+            # profiled request: score on the profiled thread (the budget is not enforced)
+            try:
+                scores.update(zip(missing, _score_pairs(query, [hits[i] for i in missing])))
+            except Exception as e:
+                print(f"[RERANK] scoring failed: {e}")
+                outcome = "error"
+        else:
+            work = asyncio.ensure_future(asyncio.to_thread(_score_pairs, query, [hits[i] for i in missing]))
+            _scoring = work
+            # an abandoned call's error is only logged
+            work.add_done_callback(_log_failure)
+            try:
+                fresh = await asyncio.wait_for(asyncio.shield(work), timeout=budget / 1000)
+                scores.update(zip(missing, fresh))
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+            except Exception:
+                outcome = "error"
+
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    if timings is not None:
+        timings["rerank_ms"] = elapsed_ms
+    STAGE_SECONDS.labels(stage="rerank").observe(elapsed_ms / 1000)
+    RERANKS.labels(outcome=outcome).inc()
+    if info is not None:
+        info["rerank"] = outcome
+
+    if outcome in ("busy", "over_budget", "timeout", "error"):
+        return hits[:top_k]
+    order = sorted(range(len(hits)), key=lambda i: scores[i], reverse=True)
+    return [dict(hits[i], rerank_score=scores[i]) for i in order[:top_k]]
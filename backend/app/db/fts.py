@@ -0,0 +1,133 @@
+# backend/app/db/fts.py
+"""
+Full-text index over QueryLog.query_text.
+
+- SQLite:   external-content FTS5 table `query_log_fts` (rowid = querylog.id),
+            kept in sync by insert/update/delete triggers on querylog.
+- Postgres: stored generated column `querylog.query_tsv` with a GIN index.
+- Anything else (or SQLite built without FTS5) falls back to ILIKE.
+
+ensure_query_log_search() runs at startup (create_db_and_tables) and
+backfills rows written before the index existed.
+"""
+
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import column, false, func, literal_column, table
+from sqlalchemy.exc import OperationalError
+
+from app.models.models import QueryLog
+
+FTS_TABLE = "query_log_fts"
+
+# "fts5" / "tsvector" / None (ILIKE fallback); set by ensure_query_log_search()
+_backend: Optional[str] = None
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        query_text, content='querylog', content_rowid='id', tokenize='porter unicode61'
+    )""",
+]
+
+_SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS querylog_fts_ai AFTER INSERT ON querylog BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, query_text) VALUES (new.id, new.query_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS querylog_fts_ad AFTER DELETE ON querylog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, query_text) VALUES ('delete', old.id, old.query_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS querylog_fts_au AFTER UPDATE OF query_text ON querylog BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, query_text) VALUES ('delete', old.id, old.query_text);
+        INSERT INTO {FTS_TABLE}(rowid, query_text) VALUES (new.id, new.query_text);
+    END""",
+]
+
+_POSTGRES_DDL = [
+    """ALTER TABLE querylog ADD COLUMN IF NOT EXISTS query_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(query_text, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_querylog_query_tsv ON querylog USING GIN (query_tsv)",
+]
+
+def get_search_backend() -> Optional[str]:
+    return _backend
+
+
+def _setup_sqlite(conn) -> Optional[str]:
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    if not exists:
+        try:
+            for stmt in _SQLITE_DDL:
+                conn.exec_driver_sql(stmt)
+        except OperationalError as e:
+            print(f"[FTS] SQLite FTS5 unavailable, log search falls back to LIKE: {e}")
+            return None
+        # index rows logged before the FTS table existed
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        print(f"[FTS] Created {FTS_TABLE} and indexed existing query logs")
+    for stmt in _SQLITE_TRIGGERS:
+        conn.exec_driver_sql(stmt)
+    return "fts5"
+
+
+def _setup_postgres(conn) -> Optional[str]:
+    # the generated column is computed for existing rows when it is added
+    for stmt in _POSTGRES_DDL:
+        conn.exec_driver_sql(stmt)
+    return "tsvector"
+
+
+def ensure_query_log_search(conn):
+    """Create the query-text index for this dialect (sync; use with conn.run_sync)."""
+    global _backend
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        _backend = _setup_sqlite(conn)
+    elif dialect == "postgresql":
+        _backend = _setup_postgres(conn)
+    else:
+        _backend = None
+
+
+# ------------------------------------------------------------
+# QUERY HELPERS
+# ------------------------------------------------------------
+def _terms(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+def _fts5_match(text: str) -> str:
+    """
+    Free text -> FTS5 query: every term must match, quoted so user input
+    can't inject FTS syntax; the last term is a prefix (search-as-you-type).
+    """
+    terms = [f'"{t}"' for t in _terms(text)]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def apply_query_log_search(query, search: str) -> Tuple[object, Optional[object]]:
+    """
+    Restrict a select(QueryLog) to rows matching `search`.
+    Returns (query, score_expr); higher score = better match. score_expr is
+    None on the ILIKE fallback, where results stay in timestamp order.
+    """
+    if _backend == "fts5":
+        if not _terms(search):
+            return query.where(false()), None
+        fts = table(FTS_TABLE, column("rowid"))
+        query = query.join(fts, fts.c.rowid == QueryLog.id).where(
+            literal_column(FTS_TABLE).op("MATCH")(_fts5_match(search))
+        )
+        # bm25() is lower-is-better
+        return query, -func.bm25(literal_column(FTS_TABLE))
+
+    if _backend == "tsvector":
+        tsv = literal_column("querylog.query_tsv")
+        tsq = func.websearch_to_tsquery("english", search)
+        return query.where(tsv.op("@@")(tsq)), func.ts_rank(tsv, tsq)
+
+    return query.where(QueryLog.query_text.ilike(f"%{search}%")), None
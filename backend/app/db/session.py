@@ -1,17 +1,92 @@
 # backend/app/db/session.py
 
 import os
+from typing import AsyncIterator, Dict
 from sqlmodel import SQLModel
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.db.fts import ensure_query_log_search
+
 DB_PATH = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./data/rag.db")
 
-engine = create_async_engine(
-    DB_PATH,
-    echo=False,
-    future=True
-)
+# ------------------------------------------------------------
+# DATABASE PROFILE
+# ------------------------------------------------------------
+# SQLite: WAL lets readers run alongside the single writer (ingestion,
+# query-log batches), synchronous=NORMAL is durable in WAL mode except for
+# the last commits on power loss, mmap/cache keep hot pages out of syscalls.
+SQLITE_BUSY_TIMEOUT_SEC = float(os.getenv("SQLITE_BUSY_TIMEOUT_SEC", "30"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Postgres (asyncpg) connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+_url = make_url(DB_PATH)
+DB_BACKEND = _url.get_backend_name()  # "sqlite" / "postgresql" / ...
+
+
+def _sqlite_pragmas(in_memory: bool):
+    pragmas = [
+        ("synchronous", "NORMAL"),
+        ("mmap_size", SQLITE_MMAP_SIZE),
+        # negative = size in KiB instead of pages
+        ("cache_size", -SQLITE_CACHE_SIZE_KB),
+        ("temp_store", "MEMORY"),
+    ]
+    if not in_memory:
+        pragmas.insert(0, ("journal_mode", "WAL"))
+    return pragmas
+
+
+def _engine_kwargs() -> Dict:
+    kwargs = {"echo": False, "future": True}
+    if DB_BACKEND == "sqlite":
+        kwargs["connect_args"] = {"timeout": SQLITE_BUSY_TIMEOUT_SEC}
+    elif DB_BACKEND == "postgresql":
+        kwargs.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    return kwargs
+
+
+engine = create_async_engine(DB_PATH, **_engine_kwargs())
+
+if DB_BACKEND == "sqlite":
+    _in_memory = (_url.database or ":memory:") == ":memory:"
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in _sqlite_pragmas(_in_memory):
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def get_db_profile() -> Dict:
+    profile = {"backend": DB_BACKEND, "driver": _url.get_driver_name()}
+    if DB_BACKEND == "sqlite":
+        profile["pragmas"] = dict(_sqlite_pragmas(_in_memory))
+    elif DB_BACKEND == "postgresql":
+        profile["pool"] = {
+            "size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout": DB_POOL_TIMEOUT,
+            "recycle": DB_POOL_RECYCLE,
+            "checked_out": engine.pool.checkedout(),
+        }
+    return profile
+
 
 async_session = sessionmaker(
     engine,
@@ -19,7 +94,48 @@ async_session = sessionmaker(
     expire_on_commit=False
 )
 
+
+# FastAPI dependency: one session per request, closed when the response is done
+async def get_session() -> AsyncIterator[AsyncSession]:
+    async with async_session() as session:
+        yield session
+
+
+# create_all() only creates indexes together with new tables;
+# these were added to existing tables later
+_LATE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_querylog_timestamp ON querylog (timestamp)",
+    "CREATE INDEX IF NOT EXISTS ix_chunk_doc_id ON chunk (doc_id)",
+]
+
+# nor does it add columns to existing tables: (table, column, DDL type).
+# Evaluations stored before progress tracking ran synchronously, so they
+# are marked completed.
+_LATE_COLUMNS = [
+    ("evaluation", "status", "VARCHAR NOT NULL DEFAULT 'completed'"),
+    ("evaluation", "total_items", "INTEGER NOT NULL DEFAULT 0"),
+    ("evaluation", "completed_items", "INTEGER NOT NULL DEFAULT 0"),
+    ("evaluation", "finished_at", "TIMESTAMP"),
+    ("evaluation", "error", "VARCHAR"),
+]
+
+
+def _add_late_columns(sync_conn):
+    inspector = inspect(sync_conn)
+    existing: Dict[str, set] = {}
+    for table, column, ddl in _LATE_COLUMNS:
+        if table not in existing:
+            existing[table] = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing[table]:
+            sync_conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+            print(f"[DB] Added column {table}.{column}")
+
+
 # async DB init
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_add_late_columns)
+        for stmt in _LATE_INDEXES:
+            await conn.exec_driver_sql(stmt)
+        await conn.run_sync(ensure_query_log_search)
@@ -1,7 +1,9 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
-from app.db.session import create_db_and_tables
+from app.db.session import create_db_and_tables, get_db_profile
 import os
 from pathlib import Path
 from dotenv import load_dotenv
@@ -18,9 +20,13 @@ from app.api.routes_admin_stats import router as admin_stats_router
 from app.api.routes_admin_logs import router as admin_logs_router
 from app.api.routes_auth import router as auth_router
 from app.api.routes_lora import router as lora_router
+from app.api.routes_metrics import router as metrics_router
+from app.api.routes_evaluation import router as evaluation_router
 
-# ⬅️ Import the loader
-from app.services.lora_loader import load_lora
+# ⬅️ Startup warmup (embedder + LoRA + retrieval snapshot)
+from app.services.warmup import run_warmup, get_warmup_status
+from app.services.query_logger import start_query_logger, stop_query_logger
+from app.repos.repo_rag import ensure_stats_rollups
 
 
 load_dotenv()
@@ -41,16 +47,21 @@ async def startup_event():
     print("### Creating DB Tables...")
     await create_db_and_tables()
     print("### Tables created successfully.")
+    print("### DB profile:", get_db_profile())
 
-    lora_path = os.getenv("LORA_PATH", "lora_models/my_lora")
-    print(f"### Loading LoRA from startup: {lora_path}")
+    await ensure_stats_rollups()
 
-    ok = load_lora(lora_path)
-    if not ok:
-        print("### ERROR: LoRA failed to load at startup!")
-    else:
-        print("### LoRA loaded successfully at startup.")
+    await start_query_logger()
 
+    # warm up in the background so `/` answers immediately;
+    # `/ready` stays 503 until models and the retrieval snapshot are hot
+    app.state.warmup_task = asyncio.create_task(run_warmup())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # flush buffered query logs before the process exits
+    await stop_query_logger()
 
 
 # Register all routers
@@ -62,7 +73,18 @@ app.include_router(admin_stats_router)
 app.include_router(admin_logs_router)
 app.include_router(auth_router)
 app.include_router(lora_router)
+app.include_router(metrics_router)
+app.include_router(evaluation_router)
 
 @app.get("/")
 def read_root():
     return {"status": "ok"}
+
+@app.get("/ready")
+def readiness():
+    status = get_warmup_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content={
+        "ready": status["ready"],
+        "stages_ms": status["stages"],
+        "errors": status["errors"],
+    })
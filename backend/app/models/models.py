@@ -1,7 +1,7 @@
 from typing import Optional, List
 from sqlmodel import SQLModel, Field
-from datetime import datetime
-from sqlalchemy import Column, JSON
+from datetime import datetime, date
+from sqlalchemy import Column, JSON, Index, LargeBinary
 
 
 class Document(SQLModel, table=True):
@@ -15,12 +15,19 @@ class Document(SQLModel, table=True):
 
 class Chunk(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)  # DB autoinc PK
-    doc_id: str
+    doc_id: str = Field(index=True)
     chunk_id: Optional[int] = Field(default=None, index=True)  # <-- store global chunk id (set after insert)
     text: str
     page: Optional[int] = None
     start_char: Optional[int] = None
     end_char: Optional[int] = None
+    # generation tokenizer ids for `text`, valid only while tokenizer_key matches the active tokenizer
+    token_ids: Optional[List[int]] = Field(sa_column=Column(JSON), default=None)
+    token_count: Optional[int] = None
+    tokenizer_key: Optional[str] = None
+    # compressed text (see app/services/chunk_text.py); when text_codec is set, `text` is empty
+    text_z: Optional[bytes] = Field(sa_column=Column(LargeBinary), default=None)
+    text_codec: Optional[str] = None  # None / "zstd" / "zstd:<TextDictionary.id>"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class FaissIndexRegistry(SQLModel, table=True):
@@ -38,8 +45,30 @@ class QueryLog(SQLModel, table=True):
     query_text: str
     user_id: Optional[str] = None
     returned_chunk_ids: List[int] = Field(sa_column=Column(JSON), default_factory=list)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     response_time_ms: Optional[int] = None
+    endpoint: Optional[str] = None  # "ask" / "search"
+    # per-stage durations in ms (embed, faiss, bm25, fusion, generate, ...)
+    stage_timings: dict = Field(sa_column=Column(JSON), default_factory=dict)
+    # which caches served this request (retrieval snapshot, prompt KV, chunk tokens)
+    cache_hits: dict = Field(sa_column=Column(JSON), default_factory=dict)
+
+
+class QueryHit(SQLModel, table=True):
+    """
+    One row per chunk returned for a query (normalized QueryLog.returned_chunk_ids),
+    so per-document stats and log filters can use indexes instead of the JSON column.
+    """
+    __tablename__ = "query_hits"
+    __table_args__ = (
+        Index("ix_query_hits_doc_query", "doc_id", "query_id"),
+    )
+
+    query_id: int = Field(foreign_key="querylog.id", primary_key=True)
+    rank: int = Field(primary_key=True)  # 0-based position in the returned list
+    chunk_id: int = Field(index=True)
+    doc_id: str
+    score: Optional[float] = None  # hybrid score at query time (None for backfilled rows)
 
 
 class Evaluation(SQLModel, table=True):
@@ -48,3 +77,50 @@ class Evaluation(SQLModel, table=True):
     params: dict = Field(sa_column=Column(JSON), default_factory=dict)
     results: dict = Field(sa_column=Column(JSON), default_factory=dict)
     run_at: datetime = Field(default_factory=datetime.utcnow)
+    # progress of a running job (GET /evaluation/{id}/status)
+    status: str = "pending"  # pending | running | completed | failed
+    total_items: int = 0
+    completed_items: int = 0
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+
+class EvaluationItem(SQLModel, table=True):
+    """
+    One row per evaluated question. Retrieved chunks are kept as ids + fused
+    scores only (texts live in `chunk`); Evaluation.results holds the summary.
+    """
+    __tablename__ = "evaluation_items"
+
+    evaluation_id: int = Field(foreign_key="evaluation.id", primary_key=True)
+    item_index: int = Field(primary_key=True)  # position in the dataset
+    question: str
+    expected: str = ""
+    answer: str = ""
+    score: float = 0.0
+    chunk_ids: List[int] = Field(sa_column=Column(JSON), default_factory=list)
+    chunk_scores: List[float] = Field(sa_column=Column(JSON), default_factory=list)
+    error: Optional[str] = None
+
+
+# ----------------------------------------------------
+# Incrementally maintained stats (served by /admin/stats*)
+# ----------------------------------------------------
+class StatsCounter(SQLModel, table=True):
+    # "documents", "chunks", "queries", "faiss_indexes"
+    name: str = Field(primary_key=True)
+    value: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class QueryDailyRollup(SQLModel, table=True):
+    day: date = Field(primary_key=True)  # UTC date of QueryLog.timestamp
+    count: int = 0
+
+
+class TextDictionary(SQLModel, table=True):
+    """zstd dictionary trained on chunk texts, referenced by Chunk.text_codec."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    data: bytes = Field(sa_column=Column(LargeBinary))
+    sample_count: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
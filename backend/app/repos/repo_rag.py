@@ -1,12 +1,19 @@
 # backend/app/repos/repo_rag.py
-from typing import List, Optional
-from sqlmodel import select
+from collections import Counter
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+from sqlmodel import select, func
+from sqlalchemy import update
 from app.db.session import async_session
-from app.models.models import Document, Chunk, FaissIndexRegistry, QueryLog, Evaluation
+from app.models.models import (
+    Document, Chunk, FaissIndexRegistry, QueryLog, QueryHit, Evaluation,
+    StatsCounter, QueryDailyRollup,
+)
 
 async def create_document(doc: Document) -> Document:
     async with async_session() as session:
         session.add(doc)
+        await increment_counters(session, {"documents": 1})
         await session.commit()
         await session.refresh(doc)
         return doc
@@ -14,6 +21,7 @@ async def create_document(doc: Document) -> Document:
 async def bulk_insert_chunks(chunks: List[Chunk]) -> int:
     async with async_session() as session:
         session.add_all(chunks)
+        await increment_counters(session, {"chunks": len(chunks)})
         await session.commit()
         return len(chunks)
 
@@ -21,6 +29,7 @@ async def bulk_insert_chunks(chunks: List[Chunk]) -> int:
 async def create_faiss_registry(reg: FaissIndexRegistry) -> FaissIndexRegistry:
     async with async_session() as session:
         session.add(reg)
+        await increment_counters(session, {"faiss_indexes": 1})
         await session.commit()
         await session.refresh(reg)
         return reg
@@ -35,6 +44,7 @@ async def get_all_faiss_registries():
 async def bulk_insert_chunks_return_rows(chunks: List[Chunk]) -> List[Chunk]:
     async with async_session() as session:
         session.add_all(chunks)
+        await increment_counters(session, {"chunks": len(chunks)})
         await session.commit()
         for ch in chunks:
             await session.refresh(ch)
@@ -50,10 +60,35 @@ async def log_query(qtext: str, returned_chunk_ids: List[int], user_id: Optional
     q = QueryLog(query_text=qtext, returned_chunk_ids=returned_chunk_ids, user_id=user_id, response_time_ms=response_time_ms)
     async with async_session() as session:
         session.add(q)
+        await increment_counters(session, {"queries": 1})
+        await increment_daily_queries(session, {q.timestamp.date(): 1})
         await session.commit()
         await session.refresh(q)
         return q
 
+async def bulk_insert_query_logs(rows: List[QueryLog], hits: Optional[List[List[Dict]]] = None) -> int:
+    """
+    Insert a batch of query logs in one transaction (used by the background
+    log writer), updating the query counter and per-day rollup with it.
+    `hits[i]` (dicts with chunk_id/doc_id/score) become QueryHit rows for rows[i].
+    """
+    per_day = Counter(r.timestamp.date() for r in rows)
+    async with async_session() as session:
+        session.add_all(rows)
+        if hits:
+            await session.flush()  # assign QueryLog ids
+            session.add_all([
+                QueryHit(query_id=row.id, rank=rank, chunk_id=h["chunk_id"],
+                         doc_id=h.get("doc_id") or "unknown", score=h.get("score"))
+                for row, row_hits in zip(rows, hits)
+                for rank, h in enumerate(row_hits)
+                if h.get("chunk_id") is not None
+            ])
+        await increment_counters(session, {"queries": len(rows)})
+        await increment_daily_queries(session, per_day)
+        await session.commit()
+        return len(rows)
+
 async def save_evaluation(ev: Evaluation):
     async with async_session() as session:
         session.add(ev)
@@ -61,25 +96,150 @@ async def save_evaluation(ev: Evaluation):
         await session.refresh(ev)
         return ev
 # -----------------------------
-# Stats helpers
+# Stats rollups (counters + queries per day)
 # -----------------------------
-async def count_documents() -> int:
+def _upsert(session, model, key_cols: List[str], values: Dict, increment_cols: List[str]):
+    """
+    Dialect-aware "insert or add": one statement on SQLite / Postgres
+    so concurrent writers cannot lose increments. Returns None for other
+    dialects (callers fall back to update-then-insert).
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    stmt = insert(model).values(**values)
+    set_ = {}
+    for col in values:
+        if col in key_cols:
+            continue
+        if col in increment_cols:
+            set_[col] = getattr(model, col) + stmt.excluded[col]
+        else:
+            set_[col] = stmt.excluded[col]
+    return stmt.on_conflict_do_update(index_elements=key_cols, set_=set_)
+
+
+async def increment_counters(session, deltas: Dict[str, int]):
+    """Add deltas to StatsCounter rows inside the caller's transaction."""
+    now = datetime.utcnow()
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        stmt = _upsert(session, StatsCounter, ["name"],
+                       {"name": name, "value": delta, "updated_at": now}, ["value"])
+        if stmt is not None:
+            await session.execute(stmt)
+            continue
+        res = await session.execute(
+            update(StatsCounter).where(StatsCounter.name == name)
+            .values(value=StatsCounter.value + delta, updated_at=now)
+        )
+        if res.rowcount == 0:
+            session.add(StatsCounter(name=name, value=delta, updated_at=now))
+
+
+async def increment_daily_queries(session, per_day: Dict[date, int]):
+    for day, n in per_day.items():
+        stmt = _upsert(session, QueryDailyRollup, ["day"], {"day": day, "count": n}, ["count"])
+        if stmt is not None:
+            await session.execute(stmt)
+            continue
+        res = await session.execute(
+            update(QueryDailyRollup).where(QueryDailyRollup.day == day)
+            .values(count=QueryDailyRollup.count + n)
+        )
+        if res.rowcount == 0:
+            session.add(QueryDailyRollup(day=day, count=n))
+
+
+async def rebuild_stats_rollups() -> Dict[str, int]:
+    """
+    Recompute counters and the per-day rollup from the base tables.
+    One full pass; used to bootstrap an existing database or repair drift.
+    """
     async with async_session() as session:
-        q = select(Document)
-        res = await session.execute(q)
-        return len(res.scalars().all())
+        counts = {
+            "documents": (await session.execute(select(func.count()).select_from(Document))).scalar(),
+            "chunks": (await session.execute(select(func.count()).select_from(Chunk))).scalar(),
+            "queries": (await session.execute(select(func.count()).select_from(QueryLog))).scalar(),
+            "faiss_indexes": (await session.execute(select(func.count()).select_from(FaissIndexRegistry))).scalar(),
+        }
+        day_rows = (await session.execute(
+            select(func.date(QueryLog.timestamp).label("day"), func.count().label("count"))
+            .group_by(func.date(QueryLog.timestamp))
+        )).all()
 
-async def count_chunks() -> int:
+        now = datetime.utcnow()
+        for name, value in counts.items():
+            row = await session.get(StatsCounter, name)
+            if row:
+                row.value, row.updated_at = value, now
+            else:
+                session.add(StatsCounter(name=name, value=value, updated_at=now))
+
+        for row in (await session.execute(select(QueryDailyRollup))).scalars().all():
+            await session.delete(row)
+        for r in day_rows:
+            day = r.day if isinstance(r.day, date) else date.fromisoformat(str(r.day))
+            session.add(QueryDailyRollup(day=day, count=r.count))
+
+        await session.commit()
+        return counts
+
+
+async def ensure_stats_rollups():
+    """Bootstrap the rollups once for databases created before they existed."""
     async with async_session() as session:
-        q = select(Chunk)
-        res = await session.execute(q)
-        return len(res.scalars().all())
+        existing = (await session.execute(select(StatsCounter).limit(1))).scalars().first()
+    if existing is None:
+        counts = await rebuild_stats_rollups()
+        print(f"[STATS] Rollups bootstrapped: {counts}")
 
-async def count_queries() -> int:
+
+async def get_counter(name: str) -> int:
+    async with async_session() as session:
+        row = await session.get(StatsCounter, name)
+        return row.value if row else 0
+
+
+async def get_counters() -> Dict[str, int]:
     async with async_session() as session:
-        q = select(QueryLog)
+        rows = (await session.execute(select(StatsCounter))).scalars().all()
+        return {r.name: r.value for r in rows}
+
+
+async def get_queries_per_day(days: int = 14) -> List[QueryDailyRollup]:
+    cutoff = (datetime.utcnow() - timedelta(days=days)).date()
+    async with async_session() as session:
+        q = (
+            select(QueryDailyRollup)
+            .where(QueryDailyRollup.day >= cutoff)
+            .order_by(QueryDailyRollup.day)
+        )
         res = await session.execute(q)
-        return len(res.scalars().all())
+        return res.scalars().all()
+
+
+async def get_queries_on(day: date) -> int:
+    async with async_session() as session:
+        row = await session.get(QueryDailyRollup, day)
+        return row.count if row else 0
+
+# -----------------------------
+# Stats helpers (constant time, served from StatsCounter)
+# -----------------------------
+async def count_documents() -> int:
+    return await get_counter("documents")
+
+async def count_chunks() -> int:
+    return await get_counter("chunks")
+
+async def count_queries() -> int:
+    return await get_counter("queries")
 
 # -----------------------------
 # Query log listing
@@ -106,3 +266,54 @@ async def get_latest_registry():
         )
         res = await session.execute(q)
         return res.scalars().first()
+
+
+# -----------------------------
+# QueryHit backfill (for QueryLog rows written before query_hits existed)
+# -----------------------------
+async def backfill_query_hits(batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Walk QueryLog by id (keyset) and write QueryHit rows for logs that have
+    none yet, resolving doc_id from the chunks table. Idempotent; scores are
+    unknown for historical rows and left NULL.
+    """
+    last_id = 0
+    scanned = written = 0
+    while True:
+        async with async_session() as session:
+            logs = (await session.execute(
+                select(QueryLog)
+                .where(QueryLog.id > last_id)
+                .order_by(QueryLog.id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not logs:
+                break
+            last_id = logs[-1].id
+            scanned += len(logs)
+
+            ids = [l.id for l in logs]
+            done = set((await session.execute(
+                select(QueryHit.query_id).where(QueryHit.query_id.in_(ids)).distinct()
+            )).scalars().all())
+            todo = [l for l in logs if l.id not in done and l.returned_chunk_ids]
+
+            chunk_ids = {cid for l in todo for cid in l.returned_chunk_ids if cid is not None}
+            doc_of = {}
+            if chunk_ids:
+                doc_of = dict((await session.execute(
+                    select(Chunk.id, Chunk.doc_id).where(Chunk.id.in_(chunk_ids))
+                )).all())
+
+            new_rows = [
+                QueryHit(query_id=l.id, rank=rank, chunk_id=cid, doc_id=doc_of.get(cid, "unknown"))
+                for l in todo
+                for rank, cid in enumerate(l.returned_chunk_ids)
+                if cid is not None
+            ]
+            session.add_all(new_rows)
+            await session.commit()
+            written += len(new_rows)
+
+    print(f"[BACKFILL] query_hits: scanned={scanned} written={written}")
+    return {"scanned": scanned, "written": written}
@@ -0,0 +1,200 @@
+# backend/app/services/chunk_text.py
+"""
+Optional zstd compression of Chunk.text at rest.
+
+CHUNK_TEXT_CODEC=zstd stores new chunks in Chunk.text_z with Chunk.text
+left empty; Chunk.text_codec records how to read them back:
+
+    None          plain Chunk.text
+    "zstd"        zstd frame, no dictionary
+    "zstd:<id>"   zstd frame compressed with TextDictionary <id>
+
+Chunks are short and our policy documents repeat the same phrasing, so a
+dictionary trained on existing chunks (train_text_dictionary) compresses
+them far better than plain zstd. recompress_chunks() rewrites stored
+chunks to the current codec/dictionary (or back to plain text).
+
+Readers must go through chunk_text(row) after `await ensure_text_dictionaries()`.
+`zstandard` is an optional dependency, only needed once compression is used.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import func, select
+
+from app.db.session import async_session
+from app.models.models import Chunk, TextDictionary
+
+CODEC = os.getenv("CHUNK_TEXT_CODEC", "none").lower()
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "9"))
+ZSTD_DICT_SIZE = int(os.getenv("ZSTD_DICT_SIZE", str(64 * 1024)))
+DICT_SAMPLE_SIZE = int(os.getenv("ZSTD_DICT_SAMPLE_SIZE", "20000"))
+
+# dictionary id -> zstandard.ZstdCompressionDict (id 0 = no dictionary)
+_dicts: Dict[int, object] = {}
+_active_dict_id: Optional[int] = None
+_compressors: Dict[int, object] = {}
+_decompressors: Dict[int, object] = {}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Chunk text compression needs the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def compression_enabled() -> bool:
+    return CODEC == "zstd"
+
+
+def _compressor(dict_id: int):
+    c = _compressors.get(dict_id)
+    if c is None:
+        zstd = _zstd()
+        c = zstd.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_dicts.get(dict_id))
+        _compressors[dict_id] = c
+    return c
+
+
+def _decompressor(dict_id: int):
+    d = _decompressors.get(dict_id)
+    if d is None:
+        if dict_id and dict_id not in _dicts:
+            raise RuntimeError(f"zstd dictionary {dict_id} not loaded; await ensure_text_dictionaries() first")
+        zstd = _zstd()
+        d = zstd.ZstdDecompressor(dict_data=_dicts.get(dict_id))
+        _decompressors[dict_id] = d
+    return d
+
+
+def _dict_id(codec: str) -> int:
+    _, _, suffix = codec.partition(":")
+    return int(suffix) if suffix else 0
+
+
+# ------------------------------------------------------------
+# ENCODE / DECODE
+# ------------------------------------------------------------
+def encode_text(text: str) -> Tuple[str, Optional[bytes], Optional[str]]:
+    """text -> (text, text_z, text_codec) for the configured codec."""
+    if not compression_enabled():
+        return text, None, None
+    dict_id = _active_dict_id or 0
+    blob = _compressor(dict_id).compress(text.encode("utf-8"))
+    return "", blob, f"zstd:{dict_id}" if dict_id else "zstd"
+
+
+def compress_chunk(chunk: Chunk) -> Chunk:
+    """Apply the configured codec to a Chunk before it is stored (in place)."""
+    chunk.text, chunk.text_z, chunk.text_codec = encode_text(chunk.text)
+    return chunk
+
+
+def chunk_text(row) -> str:
+    """Plain text of a Chunk row, whatever codec it was stored with."""
+    codec = getattr(row, "text_codec", None)
+    if not codec:
+        return row.text or ""
+    return _decompressor(_dict_id(codec)).decompress(row.text_z).decode("utf-8")
+
+
+# ------------------------------------------------------------
+# DICTIONARIES
+# ------------------------------------------------------------
+def _register(d: TextDictionary):
+    _dicts[d.id] = _zstd().ZstdCompressionDict(d.data)
+
+
+async def ensure_text_dictionaries():
+    """Load dictionaries created since the last call (e.g. trained by another worker)."""
+    global _active_dict_id
+    async with async_session() as session:
+        ids = (await session.execute(select(TextDictionary.id).order_by(TextDictionary.id))).scalars().all()
+        missing = [i for i in ids if i not in _dicts]
+        if missing:
+            res = await session.execute(select(TextDictionary).where(TextDictionary.id.in_(missing)))
+            for d in res.scalars().all():
+                _register(d)
+    if ids:
+        _active_dict_id = ids[-1]
+
+
+async def _sample_texts(limit: int) -> List[bytes]:
+    # every n-th chunk, so the sample spans the whole corpus rather than the first documents
+    async with async_session() as session:
+        total = (await session.execute(select(func.count()).select_from(Chunk))).scalar() or 0
+        step = max(1, total // max(1, limit))
+        res = await session.execute(select(Chunk).where(Chunk.id % step == 0).limit(limit))
+        rows = res.scalars().all()
+    return [chunk_text(r).encode("utf-8") for r in rows]
+
+
+async def train_text_dictionary(sample_size: int = DICT_SAMPLE_SIZE) -> Dict:
+    """Train a zstd dictionary on stored chunk texts and make it the active one."""
+    global _active_dict_id
+    zstd = _zstd()
+    await ensure_text_dictionaries()
+
+    samples = [s for s in await _sample_texts(sample_size) if s]
+    if len(samples) < 10:
+        raise RuntimeError(f"Need at least 10 non-empty chunks to train a dictionary, found {len(samples)}")
+    try:
+        trained = zstd.train_dictionary(ZSTD_DICT_SIZE, samples, level=ZSTD_LEVEL)
+    except zstd.ZstdError as e:
+        raise RuntimeError(f"zstd dictionary training failed: {e}")
+
+    row = TextDictionary(data=trained.as_bytes(), sample_count=len(samples))
+    async with async_session() as session:
+        session.add(row)
+        await session.commit()
+        await session.refresh(row)
+
+    _register(row)
+    _active_dict_id = row.id
+    print(f"[CHUNKTEXT] Trained dictionary {row.id}: {len(row.data)} bytes from {len(samples)} chunks")
+    return {"dictionary_id": row.id, "dict_bytes": len(row.data), "samples": len(samples)}
+
+
+async def recompress_chunks(batch_size: int = 500) -> Dict:
+    """
+    Rewrite every chunk with the configured codec and the active dictionary
+    (plain text again when CHUNK_TEXT_CODEC=none). Safe to re-run.
+    """
+    await ensure_text_dictionaries()
+    target = encode_text("")[2]
+    if target == "zstd" and _active_dict_id:
+        target = f"zstd:{_active_dict_id}"
+
+    last_id, updated, raw_bytes, stored_bytes = 0, 0, 0, 0
+    while True:
+        async with async_session() as session:
+            res = await session.execute(
+                select(Chunk).where(Chunk.id > last_id).order_by(Chunk.id).limit(batch_size)
+            )
+            rows = res.scalars().all()
+            if not rows:
+                break
+            for r in rows:
+                text = chunk_text(r)
+                raw = len(text.encode("utf-8"))
+                if r.text_codec != target:
+                    r.text, r.text_z, r.text_codec = encode_text(text)
+                    session.add(r)
+                    updated += 1
+                raw_bytes += raw
+                stored_bytes += len(r.text_z) if r.text_codec else raw
+            await session.commit()
+            last_id = rows[-1].id
+
+    ratio = round(raw_bytes / stored_bytes, 2) if stored_bytes else None
+    print(f"[CHUNKTEXT] Recompressed {updated} chunks, {raw_bytes} -> {stored_bytes} bytes (x{ratio})")
+    return {
+        "codec": target,
+        "updated": updated,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "ratio": ratio,
+    }
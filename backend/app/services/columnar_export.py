@@ -0,0 +1,153 @@
+# backend/app/services/columnar_export.py
+"""
+Arrow/Parquet export of chunks and embeddings for offline analytics and
+index rebuilds.
+
+    chunks.parquet      id, doc_id, page, start_char, end_char, token_count, text
+    embeddings.parquet  chunk_id, embedding (fixed_size_list<float32>[dim])
+
+Rows are streamed from the DB / FAISS in batches and written one row group
+per batch, so memory stays bounded. read_embeddings() loads the vectors
+back as one float32 matrix (e.g. to rebuild a FAISS index) without going
+through ORM objects. `pyarrow` is an optional dependency.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlmodel import select
+
+from app.models.models import Chunk
+from app.services.chunk_text import chunk_text, ensure_text_dictionaries
+from app.utils.pagination import stream_rows
+
+EXPORT_DIR = os.path.join("data", "exports")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Columnar export needs the 'pyarrow' package (pip install pyarrow)")
+    return pa, pq
+
+
+def _chunk_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("doc_id", pa.string()),
+        ("page", pa.int32()),
+        ("start_char", pa.int32()),
+        ("end_char", pa.int32()),
+        ("token_count", pa.int32()),
+        ("text", pa.string()),
+    ])
+
+
+def _embedding_schema(pa, dim: int):
+    return pa.schema([
+        ("chunk_id", pa.int64()),
+        ("embedding", pa.list_(pa.float32(), dim)),
+    ])
+
+
+# ------------------------------------------------------------
+# CHUNKS
+# ------------------------------------------------------------
+async def export_chunks_parquet(path: str, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    pa, pq = _arrow()
+    schema = _chunk_schema(pa)
+    await ensure_text_dictionaries()
+
+    def _write(writer, batch):
+        cols = {name: [row[i] for row in batch] for i, name in enumerate(schema.names)}
+        writer.write_table(pa.table(cols, schema=schema))
+
+    total = 0
+    writer = pq.ParquetWriter(path, schema, compression="zstd")
+    try:
+        batch = []
+        async for c in stream_rows(select(Chunk).order_by(Chunk.id), batch_size=batch_size):
+            batch.append((c.id, c.doc_id, c.page, c.start_char, c.end_char, c.token_count, chunk_text(c)))
+            if len(batch) >= batch_size:
+                await asyncio.to_thread(_write, writer, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            await asyncio.to_thread(_write, writer, batch)
+            total += len(batch)
+    finally:
+        writer.close()
+    return total
+
+
+# ------------------------------------------------------------
+# EMBEDDINGS (from the latest FAISS registry)
+# ------------------------------------------------------------
+def _write_embeddings(index_path: str, chunk_ids, path: str, batch_size: int) -> int:
+    import faiss
+    pa, pq = _arrow()
+
+    index = faiss.read_index(index_path)
+    n = min(index.ntotal, len(chunk_ids))
+    schema = _embedding_schema(pa, index.d)
+
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for start in range(0, n, batch_size):
+            count = min(batch_size, n - start)
+            try:
+                vecs = index.reconstruct_n(start, count)
+            except RuntimeError as e:
+                raise RuntimeError(f"Index type {type(index).__name__} cannot return stored vectors: {e}")
+            flat = pa.array(np.ascontiguousarray(vecs, dtype="float32").ravel(), type=pa.float32())
+            writer.write_table(pa.table({
+                "chunk_id": pa.array(chunk_ids[start:start + count], type=pa.int64()),
+                "embedding": pa.FixedSizeListArray.from_arrays(flat, index.d),
+            }, schema=schema))
+    return n
+
+
+async def export_embeddings_parquet(path: str, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    from app.repos.repo_rag import get_latest_registry
+
+    reg = await get_latest_registry()
+    if reg is None or not reg.faiss_path:
+        return 0
+    return await asyncio.to_thread(
+        _write_embeddings, reg.faiss_path, list(reg.faiss_to_chunk_ids or []), path, batch_size
+    )
+
+
+def read_embeddings(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """embeddings.parquet -> (chunk_ids int64[n], vectors float32[n, dim])."""
+    _, pq = _arrow()
+    table = pq.read_table(path, columns=["chunk_id", "embedding"])
+    ids = table.column("chunk_id").to_numpy()
+    emb = table.column("embedding").combine_chunks()
+    dim = emb.type.list_size
+    vectors = emb.flatten().to_numpy().reshape(-1, dim)
+    return ids, vectors
+
+
+async def export_columnar(out_dir: Optional[str] = None) -> Dict:
+    """Write chunks.parquet and embeddings.parquet into a fresh export directory."""
+    _arrow()
+    out_dir = out_dir or os.path.join(EXPORT_DIR, datetime.utcnow().strftime("%Y%m%d%H%M%S"))
+    os.makedirs(out_dir, exist_ok=True)
+
+    chunks_path = os.path.join(out_dir, "chunks.parquet")
+    embeddings_path = os.path.join(out_dir, "embeddings.parquet")
+    n_chunks = await export_chunks_parquet(chunks_path)
+    n_vectors = await export_embeddings_parquet(embeddings_path)
+
+    print(f"[EXPORT] {n_chunks} chunks, {n_vectors} embeddings -> {out_dir}")
+    return {
+        "dir": out_dir,
+        "chunks": {"path": chunks_path, "rows": n_chunks},
+        "embeddings": {"path": embeddings_path if n_vectors else None, "rows": n_vectors},
+    }
@@ -1,18 +1,42 @@
 # backend/app/services/evaluator.py
+"""
+Evaluation runner.
+
+The dataset is processed in batches of EVAL_BATCH_SIZE questions: one
+hybrid_search_batch call retrieves context for the whole batch (single
+encode + FAISS search), then answers are generated in worker threads,
+at most EVAL_GEN_CONCURRENCY at a time. Finished items are inserted as
+EvaluationItem rows (chunk ids + scores, no chunk text) at least every
+EVAL_FLUSH_SEC seconds, together with completed_items and the running
+summary in Evaluation.results, so GET /evaluation/{id}/status can report
+progress and an ETA while the job runs and a crash keeps the partial
+results.
+"""
 
 import os
 import json
 import time
+import asyncio
 from datetime import datetime
+from typing import Dict, List, Optional
 
 from app.db.session import async_session
-from app.models.models import Evaluation
-from app.core.rag_engine import hybrid_search_db, build_context
-from app.core.llm import generate_answer
+from app.models.models import Evaluation, EvaluationItem
+from app.core.rag_engine import hybrid_search_batch
+from app.services.generator import generate_with_lora
+from app.services.stub_models import STUB_MODELS
+import app.services.lora_loader as lora
 
 EVAL_DIR = "data/eval"
 DATASET_PATH = os.path.join(EVAL_DIR, "dataset.json")
 
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "32"))
+EVAL_GEN_CONCURRENCY = int(os.getenv("EVAL_GEN_CONCURRENCY", "2"))
+EVAL_FLUSH_SEC = float(os.getenv("EVAL_FLUSH_SEC", "2"))
+EVAL_MAX_NEW_TOKENS = int(os.getenv("EVAL_MAX_NEW_TOKENS", "128"))
+EVAL_TOP_K = int(os.getenv("EVAL_TOP_K", "5"))
+EVAL_ALPHA = float(os.getenv("EVAL_ALPHA", "0.1"))
+
 
 # ----------------------------------------
 # Load evaluation dataset
@@ -29,7 +53,14 @@ def load_eval_dataset():
     #   {"question": "...", "expected": "..."},
     #   ...
     # ]
-    return data
+    # the retrieval eval set's {"query": ..., "answer": ...} is accepted too
+    return [
+        {
+            "question": item.get("question") or item.get("query", ""),
+            "expected": item.get("expected") or item.get("answer", ""),
+        }
+        for item in data
+    ]
 
 
 # ----------------------------------------
@@ -59,70 +90,164 @@ def score_answer(pred: str, expected: str) -> float:
     return overlap / total
 
 
+# ----------------------------------------
+# Progress / persistence
+# ----------------------------------------
+async def create_evaluation(dataset_size: int) -> Evaluation:
+    ev = Evaluation(
+        name=f"eval_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+        params={
+            "dataset_size": dataset_size,
+            "top_k": EVAL_TOP_K,
+            "alpha": EVAL_ALPHA,
+            "batch_size": EVAL_BATCH_SIZE,
+            "generation_concurrency": EVAL_GEN_CONCURRENCY,
+            "max_new_tokens": EVAL_MAX_NEW_TOKENS,
+        },
+        total_items=dataset_size,
+    )
+    async with async_session() as session:
+        session.add(ev)
+        await session.commit()
+        await session.refresh(ev)
+    return ev
+
+
+async def _save_progress(evaluation_id: int, items: Optional[List[Dict]] = None, **fields):
+    """Insert finished items and update the parent row in one transaction."""
+    async with async_session() as session:
+        if items:
+            session.add_all(EvaluationItem(evaluation_id=evaluation_id, **item) for item in items)
+        ev = await session.get(Evaluation, evaluation_id)
+        for k, v in fields.items():
+            setattr(ev, k, v)
+        await session.commit()
+
+
+def _summary(completed: int, total_score: float, errors: int, took: float) -> Dict:
+    return {
+        "overall_score": total_score / completed if completed else 0.0,
+        "errors": errors,
+        "time_sec": took,
+    }
+
+
+def get_progress(ev: Evaluation) -> Dict:
+    """Status payload with throughput and ETA derived from the persisted counters."""
+    end = ev.finished_at or datetime.utcnow()
+    elapsed = max((end - ev.run_at).total_seconds(), 0.0)
+    rate = ev.completed_items / elapsed if elapsed > 0 and ev.completed_items else 0.0
+    remaining = max(ev.total_items - ev.completed_items, 0)
+    eta = None
+    if ev.status == "running" and rate > 0:
+        eta = round(remaining / rate, 1)
+    elif ev.status == "completed":
+        eta = 0.0
+    return {
+        "id": ev.id,
+        "name": ev.name,
+        "status": ev.status,
+        "total_items": ev.total_items,
+        "completed_items": ev.completed_items,
+        "percent": round(100.0 * ev.completed_items / ev.total_items, 1) if ev.total_items else 0.0,
+        "elapsed_sec": round(elapsed, 1),
+        "items_per_sec": round(rate, 3),
+        "eta_sec": eta,
+        "score_so_far": (ev.results or {}).get("overall_score"),
+        "error": ev.error,
+    }
+
+
 # ----------------------------------------
 # RUN FULL EVALUATION JOB
 # ----------------------------------------
-async def run_evaluation_job():
+async def _answer_item(item: Dict, hits: List[Dict], sem: asyncio.Semaphore) -> Dict:
+    async with sem:
+        try:
+            answer = await asyncio.to_thread(generate_with_lora, item["question"], hits, EVAL_MAX_NEW_TOKENS)
+            error = None
+        except Exception as e:
+            answer, error = "", str(e)
+
+    return {
+        "item_index": item["index"],
+        "question": item["question"],
+        "expected": item["expected"],
+        "answer": answer,
+        "score": score_answer(answer, item["expected"]),
+        "chunk_ids": [h["chunk_id"] for h in hits],
+        "chunk_scores": [round(h["score"], 6) for h in hits],
+        "error": error,
+    }
+
+
+async def run_evaluation_job(evaluation_id: Optional[int] = None):
     dataset = load_eval_dataset()
     if not dataset:
         print("[EVAL] No evaluation dataset found.")
+        if evaluation_id is not None:
+            await _save_progress(evaluation_id, status="failed", error="No evaluation dataset found.",
+                                 finished_at=datetime.utcnow())
         return
 
-    print(f"[EVAL] Running evaluation for {len(dataset)} questions…")
+    if evaluation_id is None:
+        evaluation_id = (await create_evaluation(len(dataset))).id
 
-    results = []
-    total_score = 0
-    start_time = time.time()
-
-    # ------------------------------------------------------
-    # Loop through dataset
-    # ------------------------------------------------------
-    for item in dataset:
-        question = item["question"]
-        expected = item.get("expected", "")
-
-        # 1) retrieve RAG chunks
-        hits = await hybrid_search_db(question, top_k=5)
-        context = build_context(hits, max_chars=1500)
-
-        # 2) generate answer
-        answer = await generate_answer(question, context)
-
-        # 3) score answer
-        s = score_answer(answer, expected)
-        total_score += s
-
-        results.append({
-            "question": question,
-            "expected": expected,
-            "answer": answer,
-            "score": s,
-            "retrieved_chunks": hits,
-        })
-
-    avg_score = total_score / len(dataset)
-    took = time.time() - start_time
+    model, _ = lora.get_lora_model()
+    if model is None and not STUB_MODELS:
+        print("[EVAL] LoRA not loaded; aborting evaluation.")
+        await _save_progress(evaluation_id, status="failed", error="LoRA not loaded",
+                             finished_at=datetime.utcnow())
+        return
 
-    print(f"[EVAL] DONE — Avg Score={avg_score:.3f}  Time={took:.1f}s")
+    print(f"[EVAL] Running evaluation id={evaluation_id} for {len(dataset)} questions "
+          f"(batch={EVAL_BATCH_SIZE}, concurrency={EVAL_GEN_CONCURRENCY})…")
 
-    # ------------------------------------------------------
-    # Save to DB
-    # ------------------------------------------------------
-    ev = Evaluation(
-        name=f"eval_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-        params={"dataset_size": len(dataset)},
-        results={
-            "overall_score": avg_score,
-            "details": results,
-            "time_sec": took,
-        }
-    )
+    start_time = time.time()
+    await _save_progress(evaluation_id, status="running", total_items=len(dataset), run_at=datetime.utcnow())
+
+    pending: List[Dict] = []
+    completed, errors = 0, 0
+    total_score = 0.0
+    last_flush = time.monotonic()
+    sem = asyncio.Semaphore(max(1, EVAL_GEN_CONCURRENCY))
+
+    async def flush(**fields):
+        nonlocal pending
+        batch, pending = pending, []
+        await _save_progress(evaluation_id, items=batch, completed_items=completed,
+                             results=_summary(completed, total_score, errors, time.time() - start_time),
+                             **fields)
+
+    try:
+        for start in range(0, len(dataset), EVAL_BATCH_SIZE):
+            batch = [dict(item, index=start + i) for i, item in enumerate(dataset[start:start + EVAL_BATCH_SIZE])]
+
+            # 1) retrieve RAG chunks for the whole batch
+            batch_hits = await hybrid_search_batch([b["question"] for b in batch], top_k=EVAL_TOP_K, alpha=EVAL_ALPHA)
+
+            # 2) generate + score, bounded concurrency; persist as items finish
+            tasks = [asyncio.create_task(_answer_item(item, hits, sem)) for item, hits in zip(batch, batch_hits)]
+            for fut in asyncio.as_completed(tasks):
+                row = await fut
+                pending.append(row)
+                completed += 1
+                total_score += row["score"]
+                errors += row["error"] is not None
+                if time.monotonic() - last_flush >= EVAL_FLUSH_SEC:
+                    await flush()
+                    last_flush = time.monotonic()
+
+    except Exception as e:
+        print(f"[EVAL] FAILED after {completed} items: {e}")
+        await flush(status="failed", error=str(e), finished_at=datetime.utcnow())
+        return
 
-    async with async_session() as session:
-        session.add(ev)
-        await session.commit()
-        await session.refresh(ev)
+    took = time.time() - start_time
+    await flush(status="completed", finished_at=datetime.utcnow())
 
-    print(f"[EVAL] Saved evaluation id={ev.id}")
+    print(f"[EVAL] DONE — Avg Score={_summary(completed, total_score, errors, took)['overall_score']:.3f}  "
+          f"Time={took:.1f}s")
+    print(f"[EVAL] Saved evaluation id={evaluation_id}")
 
-    return ev
+    return evaluation_id
@@ -0,0 +1,488 @@
+# backend/app/services/generator.py
+"""
+Answer generation with the active LoRA model.
+
+Every prompt starts with the same instruction header, so its past
+key/values are computed once per loaded model and reused; the prefill
+for a request then only covers the context + question tokens.
+
+Optionally (LORA_KV_CACHE_BLOCKS > 0) the KV for header + first context
+block is kept in a small LRU, so repeated questions that retrieve the
+same top chunk skip that block's prefill as well. Each cached block
+costs roughly n_layers * 2 * n_tokens * hidden * 4 bytes (~30MB for a
+400 token block on gpt2), so the default is off.
+
+Prompts are assembled from token ids rather than re-tokenizing a prompt
+string: chunk bodies use the ids stored at ingest (or an in-process LRU
+for chunks indexed under another tokenizer) and are packed by score into
+a token budget that always leaves room for the question and the
+generated tokens.
+
+With LORA_DRAFT_MODEL set, decoding is speculative (assisted generation):
+a small draft LM proposes tokens that the active model verifies in one
+forward pass. The prompt is then prefilled in full (the cached prefix KV
+belongs to the active model, not the draft). Acceptance rate and
+tokens/sec are tracked for both modes (get_speculative_stats) and
+benchmark_speculative compares them directly.
+"""
+
+import copy
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+import app.services.lora_loader as lora
+from app.services.stub_models import STUB_MODELS, stub_generate
+from app.utils.metrics import STAGE_SECONDS, counter, gauge, histogram, record_cache
+
+PROMPT_HEADER = (
+    "You are an assistant that answers using ONLY the provided context.\n\n"
+    "Context:\n"
+)
+CONTEXT_BLOCK_END = "\n[---end---]\n\n"
+MAX_PROMPT_TOKENS = 1024
+MAX_NEW_TOKENS = int(os.getenv("LORA_MAX_NEW_TOKENS", "200"))
+# upper bound on packed context tokens (prefill cost); 0 = fill the model window
+CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "512"))
+KV_CACHE_BLOCKS = int(os.getenv("LORA_KV_CACHE_BLOCKS", "0"))
+# draft tokens proposed per verification round when LORA_DRAFT_MODEL is set
+DRAFT_TOKENS = int(os.getenv("LORA_DRAFT_TOKENS", "5"))
+TOKEN_CACHE_SIZE = int(os.getenv("RAG_TOKEN_CACHE_SIZE", "20000"))
+
+_cache_lock = Lock()
+_cache_version: Optional[int] = None
+_header_cache: Optional[Tuple[List[int], object]] = None
+_block_cache: "OrderedDict[Tuple[int, ...], Tuple[List[int], object]]" = OrderedDict()
+_token_cache: "OrderedDict[Tuple[str, int], List[int]]" = OrderedDict()
+_stats = {"header_hits": 0, "header_misses": 0, "block_hits": 0, "block_misses": 0,
+          "token_hits": 0, "token_misses": 0}
+
+GENERATED_TOKENS = counter("llm_generated_tokens_total", "Tokens generated", ["mode"])
+PROMPT_TOKENS = counter("llm_prompt_tokens_total", "Prompt tokens, including the KV-cached prefix")
+TOKENS_PER_SECOND = histogram(
+    "llm_tokens_per_second", "Decode throughput per generation", ["mode"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+GENERATIONS_IN_FLIGHT = gauge("llm_generations_in_flight", "Generations currently running")
+
+
+# -------------------------
+# KV cache helpers
+# -------------------------
+def _clone_past(past):
+    """
+    Legacy tuple caches are never mutated by generate(), so they can be
+    shared; Cache objects (newer transformers) grow in place and must be copied.
+    """
+    if isinstance(past, tuple):
+        return past
+    return copy.deepcopy(past)
+
+
+def _forward_past(model, ids: List[int], past=None):
+    import torch
+
+    device = next(model.parameters()).device
+    input_ids = torch.tensor([ids], dtype=torch.long, device=device)
+    with torch.no_grad():
+        out = model(input_ids=input_ids, past_key_values=_clone_past(past) if past is not None else None,
+                    use_cache=True)
+    return out.past_key_values
+
+
+def _reset_if_stale():
+    """Drop cached KV when a different model/adapter has been loaded."""
+    global _cache_version, _header_cache
+    version = lora.get_model_version()
+    if version != _cache_version:
+        _cache_version = version
+        _header_cache = None
+        _block_cache.clear()
+
+
+def _get_header_past(model, tokenizer, info: Optional[Dict] = None) -> Tuple[List[int], object]:
+    global _header_cache
+    with _cache_lock:
+        _reset_if_stale()
+        hit = _header_cache is not None
+        if info is not None:
+            info["header_kv_hit"] = hit
+        record_cache("header_kv", hit)
+        if hit:
+            _stats["header_hits"] += 1
+            return _header_cache
+        _stats["header_misses"] += 1
+        ids = tokenizer(PROMPT_HEADER, add_special_tokens=False)["input_ids"]
+        _header_cache = (ids, _forward_past(model, ids))
+        return _header_cache
+
+
+def _get_block_past(model, header: Tuple[List[int], object], block_ids: List[int],
+                    info: Optional[Dict] = None) -> Tuple[List[int], object]:
+    """KV for header + block, served from the LRU when possible."""
+    key = tuple(block_ids)
+    with _cache_lock:
+        hit = _block_cache.get(key)
+        if info is not None:
+            info["block_kv_hit"] = hit is not None
+        record_cache("block_kv", hit is not None)
+        if hit is not None:
+            _block_cache.move_to_end(key)
+            _stats["block_hits"] += 1
+            return hit
+        _stats["block_misses"] += 1
+
+    header_ids, header_past = header
+    entry = (header_ids + block_ids, _forward_past(model, block_ids, past=header_past))
+
+    with _cache_lock:
+        _block_cache[key] = entry
+        while len(_block_cache) > KV_CACHE_BLOCKS:
+            _block_cache.popitem(last=False)
+    return entry
+
+
+def get_prefix_cache_stats() -> Dict:
+    with _cache_lock:
+        return {
+            **_stats,
+            "cached_blocks": len(_block_cache),
+            "max_cached_blocks": KV_CACHE_BLOCKS,
+            "cached_chunk_tokens": len(_token_cache),
+        }
+
+
+# -------------------------
+# Token-budget context packing
+# -------------------------
+def _encode(tokenizer, text: str) -> List[int]:
+    return tokenizer(text, add_special_tokens=False)["input_ids"]
+
+
+def _count(info: Optional[Dict], key: str):
+    if info is not None:
+        info[key] = info.get(key, 0) + 1
+
+
+def chunk_token_ids(hit: Dict, tokenizer, info: Optional[Dict] = None) -> List[int]:
+    """
+    Token ids of a chunk body for the active tokenizer: the ids stored at
+    ingest when they were produced by the same tokenizer, otherwise an
+    in-process LRU keyed by (tokenizer, chunk id).
+    """
+    tokenizer_key = lora.get_tokenizer_key()
+    if hit.get("token_ids") is not None and hit.get("tokenizer_key") == tokenizer_key:
+        _count(info, "chunk_tokens_stored")
+        record_cache("chunk_tokens", True)
+        return hit["token_ids"]
+
+    key = (tokenizer_key, hit.get("chunk_id"))
+    if key[1] is not None:
+        with _cache_lock:
+            ids = _token_cache.get(key)
+            if ids is not None:
+                _token_cache.move_to_end(key)
+                _stats["token_hits"] += 1
+                _count(info, "chunk_tokens_cached")
+                record_cache("chunk_tokens", True)
+                return ids
+            _stats["token_misses"] += 1
+    _count(info, "chunk_tokens_encoded")
+    record_cache("chunk_tokens", False)
+
+    ids = _encode(tokenizer, (hit.get("text") or "").strip())
+    if key[1] is not None:
+        with _cache_lock:
+            _token_cache[key] = ids
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return ids
+
+
+def _block_header(hit: Dict) -> str:
+    # no score in the header: identical chunks give identical ids, so their KV can be reused
+    return f"[DOC: {hit.get('doc_id')} | page {hit.get('page')} | chars {hit.get('start_char')}:{hit.get('end_char')}]\n"
+
+
+def pack_context_ids(hits: List[Dict], tokenizer, budget: int, info: Optional[Dict] = None) -> List[List[int]]:
+    """
+    Greedily pack whole context blocks (hits are already sorted by score)
+    into `budget` tokens, skipping blocks that no longer fit. If even the
+    top-ranked block does not fit, its body is truncated to fill the budget.
+    Returns one id list per packed block.
+    """
+    end_ids = _encode(tokenizer, CONTEXT_BLOCK_END)
+    blocks: List[List[int]] = []
+    used = 0
+    for i, h in enumerate(hits):
+        head_ids = _encode(tokenizer, _block_header(h))
+        body_ids = chunk_token_ids(h, tokenizer, info)
+        size = len(head_ids) + len(body_ids) + len(end_ids)
+        if used + size <= budget:
+            blocks.append(head_ids + body_ids + end_ids)
+            used += size
+        elif i == 0:
+            room = budget - len(head_ids) - len(end_ids)
+            if room > 0:
+                blocks.append(head_ids + body_ids[:room] + end_ids)
+                used += len(head_ids) + room + len(end_ids)
+    return blocks
+
+
+def _context_window(model, tokenizer) -> int:
+    config = getattr(model, "config", None)
+    window = getattr(config, "n_positions", None) or getattr(config, "max_position_embeddings", None)
+    if not window:
+        window = min(getattr(tokenizer, "model_max_length", MAX_PROMPT_TOKENS), MAX_PROMPT_TOKENS)
+    return int(window)
+
+
+# -------------------------
+# Speculative decoding stats
+# -------------------------
+def _new_decode_stats() -> Dict:
+    return {"requests": 0, "new_tokens": 0, "target_calls": 0, "draft_calls": 0, "decode_sec": 0.0}
+
+
+_decode_stats = {"plain": _new_decode_stats(), "speculative": _new_decode_stats()}
+
+
+def _summarize(stats: Dict) -> Dict:
+    out = dict(stats)
+    out["tokens_per_sec"] = stats["new_tokens"] / stats["decode_sec"] if stats["decode_sec"] else None
+    out["tokens_per_target_call"] = stats["new_tokens"] / stats["target_calls"] if stats["target_calls"] else None
+    # every verification round yields its accepted draft tokens plus one token from the target
+    accepted = stats["new_tokens"] - stats["target_calls"]
+    out["acceptance_rate"] = max(accepted, 0) / stats["draft_calls"] if stats["draft_calls"] else None
+    return out
+
+
+def get_speculative_stats() -> Dict:
+    with _cache_lock:
+        plain = _summarize(_decode_stats["plain"])
+        spec = _summarize(_decode_stats["speculative"])
+    speedup = None
+    if plain["tokens_per_sec"] and spec["tokens_per_sec"]:
+        speedup = spec["tokens_per_sec"] / plain["tokens_per_sec"]
+    return {
+        "draft_model": lora.DRAFT_MODEL or None,
+        "draft_tokens": DRAFT_TOKENS,
+        "plain": plain,
+        "speculative": spec,
+        "speedup": speedup,
+    }
+
+
+def _count_forwards(module, counter: List[int]):
+    def hook(*_):
+        counter[0] += 1
+    return module.register_forward_hook(hook)
+
+
+def _inner_model(model):
+    # PeftModel.generate delegates to the wrapped causal LM; count calls there
+    return model.get_base_model() if hasattr(model, "get_base_model") else model
+
+
+# -------------------------
+# Generation
+# -------------------------
+def _build_inputs(model, tokenizer, question: str, hits: List[Dict], max_new_tokens: int,
+                  info: Optional[Dict] = None):
+    """Return (input_ids tensor, past for its cached prefix)."""
+    import torch
+
+    device = next(model.parameters()).device
+
+    prefix_ids, past = _get_header_past(model, tokenizer, info)
+
+    # prompt budget = model window minus the tokens we are about to generate
+    prompt_budget = _context_window(model, tokenizer) - max_new_tokens
+
+    # the question is always kept; it is only shortened if it alone overflows the budget
+    tail_head = _encode(tokenizer, "Question:")
+    tail_end = _encode(tokenizer, "\nAnswer:")
+    question_ids = _encode(tokenizer, " " + question.strip())
+    room = prompt_budget - len(prefix_ids) - len(tail_head) - len(tail_end)
+    question_ids = question_ids[:max(room, 0)]
+    tail_ids = tail_head + question_ids + tail_end
+
+    context_budget = prompt_budget - len(prefix_ids) - len(tail_ids)
+    if CONTEXT_TOKENS > 0:
+        context_budget = min(context_budget, CONTEXT_TOKENS)
+    blocks = pack_context_ids(hits, tokenizer, max(context_budget, 0), info)
+
+    if KV_CACHE_BLOCKS > 0 and blocks:
+        prefix_ids, past = _get_block_past(model, (prefix_ids, past), blocks[0], info)
+        blocks = blocks[1:]
+
+    rest_ids = [t for b in blocks for t in b] + tail_ids
+    if info is not None:
+        info["prompt_tokens"] = len(prefix_ids) + len(rest_ids)
+        info["prefill_tokens"] = len(rest_ids)
+
+    input_ids = torch.tensor([prefix_ids + rest_ids], dtype=torch.long, device=device)
+    return input_ids, past
+
+
+def _decode(model, tokenizer, input_ids, past, max_new_tokens: int, draft=None):
+    """
+    Run generate() and record decode stats. With a draft model this is
+    assisted decoding: the draft proposes DRAFT_TOKENS per round and the
+    target verifies them in one forward pass; greedy output is unchanged.
+    The prefix KV cache is not used then: generate() hands past_key_values
+    to the draft as well, which would decode against the target's layers.
+    Forward counts come from hooks, so concurrent calls skew them slightly.
+    """
+    import torch
+
+    target_calls, draft_calls = [0], [0]
+    hooks = [_count_forwards(_inner_model(model), target_calls)]
+    kwargs = {}
+    if draft is not None:
+        hooks.append(_count_forwards(draft, draft_calls))
+        draft.generation_config.num_assistant_tokens = DRAFT_TOKENS
+        kwargs["assistant_model"] = draft
+
+    t0 = time.perf_counter()
+    try:
+        output_ids = model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=_clone_past(past) if draft is None else None,
+            max_new_tokens=max_new_tokens,
+            temperature=0.7,
+            top_p=0.9,
+            top_k=50,
+            repetition_penalty=1.2,
+            no_repeat_ngram_size=3,
+            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+            **kwargs,
+        )
+    finally:
+        for h in hooks:
+            h.remove()
+    took = time.perf_counter() - t0
+
+    # remove prompt
+    generated = output_ids[0, input_ids.shape[1]:]
+
+    with _cache_lock:
+        st = _decode_stats["speculative" if draft is not None else "plain"]
+        st["requests"] += 1
+        st["new_tokens"] += int(generated.shape[0])
+        st["target_calls"] += target_calls[0]
+        st["draft_calls"] += draft_calls[0]
+        st["decode_sec"] += took
+
+    return generated, took
+
+
+def _postprocess(tokenizer, generated) -> str:
+    text = tokenizer.decode(generated, skip_special_tokens=True).strip()
+
+    # Clean up GPT-2 repeating "Answer:"
+    if text.lower().startswith("answer:"):
+        text = text[7:].strip()
+
+    return text
+
+
+def generate_with_lora(question: str, hits: List[Dict], max_new_tokens: int = MAX_NEW_TOKENS,
+                       speculative: Optional[bool] = None, info: Optional[Dict] = None) -> str:
+    """
+    speculative=None uses the draft model whenever one is loaded
+    (LORA_DRAFT_MODEL); pass False/True to force a mode.
+    Pass a dict as `info` to receive cache hits and token counts for this call.
+    """
+    if STUB_MODELS:
+        return _generate_stub(question, hits, max_new_tokens, info)
+
+    model, tokenizer = lora.get_lora_model()
+
+    if model is None or tokenizer is None:
+        raise RuntimeError("LoRA not loaded")
+
+    draft = lora.get_draft_model() if speculative is not False else None
+    if speculative and draft is None:
+        raise RuntimeError("Speculative decoding requested but no draft model is loaded")
+
+    mode = "speculative" if draft is not None else "plain"
+    with GENERATIONS_IN_FLIGHT.track_inprogress():
+        with STAGE_SECONDS.labels(stage="context").time():
+            input_ids, past = _build_inputs(model, tokenizer, question, hits, max_new_tokens, info)
+        t0 = time.perf_counter()
+        generated, _ = _decode(model, tokenizer, input_ids, past, max_new_tokens, draft=draft)
+        elapsed = time.perf_counter() - t0
+
+    STAGE_SECONDS.labels(stage="generate").observe(elapsed)
+    PROMPT_TOKENS.inc(int(input_ids.shape[-1]))
+    GENERATED_TOKENS.labels(mode=mode).inc(int(generated.shape[0]))
+    if elapsed > 0:
+        TOKENS_PER_SECOND.labels(mode=mode).observe(generated.shape[0] / elapsed)
+    if info is not None:
+        info["new_tokens"] = int(generated.shape[0])
+        info["speculative"] = draft is not None
+        if draft is not None:
+            info["prefill_tokens"] = int(input_ids.shape[-1])
+    return _postprocess(tokenizer, generated)
+
+
+def _generate_stub(question: str, hits: List[Dict], max_new_tokens: int, info: Optional[Dict]) -> str:
+    with GENERATIONS_IN_FLIGHT.track_inprogress():
+        t0 = time.perf_counter()
+        answer, n_tokens = stub_generate(question, hits, max_new_tokens)
+        elapsed = time.perf_counter() - t0
+
+    STAGE_SECONDS.labels(stage="generate").observe(elapsed)
+    GENERATED_TOKENS.labels(mode="stub").inc(n_tokens)
+    if elapsed > 0:
+        TOKENS_PER_SECOND.labels(mode="stub").observe(n_tokens / elapsed)
+    if info is not None:
+        info["new_tokens"] = n_tokens
+        info["speculative"] = False
+    return answer
+
+
+def benchmark_speculative(items: List[Tuple[str, List[Dict]]], max_new_tokens: int = 64) -> Dict:
+    """
+    Decode each (question, hits) pair with and without the draft model on
+    identical inputs and report latency, tokens/sec, acceptance rate and
+    speedup, so a deployment can decide whether LORA_DRAFT_MODEL pays off.
+    """
+    model, tokenizer = lora.get_lora_model()
+    draft = lora.get_draft_model()
+    if model is None or tokenizer is None:
+        raise RuntimeError("LoRA not loaded")
+    if draft is None:
+        raise RuntimeError("No draft model loaded (set LORA_DRAFT_MODEL)")
+
+    totals = {"plain": _new_decode_stats(), "speculative": _new_decode_stats()}
+    matches = 0
+    for question, hits in items:
+        input_ids, past = _build_inputs(model, tokenizer, question, hits, max_new_tokens)
+        outputs = {}
+        for mode, d in (("plain", None), ("speculative", draft)):
+            with _cache_lock:
+                before = dict(_decode_stats[mode])
+            generated, _ = _decode(model, tokenizer, input_ids, past, max_new_tokens, draft=d)
+            with _cache_lock:
+                after = _decode_stats[mode]
+                for k in totals[mode]:
+                    totals[mode][k] += after[k] - before[k]
+            outputs[mode] = generated.tolist()
+        matches += outputs["plain"] == outputs["speculative"]
+
+    plain, spec = _summarize(totals["plain"]), _summarize(totals["speculative"])
+    return {
+        "prompts": len(items),
+        "max_new_tokens": max_new_tokens,
+        "draft_model": lora.DRAFT_MODEL,
+        "draft_tokens": DRAFT_TOKENS,
+        "plain": plain,
+        "speculative": spec,
+        "speedup": (plain["decode_sec"] / spec["decode_sec"]) if spec["decode_sec"] else None,
+        "outputs_match": matches,
+    }
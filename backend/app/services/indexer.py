@@ -1,21 +1,28 @@
 # backend/app/services/indexer.py
 
 import os
+import time
 from typing import List
 from datetime import datetime
-import numpy as np
-import faiss
 
 from sqlmodel import select
 from sqlalchemy import select as sa_select
 from app.utils.faiss_merge import merge_faiss_indexes
-from app.repos.repo_rag import get_all_faiss_registries
+from app.repos.repo_rag import get_all_faiss_registries, increment_counters
 
 
 from app.models.models import Document, Chunk, FaissIndexRegistry
 from app.db.session import async_session
-from app.core.rag_engine import load_pdf_pages, chunk_page_semantic, get_model
+from app.core.rag_engine import load_pdf_pages, chunk_page_semantic, get_model, invalidate_retrieval_snapshot
 from app.utils.faiss_store import save_faiss_index
+from app.services.chunk_text import compress_chunk, compression_enabled, ensure_text_dictionaries
+import app.services.lora_loader as lora
+from app.utils.metrics import INGEST_STAGE_SECONDS, counter, gauge
+
+INGESTED_DOCUMENTS = counter("rag_ingested_documents_total", "Ingestion runs by outcome", ["status"])
+INGESTED_CHUNKS = counter("rag_ingested_chunks_total", "Chunks written by ingestion")
+INGESTED_PAGES = counter("rag_ingested_pages_total", "PDF pages parsed by ingestion")
+INGESTIONS_IN_FLIGHT = gauge("rag_ingestions_in_flight", "Documents currently being indexed")
 
 DATA_DIR = "data"
 FAISS_DIR = os.path.join(DATA_DIR, "faiss")
@@ -64,15 +71,36 @@ async def merge_all_indexes():
 
     async with async_session() as session:
         session.add(global_registry)
+        await increment_counters(session, {"faiss_indexes": 1})
         await session.commit()
         await session.refresh(global_registry)
 
+    invalidate_retrieval_snapshot()
+
     print("[MERGE] Global registry saved ID=", global_registry.id)
     print(f"[MERGE] Total chunks in global index: {global_registry.total_chunks}")
 
     return global_registry
 
+def _stage(name: str, t0: float) -> float:
+    """Record an ingestion stage that started at t0; returns the new checkpoint."""
+    now = time.perf_counter()
+    INGEST_STAGE_SECONDS.labels(stage=name).observe(now - t0)
+    return now
+
+
 async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = None):
+    status = "error"
+    with INGESTIONS_IN_FLIGHT.track_inprogress():
+        try:
+            result = await _index_pdf(pdf_path, doc_id, model_device)
+            status = (result or {}).get("status", "empty")
+            return result
+        finally:
+            INGESTED_DOCUMENTS.labels(status=status).inc()
+
+
+async def _index_pdf(pdf_path: str, doc_id: str, model_device: str = None):
     print(f"[Indexer] Checking document: {doc_id}")
 
     # ---------------------------------------------------------
@@ -94,6 +122,7 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
     async with async_session() as session:
         document = Document(doc_id=doc_id, file_path=pdf_path)
         session.add(document)
+        await increment_counters(session, {"documents": 1})
         await session.commit()
         await session.refresh(document)
 
@@ -102,7 +131,10 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
     # ---------------------------------------------------------
     # 2) LOAD PDF + GENERATE CHUNKS
     # ---------------------------------------------------------
+    t0 = time.perf_counter()
     pages = load_pdf_pages(pdf_path)
+    INGESTED_PAGES.inc(len(pages))
+    t0 = _stage("parse", t0)
     chunk_rows: List[Chunk] = []
 
     for page_no, text in enumerate(pages):
@@ -118,9 +150,31 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
                 )
             )
 
+    t0 = _stage("chunk", t0)
+
+    # store generation-tokenizer ids so /ask/ can pack context without re-tokenizing
+    _, tokenizer = lora.get_lora_model()
+    if tokenizer is not None and chunk_rows:
+        tokenizer_key = lora.get_tokenizer_key()
+        encoded = tokenizer([c.text.strip() for c in chunk_rows], add_special_tokens=False)["input_ids"]
+        for ch, ids in zip(chunk_rows, encoded):
+            ch.token_ids = ids
+            ch.token_count = len(ids)
+            ch.tokenizer_key = tokenizer_key
+
+    t0 = _stage("tokenize", t0)
+
+    # keep plain texts for embedding; rows may be stored compressed
+    texts_all = [c.text for c in chunk_rows]
+    if compression_enabled():
+        await ensure_text_dictionaries()
+        for ch in chunk_rows:
+            compress_chunk(ch)
+
     # BULK INSERT CHUNKS
     async with async_session() as session:
         session.add_all(chunk_rows)
+        await increment_counters(session, {"chunks": len(chunk_rows)})
         await session.commit()
         for ch in chunk_rows:
             await session.refresh(ch)
@@ -132,6 +186,8 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
     async with async_session() as session:
         session.add_all(chunk_rows)
         await session.commit()
+    INGESTED_CHUNKS.inc(len(chunk_rows))
+    t0 = _stage("db_insert", t0)
 
     print(f"[Indexer] Total chunks prepared: {len(chunk_rows)}")
     if not chunk_rows:
@@ -141,13 +197,15 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
     # ---------------------------------------------------------
     # 3) EMBEDDING + FAISS INDEX
     # ---------------------------------------------------------
+    import faiss
+
     model = get_model(device=model_device)
     embed_dim = model.get_sentence_embedding_dimension()
     index = faiss.IndexFlatIP(embed_dim)
 
     batch_size = 32
     for i in range(0, len(chunk_rows), batch_size):
-        texts = [c.text for c in chunk_rows[i:i+batch_size]]
+        texts = texts_all[i:i+batch_size]
         embeddings = model.encode(
             texts,
             convert_to_numpy=True,
@@ -155,6 +213,7 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
         ).astype("float32")
         index.add(embeddings)
 
+    t0 = _stage("embed", t0)
     print(f"[Indexer] Embeddings added: vectors={index.ntotal}")
 
     # ---------------------------------------------------------
@@ -165,6 +224,7 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
     faiss_path = os.path.join(FAISS_DIR, faiss_filename)
 
     save_faiss_index(index, faiss_path)
+    t0 = _stage("faiss_save", t0)
     print(f"[Indexer] FAISS saved: {faiss_path}")
 
     ordered_ids = [c.chunk_id for c in chunk_rows]
@@ -181,9 +241,13 @@ async def index_pdf_background(pdf_path: str, doc_id: str, model_device: str = N
 
     async with async_session() as session:
         session.add(registry)
+        await increment_counters(session, {"faiss_indexes": 1})
         await session.commit()
         await session.refresh(registry)
 
+    invalidate_retrieval_snapshot()
+    _stage("registry", t0)
+
     print(f"[Indexer] Registry saved ID={registry.id}")
     print(f"[Indexer] Completed indexing for {doc_id}")
 
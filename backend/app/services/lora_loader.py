@@ -1,36 +1,100 @@
+import hashlib
+import json
 import os
+import time
 from pathlib import Path
 from threading import Lock
-from typing import Optional, Tuple
+from typing import Optional, Tuple, TYPE_CHECKING
 
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-from peft import PeftModel
+# torch / transformers / peft are imported inside the loaders so that
+# importing this module (and app.main) stays cheap
+if TYPE_CHECKING:
+    import torch
+    from transformers import AutoTokenizer
+
+from app.utils.metrics import counter, gauge, histogram
 
 BASE_MODEL = os.getenv("LORA_BASE_MODEL", "gpt2")
+# optional small causal LM sharing the base vocabulary (e.g. distilgpt2);
+# when set, generation uses assisted (speculative) decoding
+DRAFT_MODEL = os.getenv("LORA_DRAFT_MODEL", "")
 
-_model: Optional[torch.nn.Module] = None
-_tokenizer: Optional[AutoTokenizer] = None
+_model: Optional["torch.nn.Module"] = None
+_tokenizer: Optional["AutoTokenizer"] = None
 _active_lora: Optional[str] = None
+# bumped on every load/unload so caches keyed on the model can detect swaps
+_model_version: int = 0
+# vocabulary fingerprint; chunk token ids stored at ingest are only valid for this key
+_tokenizer_key: Optional[str] = None
+_draft_model: Optional["torch.nn.Module"] = None
 
 _lock = Lock()
 
+MODEL_LOAD_SECONDS = histogram(
+    "llm_model_load_seconds", "Time to load a model (lora / base / draft)", ["kind"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+MODEL_LOADS = counter("llm_model_loads_total", "Model load attempts", ["kind", "result"])
+MODEL_LOADED = gauge("llm_model_loaded", "1 while a model of this kind is loaded", ["kind"])
+MODEL_VERSION = gauge("llm_model_version", "Incremented on every model load/unload")
+
+
+def _tokenizer_fingerprint(tok) -> str:
+    vocab = sorted(tok.get_vocab().items())
+    digest = hashlib.sha1(json.dumps(vocab, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{tok.__class__.__name__}:{digest[:16]}"
+
+
+def _ensure_draft_model(device: str):
+    """Load the draft model once; it does not depend on the active adapter."""
+    global _draft_model
+
+    if not DRAFT_MODEL or _draft_model is not None:
+        return
+
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    print(f"[LORA] Loading draft model: {DRAFT_MODEL}")
+    t0 = time.perf_counter()
+    try:
+        draft = AutoModelForCausalLM.from_pretrained(
+            DRAFT_MODEL,
+            torch_dtype=torch.float32,
+        )
+    except Exception as e:
+        MODEL_LOADS.labels(kind="draft", result="error").inc()
+        print(f"[LORA] ERROR: draft model failed to load, speculative decoding disabled: {e}")
+        return
+    draft.eval()
+    draft.to(device)
+    _draft_model = draft
+    MODEL_LOAD_SECONDS.labels(kind="draft").observe(time.perf_counter() - t0)
+    MODEL_LOADS.labels(kind="draft", result="ok").inc()
+    MODEL_LOADED.labels(kind="draft").set(1)
+
 
 def load_lora(lora_dir: str) -> bool:
     """
     Load a LoRA adapter + tokenizer from lora_dir.
     """
 
-    global _model, _tokenizer, _active_lora
+    global _model, _tokenizer, _active_lora, _model_version, _tokenizer_key
 
     lora_path = Path(lora_dir).resolve()
 
     if not (lora_path / "adapter_config.json").exists():
+        MODEL_LOADS.labels(kind="lora", result="error").inc()
         print(f"[LORA] ERROR: adapter_config.json not found in {lora_path}")
         return False
 
     print(f"[LORA] Loading LoRA from: {lora_path}")
 
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    from peft import PeftModel
+
+    t0 = time.perf_counter()
     with _lock:
         # Load tokenizer FROM THE LORA FOLDER
         tok = AutoTokenizer.from_pretrained(str(lora_path))
@@ -58,6 +122,14 @@ def load_lora(lora_dir: str) -> bool:
         _model = model
         _tokenizer = tok
         _active_lora = str(lora_path)
+        _tokenizer_key = _tokenizer_fingerprint(tok)
+        _model_version += 1
+        MODEL_LOAD_SECONDS.labels(kind="lora").observe(time.perf_counter() - t0)
+        MODEL_LOADS.labels(kind="lora", result="ok").inc()
+        MODEL_LOADED.labels(kind="lora").set(1)
+        MODEL_LOADED.labels(kind="base").set(0)
+        MODEL_VERSION.set(_model_version)
+        _ensure_draft_model(device)
 
         print("[LORA] LoRA loaded successfully.")
         return True
@@ -65,10 +137,14 @@ def load_lora(lora_dir: str) -> bool:
 
 def unload_lora() -> bool:
     """Return to pure base model."""
-    global _model, _tokenizer, _active_lora
+    global _model, _tokenizer, _active_lora, _model_version, _tokenizer_key
 
     print("[LORA] Unloading LoRA...")
 
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    t0 = time.perf_counter()
     with _lock:
         # Load base model tokenizer
         tok = AutoTokenizer.from_pretrained(BASE_MODEL)
@@ -87,18 +163,40 @@ def unload_lora() -> bool:
         _model = base
         _tokenizer = tok
         _active_lora = None
+        _tokenizer_key = _tokenizer_fingerprint(tok)
+        _model_version += 1
+        MODEL_LOAD_SECONDS.labels(kind="base").observe(time.perf_counter() - t0)
+        MODEL_LOADS.labels(kind="base", result="ok").inc()
+        MODEL_LOADED.labels(kind="lora").set(0)
+        MODEL_LOADED.labels(kind="base").set(1)
+        MODEL_VERSION.set(_model_version)
+        _ensure_draft_model(device)
 
     print("[LORA] LoRA removed; base model active.")
     return True
 
 
-def get_lora_model() -> Tuple[Optional[torch.nn.Module], Optional[AutoTokenizer]]:
+def get_lora_model() -> Tuple[Optional["torch.nn.Module"], Optional["AutoTokenizer"]]:
     return _model, _tokenizer
 
 
+def get_draft_model() -> Optional["torch.nn.Module"]:
+    return _draft_model
+
+
+def get_model_version() -> int:
+    return _model_version
+
+
+def get_tokenizer_key() -> Optional[str]:
+    return _tokenizer_key
+
+
 def get_lora_status():
     return {
         "base_model": BASE_MODEL,
         "active_lora": _active_lora,
-        "is_lora_loaded": _active_lora is not None
+        "is_lora_loaded": _active_lora is not None,
+        "draft_model": DRAFT_MODEL or None,
+        "is_draft_loaded": _draft_model is not None,
     }
@@ -0,0 +1,241 @@
+# backend/app/services/onnx_embedder.py
+"""
+ONNX Runtime backend for the sentence embedder.
+
+EMBED_BACKEND selects what rag_engine.get_model() returns:
+- torch (default): the sentence-transformers model
+- onnx: the same transformer exported to ONNX, run with onnxruntime on CPU
+- onnx-int8: that export with int8 dynamic quantization (int8 weights,
+  activations quantized on the fly), smaller and usually faster on CPU
+
+The export is written to EMBED_ONNX_DIR/<model name> on first use, or
+ahead of time with
+
+    cd backend
+    python -m app.services.onnx_embedder --quantize
+
+Tokenization, pooling (CLS for bge, or mean/max) and normalization follow
+the SentenceTransformer's own modules, so both backends produce the same
+vectors and existing FAISS indexes stay valid. Export checks that:
+PARITY_TEXTS are embedded by torch and by each ONNX variant, and the
+cosine similarities are stored in embedder.json. A variant whose minimum
+cosine is below EMBED_ONNX_MIN_COSINE is not loaded (get_model falls back
+to torch). benchmarks/bench_embedder.py measures parity on a larger
+corpus and throughput per backend.
+
+Needs the optional onnxruntime package (and onnx for --quantize).
+"""
+
+import argparse
+import inspect
+import json
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "data/onnx")
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+EMBED_ONNX_MIN_COSINE = float(os.getenv("EMBED_ONNX_MIN_COSINE", "0.98"))
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+CONFIG_FILE = "embedder.json"
+
+PARITY_TEXTS = [
+    "What is the leave policy?",
+    "How many vacation days do new employees get?",
+    "Travel expenses must be submitted within 30 days with original receipts.",
+    "Employees must report any conflict of interest to their manager in writing.",
+    "The code of conduct applies to all staff, contractors and temporary workers.",
+    "Remote work requests are approved by the department head.",
+    "Gifts above the stated value must be declared to the ethics committee.",
+    "Harassment complaints are handled confidentially by human resources.",
+]
+
+
+def export_dir(model_name: str) -> str:
+    return os.path.join(EMBED_ONNX_DIR, model_name.replace("/", "__"))
+
+
+# -------------------------
+# Runtime
+# -------------------------
+class OnnxEmbedder:
+    """The part of the SentenceTransformer API that rag_engine / indexer use, on onnxruntime."""
+
+    def __init__(self, model_dir: str, quantized: bool = False, threads: int = EMBED_ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dim"]
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        mode = self.config["pooling"]
+        if mode == "cls":
+            return hidden[:, 0]
+        m = mask[..., None].astype(hidden.dtype)
+        if mode == "mean":
+            return (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        return np.where(m > 0, hidden, -1e9).max(axis=1)  # max
+
+    def encode(self, texts: Union[str, List[str]], normalize_embeddings: bool = False,
+               convert_to_numpy: bool = True, batch_size: int = 32, **_) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        out = np.zeros((len(texts), self.config["dim"]), dtype="float32")
+        # longest first, like SentenceTransformer: batches of similar length pad less
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            enc = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                 max_length=self.config["max_seq_length"], return_tensors="np")
+            feeds = {name: enc[name].astype("int64") for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            out[idx] = self._pool(hidden, enc["attention_mask"])
+        if normalize_embeddings or self.config["normalize"]:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            np.divide(out, norms, out=out, where=norms > 0)
+        return out[0] if single else out
+
+
+def load_onnx_embedder(model_name: str, quantized: bool = False) -> OnnxEmbedder:
+    """Load (exporting first if needed) and refuse variants that failed the parity check."""
+    model_dir = export_dir(model_name)
+    variant = "onnx-int8" if quantized else "onnx"
+    config_path = os.path.join(model_dir, CONFIG_FILE)
+    if not os.path.exists(os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)) \
+            or not os.path.exists(config_path):
+        print(f"[EMBED] Exporting {model_name} to {model_dir} ({variant})…")
+        export_onnx(model_name, model_dir, quantize=quantized)
+
+    with open(config_path, encoding="utf-8") as f:
+        parity = json.load(f)["parity"].get(variant)
+    if parity is None or parity["min_cosine"] < EMBED_ONNX_MIN_COSINE:
+        raise RuntimeError(f"{variant} export of {model_name} failed the parity check: {parity} "
+                           f"(EMBED_ONNX_MIN_COSINE={EMBED_ONNX_MIN_COSINE})")
+    print(f"[EMBED] Using {variant} backend for {model_name} (min cosine vs torch {parity['min_cosine']})")
+    return OnnxEmbedder(model_dir, quantized=quantized)
+
+
+# -------------------------
+# Export
+# -------------------------
+def cosine_parity(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Row-wise cosine similarity between two embedding matrices."""
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cos = (ref * cand).sum(axis=1)
+    return {"min_cosine": round(float(cos.min()), 5), "mean_cosine": round(float(cos.mean()), 5)}
+
+
+def _pooling_mode(st) -> str:
+    for module in st:
+        if type(module).__name__ == "Pooling":
+            mode = module.get_pooling_mode_str()
+            if mode not in ("cls", "mean", "max"):
+                raise ValueError(f"Unsupported pooling for ONNX export: {mode}")
+            return mode
+    raise ValueError("SentenceTransformer has no Pooling module")
+
+
+def export_onnx(model_name: str, model_dir: Optional[str] = None, quantize: bool = False,
+                opset: int = 14) -> Dict:
+    """Export the transformer to ONNX (+ int8), save tokenizer and config, record parity."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model_dir = model_dir or export_dir(model_name)
+    os.makedirs(model_dir, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    auto_model = st[0].auto_model.eval()
+    sample = st.tokenizer(["export sample"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+
+    class _Encoder(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = auto_model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    axes = {0: "batch", 1: "sequence"}
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # the TorchScript exporter handles HF models without onnxscript
+    fp32_path = os.path.join(model_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            _Encoder(), tuple(sample[n] for n in input_names), fp32_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes={**{n: axes for n in input_names}, "last_hidden_state": axes},
+            opset_version=opset, do_constant_folding=True, **kwargs,
+        )
+    st.tokenizer.save_pretrained(model_dir)
+
+    config = {
+        "model": model_name,
+        "dim": st.get_sentence_embedding_dimension(),
+        "max_seq_length": st.max_seq_length,
+        "pooling": _pooling_mode(st),
+        "normalize": any(type(m).__name__ == "Normalize" for m in st),
+        "parity": {},
+    }
+    with open(os.path.join(model_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    variants = {"onnx": False}
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(model_dir, INT8_FILE), weight_type=QuantType.QInt8)
+        variants["onnx-int8"] = True
+
+    reference = st.encode(PARITY_TEXTS, convert_to_numpy=True)
+    for variant, quantized in variants.items():
+        candidate = OnnxEmbedder(model_dir, quantized=quantized).encode(PARITY_TEXTS)
+        config["parity"][variant] = cosine_parity(reference, candidate)
+    with open(os.path.join(model_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    print(f"[EMBED] Exported {model_name} -> {model_dir}: parity {config['parity']}")
+    return config
+
+
+# -------------------------
+# Benchmark helpers
+# -------------------------
+def throughput(model, texts: Sequence[str], batch_size: int) -> Dict[str, float]:
+    """Texts/sec encoding `texts` in batches of `batch_size` (one warm-up batch first)."""
+    model.encode(list(texts[:batch_size]), normalize_embeddings=True, batch_size=batch_size)
+    t0 = time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        model.encode(list(texts[start:start + batch_size]), normalize_embeddings=True, batch_size=batch_size)
+    sec = time.perf_counter() - t0
+    return {
+        "texts_per_sec": round(len(texts) / sec, 1),
+        "ms_per_batch": round(sec * 1000 / max(1, -(-len(texts) // batch_size)), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the sentence embedder to ONNX.")
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL_NAME", "BAAI/bge-base-en"))
+    parser.add_argument("--out", default="", help="Target directory (default EMBED_ONNX_DIR/<model>).")
+    parser.add_argument("--quantize", action="store_true", help="Also write the int8 dynamic-quantized model.")
+    args = parser.parse_args()
+
+    export_onnx(args.model, args.out or None, quantize=args.quantize)
@@ -0,0 +1,228 @@
+# backend/app/services/profiling.py
+"""
+Opt-in per-request profiling for admins.
+
+A request to /ask/ or /upload/ with `?profile=1` or an `X-Profile: 1`
+header, plus a valid admin bearer token, runs its handler under a profiler.
+The profile id comes back in the `X-Profile-Id` response header. For
+uploads, the background indexing task is profiled as `<id>-index`.
+
+Profiler: pyinstrument (a sampling profiler that follows async tasks,
+written as an HTML flame view plus a text summary) when it is installed,
+otherwise cProfile (a .pstats file; deterministic, but it cannot tell
+tasks apart, so other requests the event loop served meanwhile end up in
+the profile too - prefer pyinstrument on a busy server). Only one request
+is profiled at a time; others run normally with `X-Profile-Skipped: busy`.
+
+Both profilers only watch the thread that started them. Blocking work that
+normally goes to a worker thread (decoding, cross-encoder scoring) goes
+through run_blocking(), which runs it inline while a profile is being
+captured, so its cost shows up in the profile.
+
+Files live in PROFILE_DIR as <id>.json (metadata) + <id>.html/.txt/.pstats;
+only the newest PROFILE_KEEP profiles are kept.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import Header, HTTPException, Query, Request, Response
+
+from app.services.jwt_handler import auth_required, security
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILER = os.getenv("PROFILER", "auto").lower()  # auto / pyinstrument / cprofile
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))
+
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+_busy = asyncio.Lock()
+# True inside profile_call (asyncio.to_thread would copy it into worker threads too)
+_profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+
+# ------------------------------------------------------------
+# OPT-IN DEPENDENCY
+# ------------------------------------------------------------
+async def profile_opt_in(
+    request: Request,
+    profile: bool = Query(False, description="Profile this request (admin token required)"),
+    x_profile: Optional[str] = Header(None),
+) -> Optional[Dict]:
+    """None unless profiling was asked for; then the authenticated admin's token payload."""
+    if not profile and (x_profile or "").lower() not in ("1", "true", "yes"):
+        return None
+    credentials = await security(request)
+    return auth_required(credentials)
+
+
+def _backend() -> str:
+    if PROFILER in ("pyinstrument", "auto"):
+        try:
+            import pyinstrument  # noqa: F401
+            return "pyinstrument"
+        except ImportError:
+            if PROFILER == "pyinstrument":
+                print("[PROFILE] pyinstrument not installed, falling back to cProfile")
+    return "cprofile"
+
+
+def new_profile_id() -> str:
+    return datetime.utcnow().strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+def profiling_active() -> bool:
+    return _profiling.get()
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """asyncio.to_thread(fn, ...), but inline (on the profiled thread) while a profile is captured."""
+    if _profiling.get():
+        return fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+# ------------------------------------------------------------
+# CAPTURE
+# ------------------------------------------------------------
+def _save(profile_id: str, endpoint: str, user: Dict, backend: str, profiler,
+          started_at: datetime, duration_ms: float, error: Optional[str]):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    files = {}
+    if backend == "pyinstrument":
+        with open(base + ".html", "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(profiler.output_text(unicode=True, color=False))
+        files = {"html": profile_id + ".html", "text": profile_id + ".txt"}
+    else:
+        profiler.dump_stats(base + ".pstats")
+        files = {"pstats": profile_id + ".pstats"}
+
+    meta = {
+        "id": profile_id,
+        "endpoint": endpoint,
+        "user": user.get("username"),
+        "profiler": backend,
+        "started_at": started_at.isoformat(),
+        "duration_ms": round(duration_ms, 2),
+        "error": error,
+        "files": files,
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    _prune()
+    print(f"[PROFILE] {endpoint} profiled as {profile_id} ({meta['duration_ms']} ms, {backend})")
+
+
+async def profile_call(profile_id: str, endpoint: str, user: Dict, coro):
+    """Await `coro` under the profiler and store the result as `profile_id`."""
+    backend = _backend()
+    if backend == "pyinstrument":
+        from pyinstrument import Profiler
+        profiler = Profiler(interval=SAMPLE_INTERVAL, async_mode="enabled")
+    else:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    started_at = datetime.utcnow()
+    t0 = time.perf_counter()
+    error = None
+    token = _profiling.set(True)
+    if backend == "pyinstrument":
+        profiler.start()
+    else:
+        profiler.enable()
+    try:
+        return await coro
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        _profiling.reset(token)
+        if backend == "pyinstrument":
+            profiler.stop()
+        else:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - t0) * 1000
+        try:
+            await asyncio.to_thread(_save, profile_id, endpoint, user, backend, profiler,
+                                    started_at, duration_ms, error)
+        except Exception as e:
+            print(f"[PROFILE] ERROR: could not save profile {profile_id}: {e}")
+
+
+async def run_profiled(endpoint: str, user: Optional[Dict], response: Response, coro,
+                       profile_id: Optional[str] = None):
+    """
+    Route helper: profile `coro` when `user` (from profile_opt_in) is set and
+    no other profile is running; otherwise just await it.
+    """
+    if user is None:
+        return await coro
+    if _busy.locked():
+        response.headers["X-Profile-Skipped"] = "busy"
+        return await coro
+    profile_id = profile_id or new_profile_id()
+    async with _busy:
+        response.headers["X-Profile-Id"] = profile_id
+        return await profile_call(profile_id, endpoint, user, coro)
+
+
+async def profiled_task(profile_id: str, endpoint: str, user: Dict, fn, *args):
+    """Background-task wrapper (e.g. upload indexing): waits for the profiler instead of skipping."""
+    async with _busy:
+        return await profile_call(profile_id, endpoint, user, fn(*args))
+
+
+# ------------------------------------------------------------
+# LISTING / DOWNLOAD
+# ------------------------------------------------------------
+def _prune():
+    metas = sorted(
+        (f for f in os.listdir(PROFILE_DIR) if f.endswith(".json")),
+        reverse=True,
+    )
+    for name in metas[PROFILE_KEEP:]:
+        stem = name[:-len(".json")]
+        for ext in (".json", ".html", ".txt", ".pstats"):
+            path = os.path.join(PROFILE_DIR, stem + ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((f for f in os.listdir(PROFILE_DIR) if f.endswith(".json")), reverse=True)
+    out = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                out.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def profile_file(profile_id: str, fmt: Optional[str] = None) -> str:
+    """Path of a stored profile file (default: html, else pstats); 404 if missing."""
+    if not _ID_RE.match(profile_id):
+        raise HTTPException(status_code=400, detail="Invalid profile id")
+    meta_path = os.path.join(PROFILE_DIR, profile_id + ".json")
+    if not os.path.exists(meta_path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(meta_path, encoding="utf-8") as f:
+        files = json.load(f).get("files", {})
+    name = files.get(fmt) if fmt else (files.get("html") or files.get("pstats"))
+    if not name:
+        raise HTTPException(status_code=404, detail=f"No '{fmt}' output for this profile (have: {list(files)})")
+    return os.path.join(PROFILE_DIR, name)
@@ -0,0 +1,135 @@
+# backend/app/services/query_logger.py
+"""
+Buffered, asynchronous query logging.
+
+Request handlers call enqueue_query_log(...) which only appends to an
+in-memory queue; a single background task drains it and writes QueryLog
+(+ QueryHit) rows in batched inserts, flushing when QUERY_LOG_BATCH_SIZE records are
+waiting or QUERY_LOG_FLUSH_SEC has passed since the first queued record.
+stop_query_logger() (app shutdown) stops accepting records and waits
+until everything already queued has been written.
+
+If the queue is full (DB down / too slow) new records are dropped and
+counted instead of slowing down requests.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.models.models import QueryLog
+from app.repos.repo_rag import bulk_insert_query_logs
+
+QUEUE_MAX = int(os.getenv("QUERY_LOG_QUEUE_MAX", "10000"))
+BATCH_SIZE = int(os.getenv("QUERY_LOG_BATCH_SIZE", "100"))
+FLUSH_SEC = float(os.getenv("QUERY_LOG_FLUSH_SEC", "2.0"))
+
+_queue: Optional[asyncio.Queue] = None
+_task: Optional[asyncio.Task] = None
+_stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+
+
+def get_query_logger_stats() -> Dict:
+    return {**_stats, "pending": _queue.qsize() if _queue is not None else 0}
+
+
+def enqueue_query_log(
+    query_text: str,
+    hits: List[Dict],
+    response_time_ms: Optional[int] = None,
+    user_id: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    stage_timings: Optional[Dict] = None,
+    cache_hits: Optional[Dict] = None,
+) -> bool:
+    """
+    Queue one query record; never blocks. Returns False if it was dropped.
+    `hits` are the returned chunks in rank order (chunk_id, doc_id, score).
+    """
+    if _queue is None:
+        _stats["dropped"] += 1
+        return False
+    record = {
+        "query_text": query_text,
+        "returned_chunk_ids": [h.get("chunk_id") for h in hits],
+        "response_time_ms": response_time_ms,
+        "user_id": user_id,
+        "endpoint": endpoint,
+        "stage_timings": stage_timings or {},
+        "cache_hits": cache_hits or {},
+        "timestamp": datetime.utcnow(),
+        "hits": [
+            {"chunk_id": h.get("chunk_id"), "doc_id": h.get("doc_id"), "score": h.get("score")}
+            for h in hits
+        ],
+    }
+    try:
+        _queue.put_nowait(record)
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        return False
+    _stats["enqueued"] += 1
+    return True
+
+
+async def _flush(batch: List[Dict]):
+    if not batch:
+        return
+    try:
+        rows = [QueryLog(**{k: v for k, v in r.items() if k != "hits"}) for r in batch]
+        await bulk_insert_query_logs(rows, [r["hits"] for r in batch])
+        _stats["written"] += len(batch)
+        _stats["batches"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        _stats["dropped"] += len(batch)
+        print(f"[QUERYLOG] ERROR: failed to write {len(batch)} records: {e}")
+
+
+async def _writer_loop(queue: asyncio.Queue):
+    """Drain the queue in batches until the stop sentinel (None) arrives."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await queue.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = loop.time() + FLUSH_SEC
+        while len(batch) < BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        await _flush(batch)
+
+
+async def start_query_logger():
+    global _queue, _task
+    if _task is not None:
+        return
+    _queue = asyncio.Queue(maxsize=QUEUE_MAX)
+    _task = asyncio.create_task(_writer_loop(_queue))
+    print(f"[QUERYLOG] Writer started (batch={BATCH_SIZE}, flush={FLUSH_SEC}s)")
+
+
+async def stop_query_logger():
+    """Stop accepting records, flush everything still queued and stop the writer."""
+    global _queue, _task
+    if _task is None:
+        return
+    queue, _queue = _queue, None
+    pending = queue.qsize()
+    # records queued before the sentinel are all flushed before the writer exits
+    await queue.put(None)
+    await _task
+    _task = None
+    print(f"[QUERYLOG] Writer stopped, flushed {pending} pending records")
@@ -0,0 +1,87 @@
+# backend/app/services/stub_models.py
+"""
+Model stand-ins for benchmarks and load tests (no downloads, no GPU).
+
+RAG_STUB_MODELS=1 makes the running app use them: get_model() returns a
+HashEmbedder, the reranker (when RAG_RERANK_MODEL is set) an
+OverlapCrossEncoder, warmup skips the LoRA load and generate_with_lora
+returns stub_generate() output. Everything else (DB, FAISS, BM25, caches,
+logging) is the real code path, so load tests measure the service
+rather than the models.
+
+HashEmbedder implements the part of the SentenceTransformer API that
+rag_engine / indexer use. Each token is hashed to a fixed (bucket, sign)
+pair, so texts sharing words get similar vectors and retrieval results
+are meaningful enough to exercise FAISS + BM25 fusion realistically.
+Output is deterministic across processes and machines.
+"""
+
+import hashlib
+import os
+import re
+import time
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+STUB_MODELS = os.getenv("RAG_STUB_MODELS", "0") == "1"
+# simulated decode cost; generation blocks the worker like the real model does
+STUB_TOKEN_MS = float(os.getenv("RAG_STUB_TOKEN_MS", "5"))
+STUB_NEW_TOKENS = int(os.getenv("RAG_STUB_NEW_TOKENS", "40"))
+# simulated cross-encoder cost per (query, chunk) pair
+STUB_RERANK_PAIR_MS = float(os.getenv("RAG_STUB_RERANK_PAIR_MS", "2"))
+
+_word_re = re.compile(r"[a-z0-9]+")
+
+
+class HashEmbedder:
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        b = self._buckets.get(token)
+        if b is None:
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            b = (h % self.dim, 1.0 if (h >> 32) & 1 else -1.0)
+            self._buckets[token] = b
+        return b
+
+    def encode(self, texts: Union[str, List[str]], normalize_embeddings: bool = True,
+               convert_to_numpy: bool = True, batch_size: int = 32, **_) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for tok in _word_re.findall(text.lower()):
+                col, sign = self._bucket(tok)
+                out[row, col] += sign
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            np.divide(out, norms, out=out, where=norms > 0)
+        return out[0] if single else out
+
+
+class OverlapCrossEncoder:
+    """CrossEncoder.predict stand-in: share of the query's words found in the passage."""
+
+    def predict(self, pairs: List[Tuple[str, str]], batch_size: int = 32, **_) -> np.ndarray:
+        time.sleep(len(pairs) * STUB_RERANK_PAIR_MS / 1000)
+        scores = np.zeros(len(pairs), dtype="float32")
+        for i, (query, passage) in enumerate(pairs):
+            q_words = set(_word_re.findall(query.lower()))
+            if q_words:
+                scores[i] = len(q_words & set(_word_re.findall(passage.lower()))) / len(q_words)
+        return scores
+
+
+def stub_generate(question: str, hits: List[Dict], max_new_tokens: int) -> Tuple[str, int]:
+    """Echo the start of the top hit after sleeping STUB_TOKEN_MS per 'token'."""
+    n_tokens = min(max_new_tokens, STUB_NEW_TOKENS)
+    time.sleep(n_tokens * STUB_TOKEN_MS / 1000)
+    top = (hits[0].get("text") or "") if hits else ""
+    return " ".join(top.split()[:n_tokens]), n_tokens
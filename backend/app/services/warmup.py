@@ -0,0 +1,98 @@
+# backend/app/services/warmup.py
+"""
+Startup warmup.
+
+Loads the embedder, the LoRA model, the retrieval snapshot and (when
+RAG_RERANK_MODEL is set) the reranker concurrently, then runs one dummy encode/search/generate so kernels,
+the prompt-prefix KV cache and BM25 are hot before the first real query.
+`/ready` reports get_warmup_status() so a load balancer only routes
+traffic to warmed workers; `/` stays a plain liveness check.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict
+
+from app.core.rag_engine import get_model, get_retrieval_snapshot, hybrid_search_db
+from app.core.reranker import get_reranker, rerank_enabled
+from app.services.lora_loader import load_lora
+from app.services.generator import generate_with_lora
+from app.services.stub_models import STUB_MODELS
+
+WARMUP_QUERY = "What is the leave policy?"
+
+_status: Dict = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "stages": {},
+    "errors": {},
+}
+
+
+def get_warmup_status() -> Dict:
+    return _status
+
+
+async def _timed(name: str, coro):
+    t0 = time.perf_counter()
+    try:
+        result = await coro
+        _status["stages"][name] = round((time.perf_counter() - t0) * 1000)
+        return result
+    except Exception as e:
+        _status["errors"][name] = str(e)
+        print(f"[WARMUP] {name} failed: {e}")
+        return None
+
+
+def _load_embedder():
+    model = get_model()
+    # first encode compiles/initializes kernels
+    model.encode([WARMUP_QUERY], normalize_embeddings=True, convert_to_numpy=True)
+    return model
+
+
+def _load_reranker():
+    # one predict so the first real request does not pay for kernel init
+    get_reranker().predict([(WARMUP_QUERY, WARMUP_QUERY)], batch_size=1, show_progress_bar=False)
+    return True
+
+
+def _load_llm(lora_path: str):
+    if STUB_MODELS:
+        print("[STUB] RAG_STUB_MODELS=1: skipping LoRA load, generation is simulated")
+        return True
+    if not load_lora(lora_path):
+        raise RuntimeError(f"LoRA failed to load from {lora_path}")
+    return True
+
+
+async def run_warmup():
+    _status.update(ready=False, started_at=datetime.utcnow(), finished_at=None, stages={}, errors={})
+
+    lora_path = os.getenv("LORA_PATH", "lora_models/my_lora")
+    print(f"### Warmup: loading embedder, LoRA ({lora_path}) and retrieval snapshot...")
+
+    loads = [
+        _timed("embedder", asyncio.to_thread(_load_embedder)),
+        _timed("llm", asyncio.to_thread(_load_llm, lora_path)),
+        _timed("retrieval_snapshot", get_retrieval_snapshot()),
+    ]
+    if rerank_enabled():
+        loads.append(_timed("reranker", asyncio.to_thread(_load_reranker)))
+    await asyncio.gather(*loads)
+
+    # end-to-end dummy pass: FAISS/BM25 search, then a short generation
+    hits = await _timed("search", hybrid_search_db(WARMUP_QUERY, top_k=5, alpha=0.1))
+    if "llm" not in _status["errors"]:
+        await _timed("generate", asyncio.to_thread(generate_with_lora, WARMUP_QUERY, hits or [], 1))
+
+    _status["finished_at"] = datetime.utcnow()
+    _status["ready"] = not _status["errors"]
+    if _status["ready"]:
+        print(f"### Warmup complete: {_status['stages']}")
+    else:
+        print(f"### ERROR: warmup finished with errors: {_status['errors']}")
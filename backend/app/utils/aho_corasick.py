@@ -0,0 +1,85 @@
+# backend/app/utils/aho_corasick.py
+"""
+Multi-pattern substring matching (Aho-Corasick).
+
+build_matcher(patterns) returns find(text) -> set of indexes of the
+patterns occurring in `text`, in one pass over the text regardless of
+how many patterns there are. Uses pyahocorasick when installed (C, much
+faster), otherwise the pure-Python automaton below.
+"""
+
+from collections import deque
+from typing import Callable, Dict, List, Sequence, Set
+
+
+class _Automaton:
+    def __init__(self, patterns: Sequence[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[int]] = [[]]
+        for idx, pattern in enumerate(patterns):
+            if pattern:
+                self._add(pattern, idx)
+        self._build()
+
+    def _add(self, pattern: str, idx: int):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        self.out[state].append(idx)
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        goto, fail, out = self.goto, self.fail, self.out
+        found: Set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def build_matcher(patterns: Sequence[str]) -> Callable[[str], Set[int]]:
+    try:
+        import ahocorasick
+    except ImportError:
+        return _Automaton(patterns).find
+
+    automaton = ahocorasick.Automaton()
+    for idx, pattern in enumerate(patterns):
+        if pattern:
+            # several indexes may share one pattern string
+            existing = automaton.get(pattern, ())
+            automaton.add_word(pattern, existing + (idx,))
+    if len(automaton) == 0:
+        return lambda text: set()
+    automaton.make_automaton()
+
+    def find(text: str) -> Set[int]:
+        found: Set[int] = set()
+        for _, idxs in automaton.iter(text):
+            found.update(idxs)
+        return found
+
+    return find
@@ -1,12 +1,14 @@
 # backend/app/utils/faiss_merge.py
 
-import faiss
 import numpy as np
-from typing import List, Optional
+from typing import List, Optional, TYPE_CHECKING
 from app.utils.faiss_store import load_faiss_index, save_faiss_index
 
+if TYPE_CHECKING:
+    import faiss
 
-def merge_faiss_indexes(index_paths: List[str]) -> Optional[faiss.Index]:
+
+def merge_faiss_indexes(index_paths: List[str]) -> Optional["faiss.Index"]:
     """
     Merge multiple FAISS IndexFlatIP indexes into a single IndexFlatIP.
     Returns the merged index (in memory) or None on failure.
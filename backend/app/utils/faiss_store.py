@@ -1,13 +1,16 @@
 # backend/app/utils/faiss_store.py
-import faiss
 import os
 import threading
-import os
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import faiss
 
 _LOCK = threading.Lock()
 
-def save_faiss_index(index: faiss.Index, path: str):
+def save_faiss_index(index: "faiss.Index", path: str):
     """Thread-safe save to disk."""
+    import faiss
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with _LOCK:
         faiss.write_index(index, path)
@@ -22,6 +25,8 @@ def load_faiss_index(path: str, embed_dim: int = None):
     - If the index file does not exist, return an empty IndexFlatIP(embed_dim).
     - If embed_dim is not provided, default to env EMBED_DIM or 768.
     """
+    import faiss
+
     if os.path.exists(path):
         with _LOCK:
             return faiss.read_index(path)
@@ -31,3 +36,44 @@ def load_faiss_index(path: str, embed_dim: int = None):
         embed_dim = int(os.getenv("EMBED_DIM", "768"))
 
     return faiss.IndexFlatIP(embed_dim)
+
+
+# -------------------------
+# Index specs (evaluation / ANN tuning)
+# -------------------------
+def parse_index_spec(spec: str):
+    """
+    "<faiss factory>[:param=value,...]" -> (factory, {param: value}), e.g.
+    "Flat", "HNSW32:efSearch=64", "IVF1024,Flat:nprobe=16", "IVF1024,PQ32:nprobe=32".
+    """
+    factory, _, params = spec.partition(":")
+    parsed = {}
+    for part in filter(None, params.split(",")):
+        name, _, value = part.partition("=")
+        parsed[name.strip()] = float(value) if "." in value else int(value)
+    return factory.strip(), parsed
+
+
+def build_index(vectors, factory: str) -> "faiss.Index":
+    """Inner-product index from a faiss factory string, trained on `vectors` if needed."""
+    import faiss
+
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index: "faiss.Index", params: dict):
+    """Apply runtime search parameters (nprobe, efSearch, ...) via faiss.ParameterSpace."""
+    import faiss
+
+    space = faiss.ParameterSpace()
+    for name, value in params.items():
+        space.set_index_parameter(index, name, value)
+
+
+def index_vectors(index: "faiss.Index"):
+    """All stored vectors (flat indexes) as a float32 matrix."""
+    return index.reconstruct_n(0, index.ntotal)
@@ -0,0 +1,275 @@
+# backend/app/utils/metrics.py
+"""
+Minimal in-process Prometheus metrics (text exposition format 0.0.4).
+
+    REQUESTS = counter("rag_requests_total", "Requests", ["endpoint"])
+    REQUESTS.labels(endpoint="ask").inc()
+
+    with STAGE_SECONDS.labels(stage="embed").time():
+        ...
+
+Counters, gauges and histograms are thread-safe (generation and ingestion
+work runs in worker threads). GET /metrics returns render().
+Values are per process; with several workers scrape each one.
+"""
+
+import abc
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# seconds; covers sub-ms FAISS lookups up to multi-second generation
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: Dict[str, "_Metric"] = {}
+_registry_lock = threading.Lock()
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _label_str(names: Sequence[str], values: Sequence[str], extra: Tuple = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+class _Child:
+    def __init__(self, metric: "_Metric"):
+        self._metric = metric
+        self._lock = metric._lock
+
+
+class _CounterChild(_Child):
+    def __init__(self, metric):
+        super().__init__(metric)
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_Child):
+    def __init__(self, metric):
+        super().__init__(metric)
+        self.value = 0.0
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild(_Child):
+    def __init__(self, metric):
+        super().__init__(metric)
+        self.counts = [0] * len(metric.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self._metric.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0)
+
+
+class _Metric(abc.ABC):
+    kind = ""
+    child_cls = _Child
+
+    def __init__(self, name: str, doc: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], _Child] = {}
+
+    def labels(self, **labels) -> _Child:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self.child_cls(self))
+        return child
+
+    def _default(self) -> _Child:
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels(...)")
+        return self.labels()
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every child."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+    child_cls = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._children.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(c.value)}" for k, c in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    child_cls = _GaugeChild
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def track_inprogress(self):
+        return self._default().track_inprogress()
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._children.items())
+        return [f"{self.name}{_label_str(self.labelnames, k)} {_fmt(c.value)}" for k, c in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    child_cls = _HistogramChild
+
+    def __init__(self, name: str, doc: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _samples(self):
+        out = []
+        with self._lock:
+            items = [(k, list(c.counts), c.sum, c.count) for k, c in self._children.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = (("le", _fmt(bound)),)
+                out.append(f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_fmt(total)}")
+            out.append(f"{self.name}_count{_label_str(self.labelnames, key)} {count}")
+        return out
+
+
+# ------------------------------------------------------------
+# REGISTRY
+# ------------------------------------------------------------
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            # module reloads re-declare metrics; keep the live one
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+
+def counter(name: str, doc: str, labelnames: Iterable[str] = ()) -> Counter:
+    return _register(Counter(name, doc, labelnames))
+
+
+def gauge(name: str, doc: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return _register(Gauge(name, doc, labelnames))
+
+
+def histogram(name: str, doc: str, labelnames: Iterable[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, doc, labelnames, buckets))
+
+
+def render() -> str:
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    return "\n".join(m.render() for m in metrics) + "\n"
+
+
+# ------------------------------------------------------------
+# SHARED RAG METRICS
+# ------------------------------------------------------------
+# declared here so every module observes into the same series
+STAGE_SECONDS = histogram(
+    "rag_stage_seconds",
+    "Duration of query pipeline stages (snapshot, embed, faiss, bm25, fusion, rerank, hydrate, context, generate)",
+    ["stage"],
+)
+CACHE_LOOKUPS = counter(
+    "rag_cache_lookups_total",
+    "Cache lookups by cache and result (hit/miss)",
+    ["cache", "result"],
+)
+INGEST_STAGE_SECONDS = histogram(
+    "rag_ingest_stage_seconds",
+    "Duration of ingestion stages (parse, chunk, tokenize, db_insert, embed, faiss_save, registry)",
+    ["stage"],
+)
+
+
+def observe_stage_ms(timings: Dict[str, float], stages: Iterable[str], histogram_: Histogram = STAGE_SECONDS):
+    """Record `<stage>_ms` entries of a timings dict (as filled by hybrid_search_db)."""
+    for stage in stages:
+        ms = timings.get(f"{stage}_ms")
+        if ms is not None:
+            histogram_.labels(stage=stage).observe(ms / 1000.0)
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
@@ -0,0 +1,93 @@
+# backend/app/utils/pagination.py
+"""
+Keyset cursors and streaming exports shared by the list endpoints.
+
+- encode_cursor / decode_cursor: opaque (urlsafe base64 JSON) page cursors
+  holding the sort key of the last row returned.
+- stream_rows: iterate a SELECT through a server-side cursor, STREAM_BATCH_SIZE
+  rows at a time, so exports never hold the full result in memory.
+- ndjson_response / json_array_response: wrap such an iterator in a
+  StreamingResponse.
+"""
+
+import base64
+import json
+import os
+from datetime import date, datetime
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.db.session import async_session
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+MAX_PAGE_SIZE = 1000
+
+
+# ----------------------------------------------------
+# CURSORS
+# ----------------------------------------------------
+def encode_cursor(data: Dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: Optional[str], *keys: str) -> Optional[Dict]:
+    """Decode a cursor that must hold `keys` (a cursor from another listing is a 400, not a 500)."""
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(data, dict) or any(k not in data for k in keys):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data
+
+
+# ----------------------------------------------------
+# STREAMING
+# ----------------------------------------------------
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> str:
+    return json.dumps(obj, default=_json_default, ensure_ascii=False)
+
+
+async def stream_rows(stmt, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator:
+    """Yield the first column of each row of `stmt`, fetched in batches of `batch_size`."""
+    async with async_session() as session:
+        result = await session.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield row
+
+
+async def _ndjson_lines(rows: AsyncIterator, serialize: Callable):
+    async for row in rows:
+        yield dumps(serialize(row)) + "\n"
+
+
+async def _json_array(rows: AsyncIterator, serialize: Callable):
+    first = True
+    yield "["
+    async for row in rows:
+        yield ("" if first else ",") + dumps(serialize(row))
+        first = False
+    yield "]"
+
+
+def ndjson_response(rows: AsyncIterator, serialize: Callable, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        _ndjson_lines(rows, serialize),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def json_array_response(rows: AsyncIterator, serialize: Callable) -> StreamingResponse:
+    return StreamingResponse(_json_array(rows, serialize), media_type="application/json")
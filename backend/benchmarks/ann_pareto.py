@@ -0,0 +1,245 @@
+# backend/benchmarks/ann_pareto.py
+"""
+Recall-vs-latency of approximate FAISS indexes against exact search.
+
+Exact IndexFlatIP top-k is computed once as ground truth; then every
+configuration of the grid (HNSW efSearch, IVF nprobe, IVF-PQ code size)
+is built once, searched one query at a time, and scored by recall@k
+(overlap with the exact top-k). The report lists every configuration,
+marks the Pareto frontier (no other config is both faster and more
+accurate) and recommends the cheapest one reaching --target-recall.
+Specs are printed in the `factory:param=value` form accepted by
+rag_eval --index-types and app.utils.faiss_store.parse_index_spec.
+
+    cd backend
+    # the app's current index (DATABASE_URL / .env), questions from the eval set
+    python -m benchmarks.ann_pareto --source snapshot \\
+        --queries-file app/core/rag_evalution/eval_dataset.json --target-recall 0.95
+
+    # synthetic corpus + hash embedder, no models or DB needed
+    python -m benchmarks.ann_pareto --chunks 100000 --queries 500 --json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.common import environment, percentiles, prepare_workdir, use_hash_embedder
+from benchmarks.synthetic import generate_chunks, generate_questions
+
+
+# ---------------------------------------------------------------------
+# Corpus / queries
+# ---------------------------------------------------------------------
+def load_questions(path: str, limit: int) -> List[str]:
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            questions = [item.get("query") or item.get("question") for item in json.load(f)]
+    else:
+        with open(path, encoding="utf-8") as f:
+            questions = [line.strip() for line in f]
+    return [q for q in questions if q][:limit]
+
+
+async def snapshot_vectors() -> np.ndarray:
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from benchmarks.common import BACKEND_DIR
+    load_dotenv(Path(BACKEND_DIR) / ".env")
+
+    from app.core.rag_engine import get_retrieval_snapshot
+    from app.utils.faiss_store import index_vectors
+    snap = await get_retrieval_snapshot()
+    if snap is None:
+        raise SystemExit("Nothing indexed yet (no FAISS registry).")
+    return index_vectors(snap["index"])
+
+
+def corpus_and_queries(args) -> Tuple[np.ndarray, np.ndarray]:
+    if args.source == "snapshot":
+        vectors = asyncio.run(snapshot_vectors())
+        from app.core.rag_engine import get_model
+        embedder = get_model()
+    else:
+        prepare_workdir(args.workdir)
+        embedder = use_hash_embedder(args.dim)
+        vectors = embedder.encode(generate_chunks(args.chunks, seed=args.seed), normalize_embeddings=True)
+
+    questions = (load_questions(args.queries_file, args.queries) if args.queries_file
+                 else generate_questions(args.queries, seed=args.seed + 1))
+    q_emb = embedder.encode(questions, normalize_embeddings=True, convert_to_numpy=True)
+    return np.ascontiguousarray(vectors, dtype="float32"), np.ascontiguousarray(q_emb, dtype="float32")
+
+
+# ---------------------------------------------------------------------
+# Grid
+# ---------------------------------------------------------------------
+def default_nlist(n: int) -> int:
+    # ~4*sqrt(N) lists, rounded to a power of two, and at least 39 training points per list
+    nlist = 2 ** round(math.log2(max(4 * math.sqrt(n), 1)))
+    return max(1, min(nlist, n // 39))
+
+
+def build_grid(args, n: int, dim: int) -> List[Tuple[str, str, List[int]]]:
+    """(factory, search parameter, values) triples."""
+    nlist = args.nlist or default_nlist(n)
+    nprobes = [p for p in args.nprobe if p <= nlist]
+    grid = [(f"HNSW{m}", "efSearch", args.ef_search) for m in args.hnsw_m]
+    if "flat" in args.ivf:
+        grid.append((f"IVF{nlist},Flat", "nprobe", nprobes))
+    for m in args.pq:
+        if dim % m == 0:
+            grid.append((f"IVF{nlist},PQ{m}", "nprobe", nprobes))
+    return grid
+
+
+def time_search(index, q_emb: np.ndarray, k: int) -> Tuple[np.ndarray, List[float]]:
+    ids = np.empty((len(q_emb), k), dtype="int64")
+    latencies = []
+    for i in range(len(q_emb)):
+        t0 = time.perf_counter()
+        _, I = index.search(q_emb[i:i + 1], k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        ids[i] = I[0]
+    return ids, latencies
+
+
+def recall_at_k(approx: np.ndarray, exact: np.ndarray) -> float:
+    k = exact.shape[1]
+    hits = sum(len(set(a[a >= 0]) & set(e)) for a, e in zip(approx, exact))
+    return hits / float(exact.size) if k else 0.0
+
+
+def pareto_frontier(rows: List[Dict]) -> List[Dict]:
+    """Rows not dominated by a faster-or-equal row with at least the same recall."""
+    frontier, best_recall = [], -1.0
+    for row in sorted(rows, key=lambda r: (r["latency"]["p50_ms"], -r["recall"])):
+        if row["recall"] > best_recall:
+            frontier.append(row)
+            best_recall = row["recall"]
+    return frontier
+
+
+def run(args) -> Dict:
+    import faiss
+    from app.utils.faiss_store import build_index, set_search_params
+
+    # builds use every core; searches are timed with --threads for stable latencies
+    build_threads = faiss.omp_get_max_threads()
+    search_threads = args.threads or build_threads
+
+    vectors, q_emb = corpus_and_queries(args)
+    n, dim = vectors.shape
+    k = args.k
+
+    exact_index = faiss.IndexFlatIP(dim)
+    exact_index.add(vectors)
+    faiss.omp_set_num_threads(search_threads)
+    exact, flat_lat = time_search(exact_index, q_emb, k)
+    rows = [{
+        "spec": "Flat", "recall": 1.0, "latency": percentiles(flat_lat),
+        "build_sec": 0.0, "index_mb": round(vectors.nbytes / 2 ** 20, 1),
+    }]
+
+    for factory, param, values in build_grid(args, n, dim):
+        faiss.omp_set_num_threads(build_threads)
+        t0 = time.perf_counter()
+        try:
+            index = build_index(vectors, factory)
+        except RuntimeError as e:
+            # e.g. PQ training needs 256 * 39 vectors; a small corpus skips it
+            print(f"[ANN] {factory}: build failed, skipped: {e}", file=sys.stderr)
+            continue
+        build_sec = round(time.perf_counter() - t0, 2)
+        faiss.omp_set_num_threads(search_threads)
+        index_mb = round(faiss.serialize_index(index).nbytes / 2 ** 20, 1)
+        for value in values:
+            set_search_params(index, {param: value})
+            approx, lat = time_search(index, q_emb, k)
+            rows.append({
+                "spec": f"{factory}:{param}={value}",
+                "recall": round(recall_at_k(approx, exact), 4),
+                "latency": percentiles(lat),
+                "build_sec": build_sec,
+                "index_mb": index_mb,
+            })
+        print(f"[ANN] {factory}: built in {build_sec}s, {index_mb}MB", file=sys.stderr)
+
+    frontier = pareto_frontier(rows)
+    frontier_specs = {r["spec"] for r in frontier}
+    for row in rows:
+        row["pareto"] = row["spec"] in frontier_specs
+
+    meeting = [r for r in rows if r["recall"] >= args.target_recall]
+    recommended: Optional[Dict] = min(meeting, key=lambda r: r["latency"]["p50_ms"]) if meeting else None
+
+    return {
+        "benchmark": "ann_pareto",
+        "params": {"source": args.source, "vectors": n, "dim": dim, "queries": len(q_emb), "k": k,
+                   "target_recall": args.target_recall, "threads": args.threads},
+        "environment": environment(),
+        "configs": sorted(rows, key=lambda r: r["latency"]["p50_ms"]),
+        "frontier": [r["spec"] for r in frontier],
+        "recommended": recommended,
+    }
+
+
+def print_report(result: Dict):
+    p = result["params"]
+    print(f"\nANN recall@{p['k']} vs latency: {p['vectors']} x {p['dim']} vectors, {p['queries']} queries")
+    print(f"  {'spec':<32} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8} {'MB':>8}")
+    for r in result["configs"]:
+        mark = "*" if r["pareto"] else " "
+        print(f"{mark} {r['spec']:<32} {r['recall']:>7.4f} {r['latency']['p50_ms']:>8.3f} "
+              f"{r['latency']['p95_ms']:>8.3f} {r['build_sec']:>8} {r['index_mb']:>8}")
+    print("  * = Pareto frontier")
+    rec = result["recommended"]
+    if rec:
+        flat = next(r for r in result["configs"] if r["spec"] == "Flat")
+        speedup = flat["latency"]["p50_ms"] / rec["latency"]["p50_ms"] if rec["latency"]["p50_ms"] else 0
+        print(f"\nRecommended (recall >= {p['target_recall']}): {rec['spec']} "
+              f"recall={rec['recall']} p50={rec['latency']['p50_ms']}ms ({speedup:.1f}x vs Flat)")
+    else:
+        print(f"\nNo configuration reaches recall {p['target_recall']}; stay on Flat or widen the grid.")
+
+
+def _ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", choices=["synthetic", "snapshot"], default="synthetic")
+    parser.add_argument("--chunks", type=int, default=100000, help="Synthetic corpus size.")
+    parser.add_argument("--dim", type=int, default=768, help="Synthetic embedding dim.")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--queries-file", default="", help="Eval dataset .json or one question per line.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--hnsw-m", type=_ints, default=[16, 32])
+    parser.add_argument("--ef-search", type=_ints, default=[16, 32, 64, 128, 256])
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = ~4*sqrt(N)).")
+    parser.add_argument("--nprobe", type=_ints, default=[1, 2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--ivf", type=lambda v: v.split(","), default=["flat"], help="IVF,Flat variant: flat or none.")
+    parser.add_argument("--pq", type=_ints, default=[16, 32, 64], help="IVF-PQ code sizes (bytes per vector).")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS OpenMP threads while searching (0 = library default).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# backend/benchmarks/bench_embedder.py
+"""
+Embedder backends (torch, onnx, onnx-int8): parity and throughput.
+
+Every backend encodes the same synthetic chunks and questions. Parity is
+the cosine similarity of each ONNX embedding with the torch one (min and
+mean over all texts); throughput is texts/sec for single queries
+(batch 1, the /ask/ path) and for ingestion-sized batches. The ONNX
+export is created on first run (app/services/onnx_embedder.py).
+
+    cd backend
+    python -m benchmarks.bench_embedder --chunks 512 --queries 200 --threads 4
+    python -m benchmarks.bench_embedder --model BAAI/bge-base-en --backends torch,onnx-int8 --json
+"""
+
+import argparse
+import json
+import os
+
+from benchmarks.common import environment, max_rss_mb
+from benchmarks.synthetic import generate_chunks, generate_questions
+
+
+def load_backend(backend: str, model_name: str, threads: int, quantize: bool):
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads:
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name, device="cpu")
+
+    from app.services.onnx_embedder import FP32_FILE, INT8_FILE, OnnxEmbedder, export_dir, export_onnx
+    quantized = backend == "onnx-int8"
+    model_dir = export_dir(model_name)
+    if not os.path.exists(os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)):
+        export_onnx(model_name, model_dir, quantize=quantize)
+    return OnnxEmbedder(model_dir, quantized=quantized, threads=threads)
+
+
+def run(args) -> dict:
+    from app.services.onnx_embedder import FP32_FILE, INT8_FILE, cosine_parity, export_dir, throughput
+
+    chunks = generate_chunks(args.chunks, seed=args.seed)
+    questions = generate_questions(args.queries, seed=args.seed + 1)
+    backends = [b for b in args.backends.split(",") if b]
+
+    reference = None
+    results = {}
+    for backend in backends:
+        model = load_backend(backend, args.model, args.threads, quantize="onnx-int8" in backends)
+        row = {
+            "query": throughput(model, questions, 1),
+            "ingest": throughput(model, chunks, args.batch_size),
+        }
+        vectors = model.encode(chunks + questions, normalize_embeddings=True, batch_size=args.batch_size)
+        if backend == "torch":
+            reference = vectors
+        elif reference is not None:
+            row["parity"] = cosine_parity(reference, vectors)
+        if backend != "torch":
+            path = os.path.join(export_dir(args.model), INT8_FILE if backend == "onnx-int8" else FP32_FILE)
+            row["model_mb"] = round(os.path.getsize(path) / 2 ** 20, 1)
+        results[backend] = row
+        del model
+
+    return {
+        "benchmark": "embedder",
+        "params": {"model": args.model, "chunks": args.chunks, "queries": args.queries,
+                   "batch_size": args.batch_size, "threads": args.threads},
+        "environment": environment(),
+        "backends": results,
+        "max_rss_mb": max_rss_mb(),
+        "primary": [f"backends.{b}.{path}.texts_per_sec" for b in backends for path in ("query", "ingest")],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.getenv("EMBED_MODEL_NAME", "BAAI/bge-base-en"))
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8",
+                        help="Comma-separated; parity is measured against torch when it is listed first.")
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32, help="Ingestion batch size.")
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads per backend (0 = library default).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"\nEmbedder {args.model}: {args.chunks} chunks (batch {args.batch_size}), {args.queries} queries (batch 1)")
+    print(f"  {'backend':<10} {'query/s':>9} {'ingest/s':>9} {'min cos':>8} {'mean cos':>9} {'MB':>7}")
+    for backend, r in result["backends"].items():
+        parity = r.get("parity", {})
+        print(f"  {backend:<10} {r['query']['texts_per_sec']:>9} {r['ingest']['texts_per_sec']:>9} "
+              f"{parity.get('min_cosine', '-'):>8} {parity.get('mean_cosine', '-'):>9} {r.get('model_mb', '-'):>7}")
+
+
+if __name__ == "__main__":
+    main()
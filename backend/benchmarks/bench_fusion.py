@@ -0,0 +1,130 @@
+# backend/benchmarks/bench_fusion.py
+"""
+Fusion cost (rag_engine.fuse_hits) per query versus corpus size.
+
+For every corpus size a flat index and a full BM25 score array are
+built once; each query then fuses a FAISS row and the BM25 top
+`pool` positions (selected outside the timed region, as in
+hybrid_search_db where that is the bm25 stage). Only fusion is timed:
+candidate union, scoring the other retriever's candidates, weighted or
+RRF fusion and building the top_k hits. Its cost should stay flat as
+the corpus grows; the previous dict-and-loop fusion is timed alongside
+for reference.
+
+    cd backend
+    python -m benchmarks.bench_fusion --sizes 10000,100000,1000000 --pool 50 --json
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.common import max_rss_mb, percentiles
+
+
+def dict_loop_fusion(mapping: List[int], sem_pos, sem_raw, lex_pos, lex_raw, alpha: float, top_k: int) -> List[Dict]:
+    """The pre-vectorization fusion: per-side min-max over its own list, dicts, Python loops."""
+    def maps(positions, scores):
+        norm = {}
+        vals = [float(v) for v in scores]
+        if vals:
+            lo, hi = min(vals), max(vals)
+            denom = (hi - lo) if hi != lo else 1.0
+            for pos, val in zip(positions, vals):
+                norm[mapping[int(pos)]] = (val - lo) / denom
+        return norm
+
+    sem, lex = maps(sem_pos, sem_raw), maps(lex_pos, lex_raw)
+    results = []
+    for cid in set(sem) | set(lex):
+        results.append({"chunk_id": cid, "score": alpha * sem.get(cid, 0.0) + (1.0 - alpha) * lex.get(cid, 0.0)})
+    results.sort(key=lambda x: x["score"], reverse=True)
+    return results[:top_k]
+
+
+def run_size(n: int, args, rng: np.random.Generator) -> Dict:
+    import faiss
+    from app.core.rag_engine import fuse_hits, top_positions
+
+    vectors = rng.standard_normal((n, args.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = faiss.IndexFlatIP(args.dim)
+    index.add(vectors)
+    snap = {"index": index, "mapping": list(range(1, n + 1)), "chunk_by_id": {}}
+
+    samples = {"weighted": [], "rrf": [], "dict_loop": []}
+    for i in range(args.queries):
+        q_vec = rng.standard_normal(args.dim, dtype=np.float32)
+        q_vec /= np.linalg.norm(q_vec)
+        # BM25-like scores: most chunks share no query term
+        bm_scores = np.where(rng.random(n) < 0.05, rng.gamma(2.0, 3.0, n), 0.0)
+        lex_pos = top_positions(bm_scores, args.pool)
+        # FAISS row: half of it overlaps the BM25 candidates, the rest is
+        # drawn from outside them, ordered by similarity like index.search
+        others = rng.choice(n, args.pool * 2, replace=False)
+        others = others[~np.isin(others, lex_pos)][: args.pool - args.pool // 2]
+        sem_pos = np.concatenate([lex_pos[: args.pool // 2], others])
+        sims = vectors[sem_pos] @ q_vec
+        order = np.argsort(-sims)
+        sem_pos, sem_raw = sem_pos[order], sims[order]
+
+        # alternate the order so neither method always runs on a cold cache
+        for method in (("weighted", "rrf") if i % 2 else ("rrf", "weighted")):
+            t0 = time.perf_counter()
+            fuse_hits(snap, q_vec, sem_pos, sem_raw, lex_pos, bm_scores, args.alpha, args.top_k, method)
+            samples[method].append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        dict_loop_fusion(snap["mapping"], sem_pos, sem_raw, lex_pos, bm_scores[lex_pos], args.alpha, args.top_k)
+        samples["dict_loop"].append((time.perf_counter() - t0) * 1000)
+
+    return {name: percentiles(ms) for name, ms in samples.items()}
+
+
+def run(args) -> Dict:
+    rng = np.random.default_rng(args.seed)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    by_size = {str(n): run_size(n, args, rng) for n in sizes}
+
+    p50 = [by_size[str(n)]["weighted"]["p50_ms"] for n in sizes]
+    return {
+        "benchmark": "fusion",
+        "params": {"sizes": sizes, "queries": args.queries, "pool": args.pool,
+                   "top_k": args.top_k, "dim": args.dim},
+        "sizes": by_size,
+        # largest / smallest corpus p50: stays near 1 (cache misses on the bigger
+        # arrays, not work) however many times larger the corpus is
+        "weighted_p50_growth": round(max(p50) / min(p50), 2) if min(p50) > 0 else None,
+        "max_rss_mb": max_rss_mb(),
+        "primary": [f"sizes.{n}.{m}.p50_ms" for n in sizes for m in ("weighted", "rrf")],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated corpus sizes.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pool", type=int, default=50, help="Candidates per retriever (10 x top_k by default in the app).")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    parser.add_argument("--dim", type=int, default=128, help="Only affects scoring the pool's vectors.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"fusion, pool={args.pool} per retriever, top_k={args.top_k}, {args.queries} queries")
+    print(f"  {'chunks':>9} {'weighted p50':>13} {'rrf p50':>9} {'dict loop p50':>14}  (ms)")
+    for n, r in result["sizes"].items():
+        print(f"  {n:>9} {r['weighted']['p50_ms']:>13.3f} {r['rrf']['p50_ms']:>9.3f} {r['dict_loop']['p50_ms']:>14.3f}")
+    print(f"  weighted p50 growth largest/smallest corpus: {result['weighted_p50_growth']}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# backend/benchmarks/bench_ingest.py
+"""
+Ingestion throughput.
+
+- chunking: chunk_page_semantic over synthetic pages (pages/sec)
+- ingest:   the real index_pdf_background path (chunk, DB insert, embed,
+            FAISS save, registry) with PDF parsing replaced by synthetic
+            pages and the hash embedder standing in for bge
+
+    cd backend
+    python -m benchmarks.bench_ingest --docs 20 --pages 10 --json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import max_rss_mb, prepare_workdir, use_hash_embedder
+from benchmarks.synthetic import generate_pages
+
+
+async def run(args) -> dict:
+    import app.services.indexer as indexer
+    from app.core.rag_engine import chunk_page_semantic
+    from app.db.session import create_db_and_tables
+    from app.utils.metrics import INGEST_STAGE_SECONDS
+
+    await create_db_and_tables()
+    use_hash_embedder(args.dim)
+
+    docs = {
+        f"doc{d}": [text for _, text in generate_pages(args.pages, seed=args.seed + d)]
+        for d in range(args.docs)
+    }
+
+    # chunking only
+    all_pages = [p for pages in docs.values() for p in pages]
+    t0 = time.perf_counter()
+    n_chunks = sum(len(chunk_page_semantic("bench", i, p)) for i, p in enumerate(all_pages))
+    chunk_sec = time.perf_counter() - t0
+
+    # full ingest path, PDF parsing swapped for the synthetic pages
+    indexer.load_pdf_pages = lambda path: docs[path]
+    t0 = time.perf_counter()
+    for doc_id in docs:
+        await indexer.index_pdf_background(doc_id, doc_id)
+    ingest_sec = time.perf_counter() - t0
+
+    stages = {}
+    for (stage,), child in INGEST_STAGE_SECONDS._children.items():
+        stages[stage] = round(child.sum, 4)
+
+    total_pages = len(all_pages)
+    return {
+        "benchmark": "ingest",
+        "params": {"docs": args.docs, "pages_per_doc": args.pages, "dim": args.dim, "seed": args.seed},
+        "chunking": {
+            "pages_per_sec": round(total_pages / chunk_sec, 1),
+            "chunks": n_chunks,
+        },
+        "ingest": {
+            "pages_per_sec": round(total_pages / ingest_sec, 1),
+            "chunks_per_sec": round(n_chunks / ingest_sec, 1),
+            "total_sec": round(ingest_sec, 3),
+            "stage_sec": stages,
+        },
+        "max_rss_mb": max_rss_mb(),
+        "primary": ["chunking.pages_per_sec", "ingest.pages_per_sec"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10, help="Pages per document.")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    prepare_workdir(args.workdir)
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"chunking: {result['chunking']['pages_per_sec']} pages/s")
+        print(f"ingest:   {result['ingest']['pages_per_sec']} pages/s, "
+              f"{result['ingest']['chunks_per_sec']} chunks/s, rss={result['max_rss_mb']}MB")
+        print(f"  stages (s): {result['ingest']['stage_sec']}")
+
+
+if __name__ == "__main__":
+    main()
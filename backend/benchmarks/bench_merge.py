@@ -0,0 +1,72 @@
+# backend/benchmarks/bench_merge.py
+"""
+merge_faiss_indexes time for K per-document indexes of N vectors each.
+
+    cd backend
+    python -m benchmarks.bench_merge --indexes 20 --vectors 5000 --json
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.common import max_rss_mb, prepare_workdir
+
+
+def run(args) -> dict:
+    import faiss
+    from app.utils.faiss_merge import merge_faiss_indexes
+
+    rng = np.random.default_rng(args.seed)
+    paths = []
+    for k in range(args.indexes):
+        vecs = rng.standard_normal((args.vectors, args.dim), dtype=np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        index = faiss.IndexFlatIP(args.dim)
+        index.add(vecs)
+        path = os.path.join("data", "faiss", f"merge_{k}.index")
+        faiss.write_index(index, path)
+        paths.append(path)
+
+    t0 = time.perf_counter()
+    merged = merge_faiss_indexes(paths)
+    merge_sec = time.perf_counter() - t0
+    assert merged.ntotal == args.indexes * args.vectors
+
+    return {
+        "benchmark": "merge",
+        "params": {"indexes": args.indexes, "vectors_per_index": args.vectors, "dim": args.dim},
+        "merge": {
+            "total_sec": round(merge_sec, 4),
+            "vectors_per_sec": round(merged.ntotal / merge_sec, 1),
+        },
+        "max_rss_mb": max_rss_mb(),
+        "primary": ["merge.total_sec"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--indexes", type=int, default=20)
+    parser.add_argument("--vectors", type=int, default=5000, help="Vectors per index.")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    prepare_workdir(args.workdir)
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        m = result["merge"]
+        print(f"merge {args.indexes} x {args.vectors}: {m['total_sec']}s "
+              f"({m['vectors_per_sec']} vectors/s), rss={result['max_rss_mb']}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# backend/benchmarks/bench_search.py
+"""
+hybrid_search_db latency at a given corpus size.
+
+Builds a throwaway SQLite DB with N synthetic chunks, a FAISS IndexFlatIP
+of their hash-embedder vectors and a registry row, then times the real
+search path (snapshot check, embed, FAISS, BM25, fusion) over a fixed
+question set.
+
+    cd backend
+    python -m benchmarks.bench_search --chunks 100000 --queries 200 --json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import max_rss_mb, percentiles, prepare_workdir, use_hash_embedder
+from benchmarks.synthetic import generate_chunks, generate_questions
+
+INSERT_BATCH = 5000
+EMBED_BATCH = 10000
+STAGES = ("snapshot", "embed", "faiss", "bm25", "fusion")
+
+
+async def build_corpus(n_chunks: int, dim: int, seed: int) -> dict:
+    import faiss
+    from sqlalchemy import insert, select
+    from app.db.session import async_session, create_db_and_tables, engine
+    from app.models.models import Chunk, FaissIndexRegistry
+
+    await create_db_and_tables()
+    texts = generate_chunks(n_chunks, seed=seed)
+
+    t0 = time.perf_counter()
+    async with engine.begin() as conn:
+        for start in range(0, n_chunks, INSERT_BATCH):
+            await conn.execute(insert(Chunk.__table__), [
+                {"doc_id": f"doc{i // 200}", "text": texts[i], "page": (i % 200) // 10,
+                 "start_char": 0, "end_char": len(texts[i])}
+                for i in range(start, min(start + INSERT_BATCH, n_chunks))
+            ])
+        ids = (await conn.execute(select(Chunk.__table__.c.id).order_by(Chunk.__table__.c.id))).scalars().all()
+    insert_sec = time.perf_counter() - t0
+
+    embedder = use_hash_embedder(dim)
+    t0 = time.perf_counter()
+    index = faiss.IndexFlatIP(dim)
+    for start in range(0, n_chunks, EMBED_BATCH):
+        index.add(embedder.encode(texts[start:start + EMBED_BATCH], normalize_embeddings=True))
+    embed_sec = time.perf_counter() - t0
+
+    faiss_path = "data/faiss/bench.index"
+    faiss.write_index(index, faiss_path)
+    async with async_session() as session:
+        session.add(FaissIndexRegistry(faiss_path=faiss_path, embed_dim=dim,
+                                       total_chunks=len(ids), faiss_to_chunk_ids=list(ids)))
+        await session.commit()
+
+    return {"insert_sec": round(insert_sec, 3), "embed_sec": round(embed_sec, 3)}
+
+
+async def run(args) -> dict:
+    from app.core.rag_engine import get_retrieval_snapshot, hybrid_search_db
+
+    setup = await build_corpus(args.chunks, args.dim, args.seed)
+
+    t0 = time.perf_counter()
+    await get_retrieval_snapshot()
+    setup["snapshot_build_sec"] = round(time.perf_counter() - t0, 3)
+
+    questions = generate_questions(args.queries + args.warmup, seed=args.seed + 1)
+    for q in questions[:args.warmup]:
+        await hybrid_search_db(q, top_k=args.top_k, alpha=args.alpha)
+
+    latencies, stages = [], {s: [] for s in STAGES}
+    for q in questions[args.warmup:]:
+        timings = {}
+        t0 = time.perf_counter()
+        await hybrid_search_db(q, top_k=args.top_k, alpha=args.alpha, timings=timings)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        for s in STAGES:
+            stages[s].append(timings.get(f"{s}_ms", 0.0))
+
+    return {
+        "benchmark": "search",
+        "params": {"chunks": args.chunks, "dim": args.dim, "top_k": args.top_k,
+                   "alpha": args.alpha, "queries": args.queries, "seed": args.seed},
+        "latency": percentiles(latencies),
+        "stages": {s: percentiles(v) for s, v in stages.items()},
+        "setup": setup,
+        "max_rss_mb": max_rss_mb(),
+        "primary": ["latency.p50_ms", "latency.p95_ms"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--alpha", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    prepare_workdir(args.workdir)
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result))
+    else:
+        lat = result["latency"]
+        print(f"search @ {args.chunks} chunks: p50={lat['p50_ms']}ms p95={lat['p95_ms']}ms "
+              f"p99={lat['p99_ms']}ms rss={result['max_rss_mb']}MB setup={result['setup']}")
+        for s, p in result["stages"].items():
+            print(f"  {s:<9} p50={p['p50_ms']}ms p95={p['p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
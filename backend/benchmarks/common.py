@@ -0,0 +1,72 @@
+# backend/benchmarks/common.py
+"""
+Shared plumbing for the benchmark scripts.
+
+prepare_workdir() must run before anything from `app` is imported: it
+points DATABASE_URL at a throwaway SQLite file and chdirs into a scratch
+directory so the app's relative `data/` paths stay out of the repo.
+"""
+
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def prepare_workdir(workdir: Optional[str] = None) -> str:
+    workdir = workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(os.path.join(workdir, "data", "faiss"), exist_ok=True)
+    os.chdir(workdir)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(workdir, 'data', 'bench.db')}"
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    return workdir
+
+
+def use_hash_embedder(dim: int):
+    import app.core.rag_engine as rag_engine
+    from app.services.stub_models import HashEmbedder
+    rag_engine._embed_model = HashEmbedder(dim)
+    return rag_engine._embed_model
+
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process so far (high-water mark)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    a = np.asarray(samples_ms, dtype="float64")
+    if a.size == 0:
+        return {}
+    return {
+        "mean_ms": round(float(a.mean()), 3),
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+        "p99_ms": round(float(np.percentile(a, 99)), 3),
+        "max_ms": round(float(a.max()), 3),
+    }
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(BACKEND_DIR),
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
@@ -0,0 +1,92 @@
+# backend/benchmarks/compare.py
+"""
+Compare two run_suite reports (e.g. main vs. a branch).
+
+Cases are matched on (benchmark, params). Every numeric metric is shown
+with its relative change; each case's "primary" metrics are gated:
+a change worse than --threshold (default 10%) exits with code 1.
+Metrics ending in _per_sec are higher-is-better, everything else
+(latencies, seconds, MB) lower-is-better.
+
+    cd backend
+    python -m benchmarks.compare base.json new.json --threshold 0.15
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Tuple
+
+
+def _flatten(d: Dict, prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def _case_key(result: Dict) -> Tuple:
+    return (result.get("benchmark"), json.dumps(result.get("params", {}), sort_keys=True))
+
+
+def _worse(metric: str, change: float) -> float:
+    """How much worse (positive) a relative change is for this metric."""
+    return -change if metric.endswith("_per_sec") else change
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> int:
+    base_cases = {_case_key(r): r for r in base["results"] if "error" not in r}
+    regressions = 0
+
+    print(f"base {base['environment'].get('commit')}  ->  new {new['environment'].get('commit')}")
+    for result in new["results"]:
+        if "error" in result:
+            print(f"\n{result.get('benchmark')}: ERROR in new run")
+            regressions += 1
+            continue
+        key = _case_key(result)
+        print(f"\n{key[0]} {key[1]}")
+        old = base_cases.get(key)
+        if old is None:
+            print("  (no matching case in base report)")
+            continue
+
+        primary = set(result.get("primary", []))
+        old_m, new_m = _flatten(old), _flatten(result)
+        for metric in sorted(new_m):
+            if metric.startswith("params.") or metric not in old_m:
+                continue
+            before, after = old_m[metric], new_m[metric]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if metric in primary:
+                flag = "  *"
+                if _worse(metric, change) > threshold:
+                    flag = "  REGRESSION"
+                    regressions += 1
+            print(f"  {metric:<32} {before:>12.3f} -> {after:>12.3f}  {change:+7.1%}{flag}")
+
+    print(f"\n{regressions} regression(s) over {threshold:.0%} on primary (*) metrics")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    sys.exit(1 if compare(base, new, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
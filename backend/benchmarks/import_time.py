@@ -0,0 +1,95 @@
+# backend/benchmarks/import_time.py
+"""
+Cold import-time check for app.main.
+
+Runs `import app.main` in a fresh interpreter (so nothing is cached in
+sys.modules), measures wall time, and fails if it exceeds the budget or
+if any heavy ML dependency was imported eagerly.
+
+    cd backend
+    python -m benchmarks.import_time --budget 2.0 --repeat 3
+
+Exit code 0 = within budget, 1 = over budget / heavy import found.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# modules that must only be imported on first use
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "peft",
+    "sentence_transformers",
+    "faiss",
+    "rank_bm25",
+    "fitz",
+]
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app.main
+took = time.perf_counter() - t0
+print(json.dumps({"seconds": took, "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_once() -> dict:
+    env = dict(os.environ)
+    # never start background work or touch a real DB from the probe
+    env.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # app.main prints a few startup lines; the probe result is the last one
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_BUDGET_SEC", "2.0")),
+                        help="Max seconds for a cold `import app.main` (best of --repeat).")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.repeat)]
+    best = min(r["seconds"] for r in runs)
+    heavy = sorted({m for r in runs for m in r["heavy"]})
+    ok = best <= args.budget and not heavy
+
+    result = {
+        "benchmark": "import_app_main",
+        "best_sec": round(best, 4),
+        "runs_sec": [round(r["seconds"], 4) for r in runs],
+        "budget_sec": args.budget,
+        "heavy_modules_imported": heavy,
+        "ok": ok,
+    }
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print(f"cold import app.main: best={best:.3f}s budget={args.budget:.3f}s runs={result['runs_sec']}")
+        if heavy:
+            print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        elif not ok:
+            print("FAIL: over budget")
+        else:
+            print("OK")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+# backend/benchmarks/loadgen.py
+"""
+End-to-end async load generator for the FastAPI service.
+
+Replays a question set against /ask/ and /search, optionally mixed with
+/upload/ (synthetic PDFs) and admin reads, either closed-loop
+(--concurrency N workers back to back) or open-loop (--rps R arrivals
+per second). In open-loop mode latency is measured from each request's
+scheduled start, so a saturated server shows up as growing latency
+instead of silently lowering the offered rate.
+
+Reports throughput, p50/p95/p99 latency and error rate per scenario,
+the server's own stage timings (the `timings` of /ask/ and /search
+responses) and the mean per-stage time from /metrics over the run.
+
+    cd backend
+    # against a running app
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --concurrency 8 --duration 30
+
+    # self-contained: seeded SQLite corpus + uvicorn with RAG_STUB_MODELS=1
+    python -m benchmarks.loadgen --spawn --seed-chunks 20000 --rps 20 --duration 60 \\
+        --mix ask=8,search=2,admin=1,upload=0.2
+
+Questions: --questions synthetic (default), querylog (past questions
+from /admin/query-logs/export.ndjson) or a path to the eval dataset
+JSON ([{"query": ...}]) / a text file with one question per line.
+
+Needs httpx (pip install httpx); --spawn also needs uvicorn.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import BACKEND_DIR, environment, percentiles, prepare_workdir
+from benchmarks.synthetic import generate_pages, generate_questions, make_pdf
+
+SCENARIOS = ("ask", "search", "upload", "admin")
+ADMIN_PATHS = ("/admin/stats", "/admin/stats/summary", "/admin/query-logs/?limit=50", "/documents/?limit=100")
+_metric_re = re.compile(r'^(rag_stage_seconds|rag_ingest_stage_seconds)_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+# ---------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+async def load_questions(source: str, client, limit: int, seed: int) -> List[str]:
+    if source == "synthetic":
+        return generate_questions(limit, seed=seed)
+    if source == "querylog":
+        questions = []
+        async with client.stream("GET", "/admin/query-logs/export.ndjson") as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if line:
+                    questions.append(json.loads(line)["query_text"])
+        questions = list(dict.fromkeys(questions))
+    elif source.endswith(".json"):
+        with open(source, encoding="utf-8") as f:
+            questions = [item.get("query") or item.get("question") for item in json.load(f)]
+        questions = [q for q in questions if q]
+    else:
+        with open(source, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    if not questions:
+        raise SystemExit(f"no questions found in {source!r}")
+    return questions[:limit]
+
+
+async def scrape_stage_metrics(client) -> Dict[Tuple[str, str], List[float]]:
+    """{(metric, stage): [sum, count]} from /metrics; empty if unavailable."""
+    try:
+        resp = await client.get("/metrics")
+        resp.raise_for_status()
+    except Exception:
+        return {}
+    out = defaultdict(lambda: [0.0, 0.0])
+    for line in resp.text.splitlines():
+        m = _metric_re.match(line)
+        if m:
+            out[(m.group(1), m.group(3))][0 if m.group(2) == "sum" else 1] = float(m.group(4))
+    return out
+
+
+# ---------------------------------------------------------------------
+# Requests
+# ---------------------------------------------------------------------
+class LoadRun:
+    def __init__(self, client, questions: List[str], mix: Dict[str, float], seed: int,
+                 upload_pages: int):
+        self.client = client
+        self.questions = questions
+        self.names = list(mix)
+        self.weights = [mix[n] for n in self.names]
+        self.rng = random.Random(seed)
+        self.upload_pages = upload_pages
+        self.samples: List[Dict] = []
+        self._seq = 0
+
+    def next_request(self) -> Tuple[str, int]:
+        self._seq += 1
+        return self.rng.choices(self.names, self.weights)[0], self._seq
+
+    async def _send(self, scenario: str, seq: int):
+        if scenario in ("ask", "search"):
+            path = "/ask/" if scenario == "ask" else "/search"
+            question = self.questions[seq % len(self.questions)]
+            return await self.client.post(path, json={"question": question})
+        if scenario == "upload":
+            pages = [text for _, text in generate_pages(self.upload_pages, seed=10_000 + seq)]
+            files = {"file": (f"loadgen_{os.getpid()}_{seq}.pdf", make_pdf(pages), "application/pdf")}
+            return await self.client.post("/upload/", files=files)
+        return await self.client.get(ADMIN_PATHS[seq % len(ADMIN_PATHS)])
+
+    async def one(self, scenario: str, seq: int, scheduled: Optional[float] = None):
+        start = time.perf_counter()
+        sample = {"scenario": scenario, "status": None, "error": None, "timings": None}
+        try:
+            resp = await self._send(scenario, seq)
+            sample["status"] = resp.status_code
+            if resp.status_code >= 400:
+                sample["error"] = f"HTTP {resp.status_code}"
+            elif scenario in ("ask", "search"):
+                sample["timings"] = resp.json().get("timings")
+        except Exception as e:
+            sample["error"] = type(e).__name__
+        end = time.perf_counter()
+        sample["latency_ms"] = (end - (scheduled if scheduled is not None else start)) * 1000
+        sample["service_ms"] = (end - start) * 1000
+        self.samples.append(sample)
+
+    async def closed_loop(self, concurrency: int, deadline: float, max_requests: int):
+        async def worker():
+            while time.perf_counter() < deadline and self._seq < max_requests:
+                await self.one(*self.next_request())
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def open_loop(self, rps: float, deadline: float, max_requests: int, max_in_flight: int):
+        sem = asyncio.Semaphore(max_in_flight)
+        tasks = []
+        t0 = time.perf_counter()
+        i = 0
+        while i < max_requests:
+            scheduled = t0 + i / rps
+            if scheduled >= deadline:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            scenario, seq = self.next_request()
+
+            async def bounded(scenario=scenario, seq=seq, scheduled=scheduled):
+                async with sem:
+                    await self.one(scenario, seq, scheduled)
+            tasks.append(asyncio.create_task(bounded()))
+            i += 1
+        await asyncio.gather(*tasks)
+
+
+# ---------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------
+def summarize(samples: List[Dict], elapsed: float) -> Dict:
+    def block(rows: List[Dict]) -> Dict:
+        ok = [r for r in rows if r["error"] is None]
+        statuses = defaultdict(int)
+        for r in rows:
+            statuses[str(r["status"] or r["error"])] += 1
+        out = {
+            "requests": len(rows),
+            "requests_per_sec": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(1 - len(ok) / len(rows), 4) if rows else 0.0,
+            "status": dict(statuses),
+            "latency": percentiles([r["latency_ms"] for r in ok]),
+        }
+        stage_samples = defaultdict(list)
+        for r in ok:
+            for k, v in (r["timings"] or {}).items():
+                stage_samples[k].append(v)
+        if stage_samples:
+            out["server_timings"] = {k: percentiles(v) for k, v in sorted(stage_samples.items())}
+        return out
+
+    by_scenario = defaultdict(list)
+    for s in samples:
+        by_scenario[s["scenario"]].append(s)
+    return {
+        "overall": block(samples),
+        "scenarios": {name: block(rows) for name, rows in sorted(by_scenario.items())},
+    }
+
+
+def stage_means(before: Dict, after: Dict) -> Dict[str, Dict[str, float]]:
+    """Mean ms per stage over the run, from the /metrics histogram deltas."""
+    out = defaultdict(dict)
+    for (metric, stage), (total, count) in after.items():
+        prev_total, prev_count = before.get((metric, stage), (0.0, 0.0))
+        n = count - prev_count
+        if n > 0:
+            key = "ingest" if metric == "rag_ingest_stage_seconds" else "query"
+            out[key][stage] = {"count": int(n), "mean_ms": round((total - prev_total) / n * 1000, 3)}
+    return dict(out)
+
+
+def print_report(result: Dict):
+    p = result["params"]
+    mode = f"rps={p['rps']}" if p["rps"] else f"concurrency={p['concurrency']}"
+    print(f"\nload test {p['url']} ({mode}, {result['elapsed_sec']}s, mix={p['mix']})")
+    rows = [("overall", result["overall"])] + list(result["scenarios"].items())
+    print(f"  {'scenario':<9} {'reqs':>6} {'req/s':>8} {'err%':>6} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9}")
+    for name, r in rows:
+        lat = r["latency"] or {}
+        print(f"  {name:<9} {r['requests']:>6} {r['requests_per_sec']:>8} {r['error_rate'] * 100:>6.1f} "
+              f"{lat.get('p50_ms', 0):>9} {lat.get('p95_ms', 0):>9} {lat.get('p99_ms', 0):>9}")
+    for name, r in result["scenarios"].items():
+        if r.get("server_timings"):
+            print(f"  {name} server timings (p50/p95 ms):")
+            for stage, t in r["server_timings"].items():
+                print(f"    {stage:<14} {t['p50_ms']:>9} {t['p95_ms']:>9}")
+    for kind, stages in result.get("metrics_stage_means", {}).items():
+        print(f"  /metrics {kind} stage means: "
+              + ", ".join(f"{s}={v['mean_ms']}ms" for s, v in sorted(stages.items())))
+
+
+# ---------------------------------------------------------------------
+# Local server
+# ---------------------------------------------------------------------
+async def seed_corpus(n_chunks: int, dim: int, seed: int):
+    from benchmarks.bench_search import build_corpus
+    if n_chunks > 0:
+        setup = await build_corpus(n_chunks, dim, seed)
+        print(f"[LOADGEN] seeded {n_chunks} chunks {setup}", file=sys.stderr)
+    else:
+        from app.db.session import create_db_and_tables
+        await create_db_and_tables()
+
+
+def spawn_server(args) -> Tuple[subprocess.Popen, str]:
+    workdir = prepare_workdir(args.workdir)
+    asyncio.run(seed_corpus(args.seed_chunks, args.dim, args.seed))
+
+    env = dict(os.environ)
+    env.update({
+        "RAG_STUB_MODELS": "1",
+        "EMBED_DIM": str(args.dim),
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(BACKEND_DIR), env.get("PYTHONPATH")])),
+    })
+    log_path = os.path.join(workdir, "server.log")
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+           "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"]
+    print(f"[LOADGEN] starting stub server in {workdir} (log: {log_path})", file=sys.stderr)
+    proc = subprocess.Popen(cmd, cwd=workdir, env=env, stdout=open(log_path, "w"), stderr=subprocess.STDOUT)
+    return proc, f"http://127.0.0.1:{args.port}"
+
+
+async def wait_ready(client, proc: Optional[subprocess.Popen], timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode}")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit(f"server not ready after {timeout}s")
+
+
+# ---------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------
+async def run(args, url: str, proc: Optional[subprocess.Popen]) -> Dict:
+    try:
+        import httpx
+    except ImportError:
+        raise SystemExit("loadgen needs httpx (pip install httpx)")
+
+    mix = parse_mix(args.mix)
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    pool = max(args.concurrency, args.max_in_flight if args.rps else 0)
+    limits = httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+    async with httpx.AsyncClient(base_url=url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        await wait_ready(client, proc, args.ready_timeout)
+        questions = await load_questions(args.questions, client, args.max_questions, args.seed + 1)
+        loader = LoadRun(client, questions, mix, args.seed, args.upload_pages)
+
+        # warmup (not recorded) so first-request costs don't skew a short run
+        for _ in range(args.warmup):
+            await loader.one(*loader.next_request())
+        loader.samples.clear()
+
+        before = await scrape_stage_metrics(client)
+        t0 = time.perf_counter()
+        deadline = t0 + args.duration
+        max_requests = loader._seq + (args.requests or sys.maxsize)
+        if args.rps:
+            await loader.open_loop(args.rps, deadline, max_requests, args.max_in_flight)
+        else:
+            await loader.closed_loop(args.concurrency, deadline, max_requests)
+        elapsed = time.perf_counter() - t0
+        after = await scrape_stage_metrics(client)
+
+    result = {
+        "benchmark": "load",
+        "params": {"url": url, "mix": args.mix, "rps": args.rps, "concurrency": args.concurrency,
+                   "duration": args.duration, "questions": args.questions, "spawn": args.spawn,
+                   "seed_chunks": args.seed_chunks if args.spawn else None},
+        "environment": environment(),
+        "elapsed_sec": round(elapsed, 3),
+        **summarize(loader.samples, elapsed),
+        "metrics_stage_means": stage_means(before, after),
+        "primary": ["overall.latency.p95_ms", "overall.requests_per_sec"],
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true",
+                        help="Start a local uvicorn with RAG_STUB_MODELS=1 on a seeded scratch DB.")
+    parser.add_argument("--seed-chunks", type=int, default=10000, help="Corpus size for --spawn.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--mix", default="ask=1", help="Scenario weights, e.g. ask=8,search=2,admin=1,upload=0.1")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers (ignored with --rps).")
+    parser.add_argument("--rps", type=float, default=0.0, help="Open-loop arrival rate.")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Open-loop cap on outstanding requests.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of measured load.")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = duration only).")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--questions", default="synthetic", help="synthetic | querylog | path to .json/.txt")
+    parser.add_argument("--max-questions", type=int, default=1000)
+    parser.add_argument("--upload-pages", type=int, default=5)
+    parser.add_argument("--token", default=os.getenv("LOADGEN_TOKEN", ""), help="Bearer token for admin endpoints.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable result only.")
+    args = parser.parse_args()
+
+    proc, url = spawn_server(args) if args.spawn else (None, args.url)
+    try:
+        result = asyncio.run(run(args, url, proc))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print_report(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# backend/benchmarks/run_suite.py
+"""
+Run the retrieval/ingestion benchmark suite and write one JSON report.
+
+Each case runs in its own interpreter so the memory high-water mark
+(max_rss_mb) belongs to that case alone.
+
+    cd backend
+    pip install -r requirements.txt -r benchmarks/requirements.txt
+    python -m benchmarks.run_suite --out bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.run_suite --sizes 10000,100000,1000000   # full run (1M needs ~8GB RAM)
+    python -m benchmarks.compare base.json new.json
+
+Default sizes are 10k and 100k chunks; 1M takes several minutes to set up
+(mostly the BM25 build), so it is opt-in.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.common import BACKEND_DIR, environment
+
+
+def run_case(module: str, *args: str) -> dict:
+    cmd = [sys.executable, "-m", f"benchmarks.{module}", "--json", *args]
+    print(f"[BENCH] {' '.join(cmd[2:])}", file=sys.stderr)
+    out = subprocess.run(cmd, cwd=str(BACKEND_DIR), capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"benchmark": module, "args": list(args), "error": out.stderr.strip()[-2000:]}
+    # app modules print startup lines; the result is the last line
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated corpus sizes for search.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--ingest-docs", type=int, default=20)
+    parser.add_argument("--ingest-pages", type=int, default=10)
+    parser.add_argument("--merge-indexes", type=int, default=20)
+    parser.add_argument("--merge-vectors", type=int, default=5000)
+    parser.add_argument("--fusion-pool", type=int, default=50)
+    parser.add_argument("--only", default="", help="Comma-separated subset of: search,fusion,ingest,merge")
+    parser.add_argument("--out", default="", help="Write the report here instead of stdout.")
+    args = parser.parse_args()
+
+    only = set(filter(None, args.only.split(","))) or {"search", "fusion", "ingest", "merge"}
+    dim = str(args.dim)
+    results = []
+    if "search" in only:
+        for size in (int(s) for s in args.sizes.split(",") if s):
+            results.append(run_case("bench_search", "--chunks", str(size),
+                                    "--queries", str(args.queries), "--dim", dim))
+    if "fusion" in only:
+        results.append(run_case("bench_fusion", "--sizes", args.sizes,
+                                "--queries", str(args.queries), "--pool", str(args.fusion_pool)))
+    if "ingest" in only:
+        results.append(run_case("bench_ingest", "--docs", str(args.ingest_docs),
+                                "--pages", str(args.ingest_pages), "--dim", dim))
+    if "merge" in only:
+        results.append(run_case("bench_merge", "--indexes", str(args.merge_indexes),
+                                "--vectors", str(args.merge_vectors), "--dim", dim))
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": environment(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"[BENCH] wrote {args.out}", file=sys.stderr)
+    else:
+        print(text)
+    sys.exit(1 if any("error" in r for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# backend/benchmarks/synthetic.py
+"""
+Deterministic synthetic policy corpus.
+
+Pages read like HR/finance policy text (numbered sections, recurring
+boilerplate, topic-specific vocabulary) so chunking, BM25 and the hash
+embedder see realistic token statistics. Everything is derived from
+`seed`, so the same arguments always produce the same corpus.
+"""
+
+import random
+import textwrap
+from typing import List, Tuple
+
+TOPICS = {
+    "leave": "annual leave sick vacation holiday absence carry-over accrual entitlement days notice",
+    "travel": "travel reimbursement airfare hotel per-diem mileage receipts booking economy approval",
+    "conduct": "conduct harassment discrimination conflict interest gifts disciplinary ethics reporting",
+    "security": "password device encryption access badge vpn incident phishing confidential data",
+    "benefits": "insurance medical dental pension retirement wellness allowance dependents enrollment",
+    "payroll": "salary payroll overtime bonus deductions tax payslip compensation bank transfer",
+    "remote": "remote hybrid home office equipment internet hours availability workspace stipend",
+    "procurement": "purchase vendor invoice quotation contract procurement budget approval threshold",
+}
+
+BOILERPLATE = [
+    "This policy applies to all employees, contractors and temporary staff.",
+    "Exceptions require written approval from the department head and Human Resources.",
+    "Failure to comply with this policy may result in disciplinary action.",
+    "Managers are responsible for ensuring their teams are aware of this policy.",
+    "This document is reviewed annually and supersedes all previous versions.",
+]
+
+FILLER = ("the employee shall must may within working days of request submit manager "
+          "company policy section provided that subject to prior written notice").split()
+
+
+def _sentence(rng: random.Random, topic_words: List[str]) -> str:
+    n = rng.randint(10, 24)
+    words = [rng.choice(topic_words) if rng.random() < 0.35 else rng.choice(FILLER) for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_page(rng: random.Random, topic: str, section: int) -> str:
+    topic_words = TOPICS[topic].split()
+    paras = []
+    for p in range(rng.randint(3, 6)):
+        body = " ".join(_sentence(rng, topic_words) for _ in range(rng.randint(3, 7)))
+        if rng.random() < 0.3:
+            body += " " + rng.choice(BOILERPLATE)
+        paras.append(f"{section}.{p + 1} {topic.title()} policy. {body}")
+    return "\n\n".join(paras)
+
+
+def generate_pages(n_pages: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """(topic, page text) pairs."""
+    rng = random.Random(seed)
+    topics = sorted(TOPICS)
+    return [(t, generate_page(rng, t, i + 1)) for i, t in ((i, rng.choice(topics)) for i in range(n_pages))]
+
+
+def generate_chunks(n_chunks: int, seed: int = 0) -> List[str]:
+    """Chunk-sized texts (~1 paragraph each), cheaper than chunking generated pages."""
+    rng = random.Random(seed)
+    topics = sorted(TOPICS)
+    out = []
+    for i in range(n_chunks):
+        topic = rng.choice(topics)
+        words = TOPICS[topic].split()
+        out.append(f"{i % 50 + 1}.{i % 7 + 1} {topic.title()} policy. "
+                   + " ".join(_sentence(rng, words) for _ in range(rng.randint(3, 6))))
+    return out
+
+
+def generate_questions(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    topics = sorted(TOPICS)
+    templates = [
+        "What is the {t} policy for {a} and {b}?",
+        "How many days of {a} do I get?",
+        "Who approves {a} {b} requests?",
+        "Is {a} covered under the {t} policy?",
+    ]
+    out = []
+    for _ in range(n):
+        t = rng.choice(topics)
+        a, b = rng.sample(TOPICS[t].split(), 2)
+        out.append(rng.choice(templates).format(t=t, a=a, b=b))
+    return out
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """
+    Minimal text-only PDF (Helvetica, one object per page + content stream)
+    that PyMuPDF / PyPDF2 extract text from; used to drive /upload/ in load tests.
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = [l for para in text.split("\n") for l in (textwrap.wrap(para, 95) or [""])]
+        ops = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines[:70]) + " ET"
+        stream = ops.encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        " ".join(f"{k} 0 R" for k in kids).encode(), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)